@@ -0,0 +1,370 @@
+"""Qt-free steps shared by the GUI and headless decoders: debug log, KISS decode, output logs (writing and reading back) and parsing"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import os
+import logging
+import re
+import atexit
+import datetime
+import binascii
+import minxss_parser
+import pipeline_metrics
+import packet_dispatcher
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+try:
+    from logging.handlers import QueueHandler, QueueListener
+except ImportError:
+    QueueHandler = None  # python 2: the debug log is written synchronously and isn't sampled
+
+decoderHomeDirectory = os.path.join(os.path.expanduser("~"), "MinXSS_Beacon_Decoder")
+logDirectory = os.path.join(decoderHomeDirectory, "log")  # The debug log, and diagnostics written alongside it
+startSyncBytes = bytearray(minxss_parser.schemaSet.defaultSchema.syncBytes)  # Other CubeSats: set these in your telemetry schema
+stopSyncBytes = bytearray(minxss_parser.schemaSet.defaultSchema.stopSyncBytes)
+checkedSchemas = [schema for schema in minxss_parser.schemaSet.schemas if schema.hasChecks]  # Frames of other schemas aren't checked
+hexLogBytePattern = re.compile(b'0x([0-9a-fA-F]{2})')
+logSampleInterval = 60.0  # [s] Each line of code that logs may write at most logSampleBurst messages per interval; the rest are counted
+logSampleBurst = 20       # At a beacon every 9 s, nothing per packet is suppressed; a flood of resets or a fast replay is cut to a count
+logName = 'serial_reader_debug'  # The debug log's logger, which createLog adds the handlers to
+logHandlers = []  # The handlers createLog added to the debug log
+logProcessId = None  # The process they were added in; a forked child (e.g., the reader process) inherits them
+
+
+# Purpose:
+#   Initialize a debugger log file, once per process
+# Input:
+#   None
+# Output:
+#   log [logging.Logger]: The log for informational and debug statements, writing to the .log file
+#
+def createLog():
+    global logProcessId
+    log = logging.getLogger(logName)
+    if logProcessId == os.getpid():
+        return log
+    for handler in logHandlers:  # Inherited through a fork: their listener thread wasn't, so nothing would drain their queue
+        log.removeHandler(handler)
+    del logHandlers[:]
+    logProcessId = os.getpid()
+    if not os.path.exists(logDirectory):
+        os.makedirs(logDirectory)
+    handler = logging.FileHandler(os.path.join(logDirectory, "minxss_beacon_decoder_debug.log"))
+    formatter = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
+    handler.setFormatter(formatter)
+    if QueueHandler is not None:
+        # Formatting and disk writes happen on the listener's thread, not the reading thread
+        logQueue = queue.Queue()
+        listener = QueueListener(logQueue, handler)
+        listener.start()
+        atexit.register(listener.stop)  # Writes out anything still queued
+        handler = Sampled_Queue_Handler(logQueue)
+        pipeline_metrics.registry.registerGauge('log_queue_depth', "Debug log messages waiting to be written", logQueue.qsize)
+        atexit.register(handler.reportSuppressed)  # Runs before listener.stop
+    log.addHandler(handler)
+    logHandlers.append(handler)
+    log.setLevel(logging.DEBUG)
+    log.info("Launched MinXSS Beacon Decoder")
+    return log
+
+
+if QueueHandler is not None:
+    class Sampled_Queue_Handler(QueueHandler):
+        """
+        Purpose:
+            Hand log records to a QueueListener without formatting them, so that e.g. telemetry dumps are only turned into
+            strings on the listener's thread, and limit each line of code to logSampleBurst messages per logSampleInterval,
+            noting how many were suppressed. Objects passed as log arguments must not be changed after logging them.
+        Input:
+            logQueue [queue.Queue]: The queue the QueueListener reads
+            interval [float]: Seconds per sampling window
+            burst [int]: Messages allowed per line of code per window
+        Output:
+            N/A
+        """
+        def __init__(self, logQueue, interval=logSampleInterval, burst=logSampleBurst):
+            QueueHandler.__init__(self, logQueue)
+            self.interval = interval
+            self.burst = burst
+            self.windows = {}  # (filename, line number) -> [window start time, messages in window, messages suppressed]
+
+        def prepare(self, record):
+            return record
+
+        def emit(self, record):
+            key = (record.pathname, record.lineno)
+            window = self.windows.get(key)
+            if window is None or record.created - window[0] >= self.interval:
+                if window is not None and window[2] > 0:
+                    self.enqueueSuppressed(key, window[2])
+                window = self.windows[key] = [record.created, 0, 0]
+            if window[1] < self.burst:
+                window[1] += 1
+                self.enqueue(record)
+            else:
+                window[2] += 1
+
+        def enqueueSuppressed(self, key, suppressedCount):
+            self.enqueue(logging.makeLogRecord({'levelno': logging.WARNING, 'levelname': 'WARNING',
+                                                'msg': "Suppressed %d messages from %s:%d (limit is %d per %g s)",
+                                                'args': (suppressedCount, os.path.basename(key[0]), key[1], self.burst, self.interval)}))
+
+        def reportSuppressed(self):
+            """
+            Purpose:
+                Log how many messages are suppressed in the current windows (e.g., on exit, so the counts aren't lost)
+            Input:
+                None
+            Output:
+                None
+            """
+            self.acquire()
+            try:
+                for key, window in self.windows.items():
+                    if window[2] > 0:
+                        self.enqueueSuppressed(key, window[2])
+                        window[2] = 0
+            finally:
+                self.release()
+
+
+# Purpose:
+#   Undo the KISS escaping of the special FEND (0xc0) and FESC (0xdb) characters
+# Input:
+#   bufferData [bytearray]: Data as read from the TNC
+# Output:
+#   bufferData [bytearray]: The same data with escape sequences replaced
+#
+def decodeKiss(bufferData):
+    bufferData = bufferData.replace(bytearray([0xdb, 0xdc]), bytearray([0xc0]))  # C0 is a special KISS character that get replaced; unreplace it
+    bufferData = bufferData.replace(bytearray([0xdb, 0xdd]), bytearray([0xdb]))  # DB is a special KISS character that get replaced; unreplace it
+    return bufferData
+
+
+# Purpose:
+#   Format binary data the way it is displayed in the GUI and written to the human-readable log
+# Input:
+#   bufferData [bytearray]: Binary data
+# Output:
+#   formattedBufferData [string]: e.g., "0xc0 0x00 0x9a"
+#
+def formatBufferData(bufferData):
+    return ' '.join('0x{:02x}'.format(x) for x in bufferData)
+
+
+# Purpose:
+#   Check a frame's integrity (packet checksum and AX.25 frame check sequence, if its telemetry schema has them) so corrupt
+#   frames can be dropped before they are archived or decoded
+# Input:
+#   bufferData [bytearray]: A single MinXSS packet, after KISS decoding
+#   log [logging.Logger]: The debug log
+# Output:
+#   passed [bool]: False if the frame is corrupt. True if it passed, has no checks, or has no packet to check.
+#
+def checkFrame(bufferData, log):
+    if not checkedSchemas:
+        return True
+    schema, syncOffset = minxss_parser.schemaSet.findPacket(bufferData)
+    failure = schema.checkPacket(bufferData, syncOffset) if schema is not None and schema.hasChecks else None
+    if failure is not None:
+        log.warning("Rejected corrupt frame: {0}".format(failure))
+        pipeline_metrics.increment('frames_rejected')
+        return False
+    return True
+
+
+# Purpose:
+#   Check the integrity of many packets at once (e.g., a chunk of an archive), vectorized per telemetry schema
+# Input:
+#   packets [list of bytearray]: Packets, each starting at its start sync bytes
+# Output:
+#   passed [list of bool]: Whether each packet passed (or has no checks)
+#
+def checkFramesBulk(packets):
+    passed = [True] * len(packets)
+    if not checkedSchemas:
+        return passed
+    packetIndexes = {}
+    for index, packet in enumerate(packets):
+        schema, _ = minxss_parser.schemaSet.findPacket(packet)
+        if schema is not None and schema.hasChecks:
+            packetIndexes.setdefault(schema, []).append(index)
+    for schema, indexes in packetIndexes.items():
+        for index, schemaPassed in zip(indexes, schema.checkPacketsBulk([packets[index] for index in indexes])):
+            passed[index] = schemaPassed
+    return passed
+
+
+# Purpose:
+#   Parse a packet into telemetry, treating any exception from the parser as a failed parse rather than killing the reader
+# Input:
+#   bufferData [bytearray]: A single MinXSS packet
+#   log [logging.Logger]: The debug log
+# Output:
+#   selectedTelemetryDictionary [dictionary]: The telemetry with key/value pairs, or -1 if the packet could not be parsed
+#
+def parsePacket(bufferData, log):
+    minxssParser = minxss_parser.Minxss_Parser(bufferData, log)
+    try:
+        selectedTelemetryDictionary = minxssParser.parsePacket(bufferData)
+    except Exception as error:
+        log.error("Failed to parse packet: {0}".format(error))
+        selectedTelemetryDictionary = -1
+    pipeline_metrics.increment('parse_failures' if selectedTelemetryDictionary == -1 else 'packets_decoded')
+    return selectedTelemetryDictionary
+
+
+# Purpose:
+#   Make the telemetry dictionary JSON serializable (numpy scalars and anything else unexpected)
+#
+def jsonDefault(value):
+    if hasattr(value, 'item'):
+        return value.item()
+    if hasattr(value, 'asDictionary'):
+        return value.asDictionary()  # telemetry_record.Telemetry_Record
+    return str(value)
+
+
+# Purpose:
+#   Rename a file over an existing one (os.replace is not available on python 2)
+#
+def replaceFile(source, destination):
+    if hasattr(os, 'replace'):
+        os.replace(source, destination)
+    else:
+        if os.path.exists(destination):
+            os.remove(destination)
+        os.rename(source, destination)
+
+
+# Purpose:
+#   Determine whether a log file is the human-readable hex (.txt) format or the binary (.dat) format
+# Input:
+#   filename [string]: Path to the log file
+# Output:
+#   isHexLog [bool]: True if the file is a human-readable hex log
+#
+def isHexLog(filename):
+    return filename.lower().endswith('.txt')
+
+
+# Purpose:
+#   Convert the contents of a human-readable hex log (e.g., "0xc0 0x00 0x9a") back to binary
+# Input:
+#   hexLogData [bytes]: Raw contents (or a slice) of a .txt log
+# Output:
+#   binaryData [bytearray]: The equivalent binary data
+#
+def hexLogToBytes(hexLogData):
+    return bytearray(binascii.unhexlify(b''.join(hexLogBytePattern.findall(hexLogData))))
+
+
+# Purpose:
+#   Read a byte range of a .dat or .txt log and return it as binary
+# Input:
+#   filename [string]: Path to the log file
+#   start [int]: First byte of the file to read
+#   stop [int]: One past the last byte of the file to read. None to read to the end of the file.
+# Output:
+#   binaryData [bytearray]: The binary MinXSS data in that range
+#
+def readLogBytes(filename, start=0, stop=None):
+    with open(filename, 'rb') as logFile:
+        logFile.seek(start)
+        if stop is None:
+            rawData = logFile.read()
+        else:
+            rawData = logFile.read(stop - start)
+    if isHexLog(filename):
+        return hexLogToBytes(rawData)
+    return bytearray(rawData)
+
+
+# Purpose:
+#   Pull every complete packet (start sync through stop sync) of every type registered with packet_dispatcher out of a buffer
+#   of binary data
+# Input:
+#   binaryData [bytearray]: Binary data that may contain any number of packets and noise between them
+# Output:
+#   packets [list of (int, bytearray)]: The offset within binaryData and the packet itself
+#
+def splitPackets(binaryData):
+    packets = []
+    dispatcher = packet_dispatcher.dispatcher
+    startIndex, packetType = dispatcher.findStart(binaryData)
+    while packetType is not None:
+        searchIndex = startIndex + len(packetType.startSyncBytes)
+        if packetType.packetLength is not None:
+            stopIndex = dispatcher.findExpectedStop(binaryData, startIndex, packetType)
+            if stopIndex is None or stopIndex == -1:
+                # Not a whole packet (noise, or cut short); resume the search just after its start sync
+                startIndex, packetType = dispatcher.findStart(binaryData, startIndex + 1)
+                continue
+        else:
+            stopIndex = binaryData.find(packetType.stopSyncBytes, searchIndex)
+            if stopIndex == -1:
+                break
+            cutOffIndex = dispatcher.findCutOff(binaryData, packetType, searchIndex, stopIndex)
+            if cutOffIndex != -1:
+                # Packet was cut off before its stop sync; resume the search at the next start sync
+                startIndex, packetType = dispatcher.findStart(binaryData, cutOffIndex)
+                continue
+        packetEnd = min(stopIndex + len(packetType.stopSyncBytes) + packetType.trailerLength, len(binaryData))
+        packets.append((startIndex, binaryData[startIndex:packetEnd]))
+        startIndex, packetType = dispatcher.findStart(binaryData, packetEnd)  # Other types' start sync may be in the payload
+    return packets
+
+
+class Output_Log():
+    """
+    Purpose:
+        The human-readable hex (.txt) and binary (.dat) logs of the buffer data for a session in ~/MinXSS_Beacon_Decoder/output
+        (or outputDirectory), and a .csv of when each packet in the binary log was received (its offset and length in the
+        .dat, then its first and last byte times in UTC and on the monotonic clock [ns])
+    """
+    def __init__(self, latitude, longitude, log, outputDirectory=os.path.join(decoderHomeDirectory, "output")):
+        self.log = log
+        if not os.path.exists(outputDirectory):
+            os.makedirs(outputDirectory)
+
+        # Human readable log
+        self.bufferOutputFilename = os.path.join(outputDirectory, datetime.datetime.now().isoformat().replace(':', '_')) + ".txt"
+        with open(self.bufferOutputFilename, 'w'):
+            pass
+
+        # Binary log
+        self.bufferOutputBinaryFilename = os.path.join(outputDirectory, datetime.datetime.now().isoformat().replace(':', '_')) + "_" + latitude + "_" + longitude + ".dat"
+        with open(self.bufferOutputBinaryFilename, 'w'):
+            self.log.info("Opening binary file for buffer data")
+        self.binaryLength = 0
+
+        # When each packet in the binary log was received
+        self.receiveTimesFilename = os.path.splitext(self.bufferOutputBinaryFilename)[0] + "_receive_times.csv"
+        with open(self.receiveTimesFilename, 'w') as receiveTimesLog:
+            receiveTimesLog.write("datOffset,length,firstByteUtc,lastByteUtc,firstByteMonotonicNs,lastByteMonotonicNs\n")
+
+    def write(self, bufferData, formattedBufferData=None, receiveTimes=None):
+        """
+        Purpose:
+            Append a packet to both the human-readable and binary logs, and when it was received to the receive times log
+        Input:
+            bufferData [bytearray]: The packet after any KISS decoding
+            formattedBufferData [string]: The human-readable form, if already computed
+            receiveTimes [latency_monitor.Receive_Times]: When the packet's first and last bytes were read. None if unknown.
+        Output:
+            None
+        """
+        if formattedBufferData is None:
+            formattedBufferData = formatBufferData(bufferData)
+        with open(self.bufferOutputFilename, 'a') as bufferOutputLog:
+            bufferOutputLog.write(formattedBufferData)
+        with open(self.bufferOutputBinaryFilename, 'ab') as bufferOutputBinaryLog:
+            bufferOutputBinaryLog.write(bufferData)
+        if receiveTimes is not None:
+            times = receiveTimes.asDictionary()
+            with open(self.receiveTimesFilename, 'a') as receiveTimesLog:
+                receiveTimesLog.write("{0},{1},{2},{3},{4},{5}\n".format(self.binaryLength, len(bufferData), times['firstByteUtc'], times['lastByteUtc'],
+                                                                         times['firstByteMonotonicNs'], times['lastByteMonotonicNs']))
+        self.binaryLength += len(bufferData)
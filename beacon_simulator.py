@@ -0,0 +1,270 @@
+"""Generate synthetic KISS/AX.25-wrapped MinXSS beacons and serve them over TCP/IP or a pseudo serial port for throughput testing"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import os
+import sys
+import time
+import random
+import struct
+import socket
+import argparse
+
+kissFend = 0xc0
+kissFesc = 0xdb
+kissTfend = 0xdc
+kissTfesc = 0xdd
+kissDataFrame = 0x00
+ax25Header = bytearray([0x9a, 0x92, 0x00, 0xb0, 0xa6, 0x64, 0x60,  # Destination, as in the example packet in minxss_parser
+                        0x86, 0xa2, 0x40, 0x40, 0x40, 0x40, 0xe1,  # Source
+                        0x03, 0xf0])                               # Control, PID
+housekeepingSyncBytes = bytearray([0x08, 0x19])
+logSyncBytes = bytearray([0x08, 0x1d])
+stopSyncBytes = bytearray([0xa5, 0xa5])
+housekeepingPacketLength = 254  # Including the start and stop sync bytes
+logPacketLength = 90
+logPacketStruct = struct.Struct('<HHIHBBH8i40s')  # After the start sync; a made-up layout, not the flight format (log_packets stores log packets raw)
+logMessages = ["Boot complete", "Entering eclipse", "Leaving eclipse", "Battery heater on", "Battery heater off",
+               "SD card write retry", "Watchdog reset", "X123 detector over temperature"]
+minxss2BeaconPeriod = 9.0  # [s]
+
+# Offsets (from the start sync) of the thermistor telemetry points that telemetry_schema.thermistorTemperature converts. It treats
+# the sum of the first two bytes as a voltage that must be between 0 and 3.3 V, so these are kept in that range.
+thermistorOffsets = [11, 35, 54, 56]
+
+
+# Purpose:
+#   Escape the special KISS characters and wrap a frame in FEND bytes, as a TNC does before sending it to the computer
+# Input:
+#   frame [bytearray]: KISS command byte followed by the AX.25 frame
+# Output:
+#   kissFrame [bytearray]: C0 + escaped frame + C0
+#
+def kissEncode(frame):
+    escapedFrame = bytearray([kissFend])
+    for byte in frame:
+        if byte == kissFend:
+            escapedFrame.extend([kissFesc, kissTfend])
+        elif byte == kissFesc:
+            escapedFrame.extend([kissFesc, kissTfesc])
+        else:
+            escapedFrame.append(byte)
+    escapedFrame.append(kissFend)
+    return escapedFrame
+
+
+class Beacon_Simulator():
+    """
+    Purpose:
+        Make a stream of synthetic beacons: valid housekeeping packets with randomized telemetry, log packets, and a
+        configurable fraction of deliberately corrupted frames
+    Input:
+        logFraction [float]: Fraction of frames that are log packets (0x08 0x1D)
+        corruptFraction [float]: Fraction of frames that are corrupted (bytes flipped, truncated, or missing a sync)
+        escapeFraction [float]: Probability that each free telemetry byte is forced to a KISS special character (0xC0 or 0xDB)
+        seed [int]: Random seed, for repeatable streams
+    Output:
+        N/A
+    """
+    def __init__(self, logFraction=0.1, corruptFraction=0.05, escapeFraction=0.02, seed=None):
+        self.logFraction = logFraction
+        self.corruptFraction = corruptFraction
+        self.escapeFraction = escapeFraction
+        self.random = random.Random(seed)
+
+    def makeHousekeepingPacket(self):
+        """
+        Purpose:
+            Make a MinXSS housekeeping packet (start sync through stop sync) with randomized but in-range telemetry
+        Input:
+            None
+        Output:
+            packet [bytearray]: housekeepingPacketLength bytes
+        """
+        packet = housekeepingSyncBytes + self.randomPayload(housekeepingPacketLength - 4) + stopSyncBytes
+        for offset in thermistorOffsets:
+            packet[offset] = self.random.randint(0, 1)
+            packet[offset + 1] = self.random.randint(1, 2)
+        return packet
+
+    def makeLogPacket(self):
+        """
+        Purpose:
+            Make a MinXSS log packet (start sync 0x08 0x1D through stop sync) with a random message
+        Input:
+            None
+        Output:
+            packet [bytearray]: logPacketLength bytes
+        """
+        messageId = self.random.randint(0, len(logMessages) - 1)
+        arguments = [self.random.randint(-1000, 1000) for _ in range(self.random.randint(0, 8))]
+        payload = bytearray(logPacketStruct.pack(self.random.randint(0, 0x3fff), logPacketLength, self.random.randint(1.1e9, 1.3e9),
+                                                 self.random.randint(0, 999), self.random.randint(0, 4), len(arguments), messageId,
+                                                 *(arguments + [0] * (8 - len(arguments)) + [logMessages[messageId].encode('ascii')])))
+        return logSyncBytes + self.clearSyncPatterns(payload) + stopSyncBytes
+
+    def randomPayload(self, length):
+        payload = bytearray(self.random.randint(0, 255) for _ in range(length))
+        for i in range(length):
+            if self.random.random() < self.escapeFraction:
+                payload[i] = self.random.choice([kissFend, kissFesc])
+        return self.clearSyncPatterns(payload)
+
+    def clearSyncPatterns(self, payload):
+        for i in range(len(payload)):
+            if payload[i:i + 2] in (stopSyncBytes, housekeepingSyncBytes, logSyncBytes):
+                payload[i] = 0x00  # Don't let the payload look like a sync pattern
+        if payload and payload[-1] == stopSyncBytes[0]:
+            payload[-1] = 0x00  # Nor run into the stop sync
+        return payload
+
+    def corrupt(self, frame):
+        """
+        Purpose:
+            Damage a KISS frame the way a noisy pass does
+        Input:
+            frame [bytearray]: A complete KISS frame
+        Output:
+            corruptedFrame [bytearray]: The frame with random bytes flipped, cut short, or missing its stop sync
+        """
+        frame = bytearray(frame)
+        damage = self.random.choice(['flip', 'truncate', 'dropStopSync'])
+        if damage == 'flip':
+            for _ in range(self.random.randint(1, 8)):
+                frame[self.random.randint(1, len(frame) - 2)] = self.random.randint(0, 255)
+        elif damage == 'truncate':
+            frame = frame[:self.random.randint(1, len(frame) - 1)]
+        else:
+            stopIndex = frame.rfind(stopSyncBytes)
+            if stopIndex != -1:
+                del frame[stopIndex:stopIndex + 2]
+        return frame
+
+    def nextFrame(self):
+        """
+        Purpose:
+            Make the next frame in the stream as it would come out of the TNC
+        Input:
+            None
+        Output:
+            kissFrame [bytearray]: A KISS frame (which may be a log packet or corrupted)
+        """
+        if self.random.random() < self.logFraction:
+            packet = self.makeLogPacket()
+        else:
+            packet = self.makeHousekeepingPacket()
+        frame = kissEncode(bytearray([kissDataFrame]) + ax25Header + packet)
+        if self.random.random() < self.corruptFraction:
+            frame = self.corrupt(frame)
+        return frame
+
+
+# Purpose:
+#   Send frames to a file descriptor or socket at a fixed rate, reporting the achieved rate periodically
+# Input:
+#   simulator [Beacon_Simulator]: Where the frames come from
+#   send [function]: Called with each frame's bytes
+#   rate [float]: Frames per second. 0 for as fast as possible.
+#   count [int]: Number of frames to send. None to send forever.
+# Output:
+#   framesSent [int]: How many frames were sent
+#
+def sendFrames(simulator, send, rate, count=None):
+    startTime = time.time()
+    lastReportTime = startTime
+    framesSent = 0
+    while count is None or framesSent < count:
+        if rate > 0:
+            dueTime = startTime + framesSent / float(rate)
+            delay = dueTime - time.time()
+            if delay > 0:
+                time.sleep(delay)
+        send(bytes(simulator.nextFrame()))
+        framesSent += 1
+        if time.time() - lastReportTime >= 5:
+            lastReportTime = time.time()
+            sys.stderr.write("Sent {0} frames, {1:.1f} frames/s\n".format(framesSent, framesSent / (lastReportTime - startTime)))
+    return framesSent
+
+
+# Purpose:
+#   Act like a TNC's TCP/IP server: accept clients (e.g., connect_socket) one at a time and stream frames to each
+# Input:
+#   simulator [Beacon_Simulator]: Where the frames come from
+#   host [string]: Address to listen on
+#   port [int]: Port to listen on
+#   rate [float]: Frames per second. 0 for as fast as possible.
+#   count [int]: Number of frames to send to each client. None to send forever.
+# Output:
+#   None
+#
+def serveTcp(simulator, host, port, rate, count=None):
+    serverSocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    serverSocket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    serverSocket.bind((host, port))
+    serverSocket.listen(1)
+    sys.stderr.write("Serving synthetic beacons on {0}:{1}\n".format(host, port))
+    while True:
+        clientSocket, clientAddress = serverSocket.accept()
+        sys.stderr.write("Client connected from {0}\n".format(clientAddress))
+        try:
+            sendFrames(simulator, clientSocket.sendall, rate, count)
+        except socket.error as error:
+            sys.stderr.write("Client disconnected: {0}\n".format(error))
+        finally:
+            clientSocket.close()
+
+
+# Purpose:
+#   Act like a TNC on a serial port: create a pseudo terminal (e.g., /dev/pts/3) that connect_serial can open, and stream frames into it
+# Input:
+#   simulator [Beacon_Simulator]: Where the frames come from
+#   rate [float]: Frames per second. 0 for as fast as possible.
+#   count [int]: Number of frames to send. None to send forever.
+# Output:
+#   None
+#
+def servePty(simulator, rate, count=None):
+    import tty  # Unix only
+    masterFd, slaveFd = os.openpty()
+    tty.setraw(slaveFd)  # No echo or newline translation; the reader must see the bytes exactly as sent
+    sys.stderr.write("Serving synthetic beacons on pseudo serial port {0}\n".format(os.ttyname(slaveFd)))
+
+    def send(frame):
+        while frame:
+            frame = frame[os.write(masterFd, frame):]
+
+    try:
+        sendFrames(simulator, send, rate, count)
+    finally:
+        os.close(masterFd)
+        os.close(slaveFd)
+
+
+def main(argv=None):
+    argumentParser = argparse.ArgumentParser(description="Serve synthetic MinXSS beacons for throughput testing")
+    argumentParser.add_argument('transport', choices=['tcp', 'pty', 'file'], help="Serve over a TCP socket, a pseudo serial port, or write to a .dat file")
+    argumentParser.add_argument('--host', default='localhost', help="TCP address to listen on")
+    argumentParser.add_argument('--port', type=int, default=10000, help="TCP port to listen on")
+    argumentParser.add_argument('--output', default='synthetic_beacons.dat', help="File to write for the file transport")
+    argumentParser.add_argument('--rate', type=float, default=None, help="Frames per second (0 for as fast as possible). Default is --speedup times the real MinXSS-2 beacon rate.")
+    argumentParser.add_argument('--speedup', type=float, default=1.0, help="Multiple of the real beacon rate (one every {0:g} s), e.g., 10 or 1000".format(minxss2BeaconPeriod))
+    argumentParser.add_argument('--count', type=int, default=None, help="Number of frames to send (default: forever, or 1000 for the file transport)")
+    argumentParser.add_argument('--log-fraction', type=float, default=0.1, help="Fraction of frames that are log packets")
+    argumentParser.add_argument('--corrupt-fraction', type=float, default=0.05, help="Fraction of frames that are corrupted")
+    argumentParser.add_argument('--seed', type=int, default=None, help="Random seed for a repeatable stream")
+    arguments = argumentParser.parse_args(argv)
+
+    simulator = Beacon_Simulator(arguments.log_fraction, arguments.corrupt_fraction, seed=arguments.seed)
+    rate = arguments.rate if arguments.rate is not None else arguments.speedup / minxss2BeaconPeriod
+    if arguments.transport == 'tcp':
+        serveTcp(simulator, arguments.host, arguments.port, rate, arguments.count)
+    elif arguments.transport == 'pty':
+        servePty(simulator, rate, arguments.count)
+    else:
+        with open(arguments.output, 'wb') as outputFile:
+            sendFrames(simulator, outputFile.write, 0, arguments.count or 1000)
+
+
+if __name__ == '__main__':
+    main()
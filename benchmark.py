@@ -0,0 +1,253 @@
+"""Benchmark each stage of the decoding pipeline and compare against a stored baseline to catch performance regressions"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import sys
+import json
+import time
+import shutil
+import socket
+import logging
+import platform
+import argparse
+import tempfile
+import threading
+import minxss_parser
+import beacon_pipeline
+import beacon_simulator
+import connect_port_get_packet
+import packet_dispatcher
+import frame_check
+import frame_dedup
+import latency_monitor
+import telemetry_schema
+
+
+# Purpose:
+#   Time a function, taking the best of several repeats so that noise from other processes doesn't count as a regression
+# Input:
+#   function [function]: Called with no arguments; should do `operations` units of work
+#   operations [int]: How many units of work one call does (e.g., packets)
+#   repeats [int]: How many times to call function
+# Output:
+#   result [dictionary]: secondsPerOperation (best repeat) and operationsPerSecond
+#
+def timeFunction(function, operations, repeats):
+    best = float('inf')
+    for _ in range(repeats):
+        startTime = time.time()
+        function()
+        best = min(best, time.time() - startTime)
+    secondsPerOperation = best / operations
+    return {'secondsPerOperation': secondsPerOperation, 'operationsPerSecond': 1.0 / max(secondsPerOperation, 1e-12)}
+
+
+# Purpose:
+#   Feed a stream of KISS frames into one end of a socket pair from a background thread
+# Input:
+#   frames [list of bytes]: The frames to send
+# Output:
+#   readSocket [socket]: The other end, to read from
+#
+def socketFeed(frames):
+    readSocket, writeSocket = socket.socketpair()
+
+    def send():
+        for frame in frames:
+            writeSocket.sendall(frame)
+        writeSocket.close()
+
+    threading.Thread(target=send).start()
+    return readSocket
+
+
+class Benchmarks():
+    """
+    Purpose:
+        The individual benchmarks, sharing a set of synthetic frames and a silent debug log
+    Input:
+        packets [int]: Number of packets each benchmark processes per repeat
+        repeats [int]: Number of repeats per benchmark (the best is kept)
+    Output:
+        N/A
+    """
+    def __init__(self, packets=2000, repeats=5):
+        self.packets = packets
+        self.repeats = repeats
+        self.log = logging.getLogger('minxss_benchmark')
+        self.log.addHandler(logging.NullHandler())
+        self.log.propagate = False
+        simulator = beacon_simulator.Beacon_Simulator(logFraction=0, corruptFraction=0, seed=0)
+        self.kissFrames = [bytes(simulator.nextFrame()) for _ in range(packets)]
+        self.packetsRead = [beacon_pipeline.decodeKiss(bytearray(frame[1:-1])) for frame in self.kissFrames]
+        self.outputDirectory = tempfile.mkdtemp(prefix='minxss_benchmark')
+
+    def close(self):
+        shutil.rmtree(self.outputDirectory, ignore_errors=True)
+
+    def findPacketStart(self):
+        dispatcher = packet_dispatcher.dispatcher
+        buffers = [bytearray(frame) for frame in self.kissFrames]
+
+        def run():
+            for buffer in buffers:
+                dispatcher.findStart(buffer)
+        return timeFunction(run, self.packets, self.repeats)
+
+    def readPacket(self):
+        def run():
+            link = connect_port_get_packet.connect_socket(None, None, self.log, clientsocket=socketFeed(self.kissFrames))
+            for _ in range(self.packets):
+                link.read_packet()
+            link.close()
+        return timeFunction(run, self.packets, self.repeats)
+
+    def decodeKiss(self):
+        buffers = [bytearray(frame) for frame in self.kissFrames]
+
+        def run():
+            for buffer in buffers:
+                beacon_pipeline.decodeKiss(buffer)
+        return timeFunction(run, self.packets, self.repeats)
+
+    def parsePacket(self):
+        parser = minxss_parser.Minxss_Parser(None, self.log)
+
+        def run():
+            for packet in self.packetsRead:
+                parser.parsePacket(packet)
+        return timeFunction(run, self.packets, self.repeats)
+
+    def tempCalc(self):
+        thermistorBytes = [packet[packet.find(beacon_pipeline.startSyncBytes) + 11:][:2] for packet in self.packetsRead]
+
+        def run():
+            for bytearrayTemp in thermistorBytes:
+                telemetry_schema.thermistorTemperature(bytearrayTemp, 0)
+        return timeFunction(run, self.packets, self.repeats)
+
+    def frameCheck(self):
+        def run():
+            for packet in self.packetsRead:
+                frame_check.crc16X25.compute(packet)
+        return timeFunction(run, self.packets, self.repeats)
+
+    def frameCheckBulk(self):
+        length = min(len(packet) for packet in self.packetsRead)
+
+        def run():
+            frame_check.crc16X25.computeBulk(frame_check.stackPackets(self.packetsRead, length))
+        return timeFunction(run, self.packets, self.repeats)
+
+    def dedup(self):
+        frames = [bytearray(frame) for frame in self.kissFrames]
+
+        def run():
+            dedupCache = frame_dedup.Dedup_Cache(self.packets)
+            for frame in frames:
+                dedupCache.isDuplicate(frame, 18)
+        return timeFunction(run, self.packets, self.repeats)
+
+    def outputLogWrite(self):
+        def run():
+            outputLog = beacon_pipeline.Output_Log('0', '0', self.log, self.outputDirectory)
+            for packet in self.packetsRead:
+                outputLog.write(packet)
+        return timeFunction(run, self.packets, self.repeats)
+
+    def endToEnd(self, monitor=None):
+        monitor = monitor or latency_monitor.Latency_Monitor(False)
+
+        def run():
+            link = connect_port_get_packet.connect_socket(None, None, self.log, clientsocket=socketFeed(self.kissFrames))
+            outputLog = beacon_pipeline.Output_Log('0', '0', self.log, self.outputDirectory)
+            for _ in range(self.packets):
+                bufferData = link.read_packet()
+                stamps = monitor.startFrame(link)
+                bufferData = beacon_pipeline.decodeKiss(bufferData)
+                monitor.stamp(stamps, 'kissDecoded')
+                formattedBufferData = beacon_pipeline.formatBufferData(bufferData)
+                outputLog.write(bufferData, formattedBufferData)
+                monitor.stamp(stamps, 'persisted')
+                beacon_pipeline.parsePacket(bufferData, self.log)
+                monitor.stamp(stamps, 'parsed')
+                monitor.finishFrame(stamps)
+            link.close()
+        return timeFunction(run, self.packets, self.repeats)
+
+    def endToEndMonitored(self):
+        return self.endToEnd(latency_monitor.Latency_Monitor())
+
+    def latencyMonitor(self):
+        monitor = latency_monitor.Latency_Monitor(sampleSpacing=0)  # Every frame timed: the cost of one timed frame
+        link = connect_port_get_packet.connect_socket(None, None, self.log, clientsocket=socket.socket())
+        link.receiveTimes = latency_monitor.Receive_Times(latency_monitor.receiveClock(), latency_monitor.receiveClock())
+
+        def run():
+            for _ in range(self.packets):
+                stamps = monitor.startFrame(link)
+                monitor.stamp(stamps, 'kissDecoded')
+                monitor.stamp(stamps, 'persisted')
+                monitor.stamp(stamps, 'parsed')
+                monitor.stamp(stamps, 'rendered')
+                monitor.finishFrame(stamps)
+        return timeFunction(run, self.packets, self.repeats)
+
+    names = ['findPacketStart', 'readPacket', 'decodeKiss', 'parsePacket', 'tempCalc', 'frameCheck', 'frameCheckBulk', 'dedup', 'outputLogWrite', 'latencyMonitor', 'endToEnd', 'endToEndMonitored']
+
+
+# Purpose:
+#   Find the benchmarks that got slower than the baseline by more than the threshold
+# Input:
+#   results [dictionary]: Benchmark name -> result from this run
+#   baseline [dictionary]: Benchmark name -> result from the stored baseline
+#   threshold [float]: Allowed fractional slowdown, e.g., 0.2 for 20%
+# Output:
+#   regressions [list of (string, float)]: Benchmark name and fractional slowdown
+#
+def findRegressions(results, baseline, threshold):
+    regressions = []
+    for name, result in sorted(results.items()):
+        if name in baseline:
+            slowdown = result['secondsPerOperation'] / baseline[name]['secondsPerOperation'] - 1
+            if slowdown > threshold:
+                regressions.append((name, slowdown))
+    return regressions
+
+
+def main(argv=None):
+    argumentParser = argparse.ArgumentParser(description="Benchmark the MinXSS decoding pipeline stage by stage")
+    argumentParser.add_argument('benchmarks', nargs='*', help="Which benchmarks to run (default: all of {0})".format(', '.join(Benchmarks.names)))
+    argumentParser.add_argument('--packets', type=int, default=2000, help="Packets per repeat")
+    argumentParser.add_argument('--repeats', type=int, default=5, help="Repeats per benchmark (the best is kept)")
+    argumentParser.add_argument('--output', help="Write the results to this JSON file")
+    argumentParser.add_argument('--baseline', help="Compare against the results in this JSON file")
+    argumentParser.add_argument('--threshold', type=float, default=0.2, help="Fail if any benchmark is this fraction slower than the baseline")
+    arguments = argumentParser.parse_args(argv)
+
+    benchmarks = Benchmarks(arguments.packets, arguments.repeats)
+    results = {}
+    try:
+        for name in arguments.benchmarks or Benchmarks.names:
+            results[name] = getattr(benchmarks, name)()
+            print("{0:20s} {1:10.2f} us/packet {2:12.0f} packets/s".format(name, results[name]['secondsPerOperation'] * 1e6, results[name]['operationsPerSecond']))
+    finally:
+        benchmarks.close()
+
+    if arguments.output:
+        with open(arguments.output, 'w') as outputFile:
+            json.dump({'python': platform.python_version(), 'platform': platform.platform(), 'packets': arguments.packets, 'results': results},
+                      outputFile, indent=2, sort_keys=True)
+
+    if arguments.baseline:
+        with open(arguments.baseline, 'r') as baselineFile:
+            baseline = json.load(baselineFile)['results']
+        regressions = findRegressions(results, baseline, arguments.threshold)
+        for name, slowdown in regressions:
+            print("REGRESSION: {0} is {1:.0f}% slower than the baseline".format(name, slowdown * 100))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
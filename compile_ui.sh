@@ -1,3 +1,3 @@
 #!/bin/bash
-pyside-uic -o ui_mainWindow.py ui_mainWindow.ui
 pyside-rcc -o QtAssets_rc.py assets/QtAssets.qrc 
+rcc -binary -o assets/QtAssets.rcc assets/QtAssets.qrc
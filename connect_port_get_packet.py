@@ -4,78 +4,84 @@ __contact__ = "jmason86@gmail.com"
 
 import sys
 import time
+import errno
+import random
 import serial
 import socket
+import threading
 import pdb, binascii
+try:
+    import queue
+except ImportError:
+    import Queue as queue  # python 2
+try:
+    import selectors  # python 3.4+
+except ImportError:
+    selectors = None
+import beacon_pipeline
+import packet_dispatcher
+import latency_monitor
+import pipeline_metrics
+
+connectTimeout = 10.0  # [s] To give up on one attempt to connect to a TNC's TCP/IP server
+initialReconnectDelay = 0.5  # [s] Before the first attempt to reconnect a lost link; doubles with each failed attempt
+maxReconnectDelay = 30.0  # [s] Longest wait between attempts to reconnect
+idleTimeout = 0.5  # [s] Longest a read waits for bytes before returning empty (so the reading loop can check whether it should stop)
+socketReadSize = 65536  # [bytes] Most to take from a socket in one read
 
 class connect_serial():
-    def __init__(self, port, baudRate, log):
+    def __init__(self, port, baudRate, log, dedupCache=None):
         self.port = port
         self.baudRate = baudRate
         self.log = log
+        self.name = str(port)
         self.log.info("Opening port: {0}".format(port))
-        self.ser = serial.Serial(port, baudRate, timeout=.01)
+        self.receiveTimes = None  # latency_monitor.Receive_Times of the packet read_packet last returned
+        self.scanner = packet_dispatcher.Frame_Scanner(log)
+        self.dedupCache = dedupCache  # frame_dedup.Dedup_Cache to drop packets already received. None to keep them all.
+        self.duplicateFrames = 0
+        self.closeEvent = threading.Event()  # Set by close, e.g., to stop reconnecting
+        self.downtime = 0.0  # [s] Spent reconnecting
+        self.openTransport()
         #self.ser.flushInput()
 
         if (not self.ser.readable()):
             raise Exception("Port not readable")
 
+    def openTransport(self):
+        self.ser = serial.Serial(self.port, self.baudRate, timeout=idleTimeout)
+        self.selector = createSelector(self.ser, getattr(self, 'selector', None))
+        if self.selector is not None:
+            self.ser.timeout = 0  # The selector does the waiting, so reads return right away with whatever has arrived
+
+    def closeTransport(self):
+        self.ser.close()
+
+    def canReconnect(self):
+        return True
+
     def close(self):
         self.log.info("Closing ground station link")
-        self.ser.close
+        self.closeEvent.set()
+        self.closeTransport()
     
     # Purpose:
     #   From all of the binary coming in, grab a single MinXSS packet
     # Input:
     #   None
     # Output:
-    #   packet [bytearray]: A single MinXSS packet with all headers and footers
+    #   packet [bytearray]: A single MinXSS packet with all headers and footers. Empty if nothing arrived within idleTimeout.
+    #                       If the port is lost (e.g., the TNC is unplugged), waits until it can be reopened.
     def read_packet(self):
-        packet = bytearray()
-        bufferedData = bytearray()
-        
-        foundSyncStartIndex = 0
-        foundSyncStopIndex = 0
-        while(foundSyncStartIndex == 0 and foundSyncStopIndex == 0):
-            if self.findSyncStartIndex(bufferedData) != -1:
-                foundSyncStartIndex = 1
-            if self.findSyncStopIndex(bufferedData) != -1:
-                foundSyncStopIndex = 1
-
-            bufferedData = self.ser.read()
-            for byte in bufferedData:
-                packet.append(byte)
-
-            if len(packet) > 500: # Assuming that there's no way to have this much header on the 254 byte MinXSS packet
-                self.log.error("Too many bytes in packet")
-                break
-                    
-        self.log.info("Packet length [bytes] = " + str(len(packet)))
-        return packet
-
-# Purpose:
-    #   Find the start of the MinXSS packet and return the index within minxssSerialData
-    # Input:
-    #   minxssSerialData [bytearray]: The direct output of the python serial line (connect_serial_decode_kiss.read()), or simulated data in that format
-    # Output:
-    #   packetStartIndex [int]: The index within minxssSerialData where the start sync bytes were found. -1 if not found.
-    #
-    def findSyncStartIndex(self, minxssSerialData):
-        syncBytes = bytearray([0x08, 0x19])
-        packetStartIndex = bytearray(minxssSerialData).find(syncBytes)
-        return packetStartIndex
+        return readFramed(self)
 
-    # Purpose:
-    #   Find the end of the MinXSS packet and return the index within minxssSerialData
-    # Input:
-    #   minxssSerialData [bytearray]: The direct output of the python serial line (connect_serial_decode_kiss.read()), or simulated data in that format
-    # Output:
-    #   packetStopIndex [int]: The index within minxssSerialData where the end sync bytes were found. -1 if not found.
-    #
-    def findSyncStopIndex(self, minxssSerialData):
-        syncBytes = bytearray([0xa5, 0xa5])
-        packetStopIndex = bytearray(minxssSerialData).find(syncBytes)
-        return packetStopIndex
+    def readBytes(self):
+        if self.selector is not None:
+            if not self.selector.select(idleTimeout):
+                return bytes()
+            return self.ser.read(max(self.ser.in_waiting, 1))  # Everything that has arrived
+        data = self.ser.read(1)  # No selector (e.g., on Windows): waits up to idleTimeout for the first byte
+        return data + self.ser.read(self.ser.in_waiting) if data else data
 
     def testRead(self):
         self.log.info("Testing read on port: {0}".format(self.port))
@@ -88,102 +94,427 @@ class connect_serial():
         return portReadable
 
 class connect_socket():
-    def __init__(self, ipAddress, port, log):
+    def __init__(self, ipAddress, port, log, clientsocket=None, dedupCache=None):
         self.ipAddress = ipAddress
         self.port = port
         self.log = log
+        self.name = "{0}:{1}".format(ipAddress, port)
         self.log.info("Opening IP address: {0} on port: {1}".format(ipAddress, port))
+        self.receiveTimes = None  # latency_monitor.Receive_Times of the packet read_packet last returned
+        self.scanner = packet_dispatcher.Frame_Scanner(log)
+        self.dedupCache = dedupCache  # frame_dedup.Dedup_Cache to drop packets already received. None to keep them all.
+        self.duplicateFrames = 0
+        self.closeEvent = threading.Event()  # Set by close, e.g., to stop reconnecting
+        self.downtime = 0.0  # [s] Spent reconnecting
+
+        if clientsocket is None:
+            self.openTransport()
+        else:
+            self.clientsocket = clientsocket  # Already connected, e.g., one end of a socket.socketpair() for testing
+            self.setupSocket()
+
+    def openTransport(self):
+        self.clientsocket = socket.create_connection((self.ipAddress, int(self.port)), connectTimeout)
+        self.setupSocket()
+
+    def setupSocket(self):
+        self.selector = createSelector(self.clientsocket, getattr(self, 'selector', None))
+        if self.selector is not None:
+            self.clientsocket.setblocking(False)  # The selector does the waiting
+        else:
+            self.clientsocket.settimeout(idleTimeout)
+
+    def closeTransport(self):
+        try:
+            self.clientsocket.shutdown(socket.SHUT_RDWR)  # Wakes up a thread waiting in recv
+        except socket.error:
+            pass  # Not connected anymore
+        self.clientsocket.close()
+
+    def canReconnect(self):
+        return self.ipAddress is not None  # Not a socket handed in already connected
 
-        self.clientsocket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-        self.clientsocket.connect((ipAddress, int(port)))
-    
     def close(self):
         self.log.info("Closing ground station link")
-        self.clientsocket.close()
+        self.closeEvent.set()
+        self.closeTransport()
     
     # Purpose:
     #   From all of the binary coming in, grab a single MinXSS packet
     # Input:
     #   None
     # Output:
-    #   packet [bytearray]: A single MinXSS packet with all headers and footers
+    #   packet [bytearray]: A single MinXSS packet with all headers and footers. Empty if nothing arrived within idleTimeout.
+    #                       If the connection is lost (e.g., the TNC's server restarts), waits until it can be reconnected.
     #
     def read_packet(self):
-        packet = bytearray()
-        bufferedData = bytearray()
-        
-        foundSyncStartIndex = 0
-        foundSyncStopIndex = 0
-        foundLogPacket = 0
-        while((foundSyncStartIndex + foundSyncStopIndex) < 2):
-            bufferedData = bytearray(self.clientsocket.recv(1))
-            for byte in bufferedData:
-                packet.append(byte)
-            
-            if self.findLogSyncStartIndex(packet) != -1:
-                foundLogPacket = 1
-            if self.findSyncStartIndex(packet) != -1:
-                foundSyncStartIndex = 1
-            if self.findSyncStopIndex(packet) != -1: # once at len(packet) > e.g., 64 then check for sync
-                if foundLogPacket == 1:
-                    self.log.info("Found log message. Ignoring in search of housekeeping packet.")
-                    packet = bytearray() # Clear out the packet because its a log message not a housekeeping packet
-                else:
-                    foundSyncStopIndex = 1
-            if foundSyncStartIndex + foundSyncStopIndex == 2:
-                if self.findSyncStartIndex(packet) > self.findSyncStopIndex(packet):
-                    packet = packet[self.findSyncStartIndex(packet):]
-                    foundSyncStopIndex = 0
-        
-            if len(packet) > 500: # Assuming that there's no way to have this much header on the 254 byte MinXSS packet
-                self.log.error("Too many bytes in packet, resetting packet buffer")
-                
-                if foundSyncStartIndex:
-                    self.log.info("Resetting packet buffer to start at the identified start sync index")
-                    packet = packet[self.findSyncStartIndex(packet):]
-                else:
-                    self.log.info("Resetting packet buffer to null")
-                    packet = bytearray()
-
-        self.log.info("Packet length [bytes] = " + str(len(packet)))
-        return packet
-    
+        return readFramed(self)
+
+    def readBytes(self):
+        if self.selector is not None and not self.selector.select(idleTimeout):
+            return bytes()
+        try:
+            data = self.clientsocket.recv(socketReadSize)  # Everything that has arrived
+        except socket.timeout:
+            return bytes()
+        except socket.error as error:
+            if error.errno in (errno.EAGAIN, errno.EWOULDBLOCK):
+                return bytes()  # Woken up without anything to read after all
+            raise
+        if not data:
+            raise EOFError("Connection closed by {0}".format(self.name))
+        return data
+
+class connect_replay():
     # Purpose:
-    #   Find the start of the MinXSS packet and return the index within minxssSerialData
+    #   Play back a recorded .dat (binary) or .txt (human-readable hex) log as if it were arriving from the radio
     # Input:
-    #   minxssSerialData [bytearray]: The direct output of the python serial line (connect_serial_decode_kiss.read()), or simulated data in that format
+    #   filename [string]: The log to replay
+    #   log [logging.Logger]: The debug log
+    #   speed [float]: 1 for real time, N for N times faster, 0 for as fast as possible
+    #   beaconPeriod [float]: Seconds between beacons at real time (the logs don't record arrival times). MinXSS-2 beacons every 9 s.
+    #   loop [bool]: Start over at the end of the log instead of stopping
+    #
+    def __init__(self, filename, log, speed=1.0, beaconPeriod=9.0, loop=False):
+        self.filename = filename
+        self.log = log
+        self.speed = float(speed)
+        self.beaconPeriod = beaconPeriod
+        self.loop = loop
+        self.log.info("Opening replay of: {0} at speed: {1}".format(filename, speed))
+        self.packets = [packet for _, packet in beacon_pipeline.splitPackets(beacon_pipeline.readLogBytes(filename))]
+        if not self.packets:
+            raise Exception("No packets found in replay file")
+        self.packetIndex = 0
+        self.packetsRead = 0
+        self.startTime = None
+        self.startCpuTime = None
+        self.receiveTimes = None  # latency_monitor.Receive_Times of the packet read_packet last returned
+
+    def close(self):
+        self.log.info("Closing replay")
+        self.logStatistics()
+
+    # Purpose:
+    #   Return the next packet from the log, waiting until it is due if the replay is throttled
+    # Input:
+    #   None
     # Output:
-    #   packetStartIndex [int]: The index within minxssSerialData where the start sync bytes were found. -1 if not found.
+    #   packet [bytearray]: A single MinXSS packet. Raises EOFError at the end of the log unless looping.
     #
-    def findSyncStartIndex(self, minxssSerialData):
-        syncBytes = bytearray([0x08, 0x19]) # Other Cubesats: Change these start sync bytes to whatever you are using to define the start of your packet
-        packetStartIndex = bytearray(minxssSerialData).find(syncBytes)
-        return packetStartIndex
+    def read_packet(self):
+        if self.startTime is None:
+            self.startTime = time.time()
+            self.startCpuTime = processTime()
+        if self.packetIndex >= len(self.packets):
+            if not self.loop:
+                self.log.info("Reached end of replay")
+                raise EOFError("End of replay file")
+            self.packetIndex = 0
+
+        if self.speed > 0:
+            dueTime = self.startTime + self.packetsRead * self.beaconPeriod / self.speed
+            delay = dueTime - time.time()
+            if delay > 0:
+                time.sleep(delay)
+
+        readTime = latency_monitor.receiveClock()  # The log doesn't say when packets arrived, so it's when they're replayed
+        self.receiveTimes = latency_monitor.Receive_Times(readTime, readTime)
+        packet = self.packets[self.packetIndex]
+        pipeline_metrics.increment('bytes_read', len(packet))  # The replay's equivalent of a read from the radio
+        self.packetIndex += 1
+        self.packetsRead += 1
+        if self.packetsRead % 1000 == 0:
+            self.logStatistics()
+        if packet_dispatcher.dispatcher.route(packet, self.log, self.receiveTimes):  # e.g., a log packet, which isn't returned
+            return bytearray()
+        countPacket(packet)
+        return bytearray(packet)
 
     # Purpose:
-    #   Find the end of the MinXSS packet and return the index within minxssSerialData
+    #   Measure how fast the whole pipeline is consuming replayed packets
     # Input:
-    #   minxssSerialData [bytearray]: The direct output of the python serial line (connect_serial_decode_kiss.read()), or simulated data in that format
+    #   None
     # Output:
-    #   packetStopIndex [int]: The index within minxssSerialData where the end sync bytes were found. -1 if not found.
+    #   statistics [dictionary]: packets, elapsed [s], packetsPerSecond, cpuPerPacket [s of process CPU time per packet]
     #
-    def findSyncStopIndex(self, minxssSerialData):
-        syncBytes = bytearray([0xa5, 0xa5]) # Other CubeSats: Change these stop sync bytes to whatever you are using to define the end of your packet
-        packetStopIndex = bytearray(minxssSerialData).find(syncBytes)
-        return packetStopIndex
+    def getStatistics(self):
+        if self.startTime is None or self.packetsRead == 0:
+            return {'packets': 0, 'elapsed': 0.0, 'packetsPerSecond': 0.0, 'cpuPerPacket': 0.0}
+        elapsed = max(time.time() - self.startTime, 1e-9)
+        return {'packets': self.packetsRead, 'elapsed': elapsed, 'packetsPerSecond': self.packetsRead / elapsed,
+                'cpuPerPacket': (processTime() - self.startCpuTime) / self.packetsRead}
+
+    def logStatistics(self):
+        statistics = self.getStatistics()
+        self.log.info("Replay: {0} packets in {1:.1f} s = {2:.1f} packets/s, {3:.3f} ms CPU per packet".format(
+            statistics['packets'], statistics['elapsed'], statistics['packetsPerSecond'], statistics['cpuPerPacket'] * 1e3))
+
+    def testRead(self):
+        return len(self.packets) > 0
+
+class connect_multiple():
+    """
+    Purpose:
+        Read several links at once (e.g., TNCs on different antennas or polarizations) and merge their packets into one
+        stream. Each link is read on its own thread, so a quiet or slow link doesn't hold up the others. The links share
+        one duplicate cache, so a packet heard on more than one link is only returned the first time it arrives.
+    Input:
+        links [list of connect_serial or connect_socket]: The open links
+        log [logging.Logger]: The debug log
+        dedupCache [frame_dedup.Dedup_Cache]: The cache the links share. None to keep every packet from every link.
+    Output:
+        N/A
+    """
+    def __init__(self, links, log, dedupCache):
+        self.links = links
+        self.log = log
+        self.dedupCache = dedupCache
+        self.receiveTimes = None  # latency_monitor.Receive_Times of the packet read_packet last returned
+        self.packets = queue.Queue()
+        self.stopEvent = threading.Event()
+        self.frameCounts = dict((link.name, 0) for link in links)
+        self.threads = []
+        for link in links:
+            link.dedupCache = self.dedupCache
+            thread = threading.Thread(target=self.readLink, args=(link,), name="MinXSS link {0}".format(link.name))
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def readLink(self, link):
+        """
+        Purpose:
+            Reading thread for one link: queue up every packet it returns until closed
+        Input:
+            link [connect_serial or connect_socket]: The link
+        Output:
+            None
+        """
+        while not self.stopEvent.is_set():
+            try:
+                packet = link.read_packet()
+            except Exception as error:
+                if not self.stopEvent.is_set():
+                    self.log.error("Stopped reading {0}: {1}".format(link.name, error))
+                return
+            if packet:
+                self.packets.put((link.name, packet, link.receiveTimes))
 
     # Purpose:
-    #   Find the start of the MinXSS log packet and return the index within minxssSerialData. Will want to throw out these types of packets
-    #   because they don't contain any housekeeping telemetry.
+    #   Return the next packet heard on any of the links (each link has already dropped any heard first on another)
     # Input:
-    #   minxssSerialData [bytearray]: The direct output of the python serial line (connect_serial_decode_kiss.read()), or simulated data in that format
+    #   None
     # Output:
-    #   logPacketStartIndex [int]: The index within minxssSerialData where the start sync bytes were found. -1 if not found.
+    #   packet [bytearray]: A single MinXSS packet with all headers and footers. Empty if none arrived within a tenth of a second.
     #
-    def findLogSyncStartIndex(self, minxssSerialData):
-        syncBytes = bytearray([0x08, 0x1D])
-        logPacketStartIndex = bytearray(minxssSerialData).find(syncBytes)
-        return logPacketStartIndex
+    def read_packet(self):
+        try:
+            linkName, packet, receiveTimes = self.packets.get(timeout=0.1)
+        except queue.Empty:
+            return bytearray()
+        self.frameCounts[linkName] += 1
+        self.receiveTimes = receiveTimes
+        return packet
+
+    def getStatistics(self):
+        """
+        Purpose:
+            Count what each link has contributed
+        Input:
+            None
+        Output:
+            statistics [dictionary]: Link name -> {'frames': packets returned first from that link, 'duplicates': packets
+                                     dropped because they had already been received, on that link or another, 'downtime':
+                                     seconds spent reconnecting}
+        """
+        return dict((link.name, {'frames': self.frameCounts[link.name], 'duplicates': link.duplicateFrames, 'downtime': link.downtime})
+                    for link in self.links)
+
+    def summary(self, separator="; "):
+        return separator.join("{0}: {1} frames, {2} duplicates, {3:.0f} s down".format(linkName, counts['frames'], counts['duplicates'], counts['downtime'])
+                              for linkName, counts in sorted(self.getStatistics().items()))
+
+    def close(self):
+        self.stopEvent.set()
+        for link in self.links:
+            link.close()
+        for thread in self.threads:
+            thread.join(1.0)
+        self.log.info("Links: " + self.summary())
+
+    def testRead(self):
+        return all(link.testRead() for link in self.links if hasattr(link, 'testRead'))
+
+
+# Purpose:
+#   Open a link described by a string, e.g., from the additionalLinks setting or the command line
+# Input:
+#   linkSpec [string]: tcp://IP_ADDRESS:PORT for a TNC's TCP/IP server, otherwise a serial port name optionally followed by
+#                      @BAUD_RATE (e.g., /dev/ttyUSB1@9600 or COM4)
+#   baudRate [int]: Baud rate for a serial port that doesn't give one
+#   log [logging.Logger]: The debug log
+#   dedupCache [frame_dedup.Dedup_Cache]: To drop packets already received. None to keep them all.
+# Output:
+#   link [connect_serial or connect_socket]: The open link
+#
+def openLinkSpec(linkSpec, baudRate, log, dedupCache=None):
+    linkSpec = linkSpec.strip()
+    if linkSpec.startswith('tcp://'):
+        ipAddress, port = linkSpec[len('tcp://'):].rsplit(':', 1)
+        return connect_socket(ipAddress, port, log, dedupCache=dedupCache)
+    if '@' in linkSpec:
+        linkSpec, baudRate = linkSpec.rsplit('@', 1)
+    return connect_serial(linkSpec, baudRate, log, dedupCache)
+
+
+# Purpose:
+#   Read from a link until its Frame_Scanner has a complete frame, dropping frames already received (if the link has a
+#   dedupCache), handing frames of packet types that have a handler (e.g., log packets) to it and returning the first one
+#   that goes down the telemetry pipeline. If the link is lost, reconnect it and carry on.
+# Input:
+#   link [connect_serial or connect_socket]: The link, with its scanner and readBytes, which waits up to idleTimeout for
+#                                            bytes, returns all that have arrived (empty if none) and raises if the link is lost
+# Output:
+#   packet [bytearray]: A single MinXSS packet with all headers and footers. Empty if a read returned nothing first.
+#                       Raises EOFError once the link is closed, or if it's lost and can't be reconnected.
+#
+def readFramed(link):
+    while True:
+        frame, packetType, syncOffset = link.scanner.nextFrame()
+        if frame is None:
+            if link.closeEvent.is_set():
+                raise EOFError("Link closed")
+            try:
+                bufferedData = link.readBytes()
+            except (EOFError, IOError, OSError) as error:  # socket.error and serial.SerialException are IOErrors
+                reconnect(link, error)
+                continue
+            if not bufferedData:
+                return bytearray()
+            link.lastReadTime = latency_monitor.receiveClock()  # Right away, so processing doesn't count as receiving
+            pipeline_metrics.increment('bytes_read', len(bufferedData))
+            if link.scanner.packetType is None:  # No packet has started yet, so this read may hold the next one's first bytes
+                link.bufferStartTime = link.lastReadTime
+            link.scanner.feed(bufferedData)
+            continue
+
+        # When this frame's first and last bytes were read (any bytes after it arrived with the last read)
+        link.receiveTimes = latency_monitor.Receive_Times(getattr(link, 'bufferStartTime', None) or link.lastReadTime, link.lastReadTime)
+        link.bufferStartTime = link.lastReadTime if link.scanner.buffer else None
+        if link.dedupCache is not None and link.dedupCache.isDuplicate(frame, syncOffset, link.receiveTimes.lastByteMonotonic):
+            link.duplicateFrames += 1
+            link.log.debug("Dropped a %s packet from %s that was already received", packetType.name, link.name)
+            continue
+        if packetType.handler is not None:
+            packetType.handler(frame, syncOffset, link.log, link.receiveTimes)
+            continue
+        link.log.debug("Packet length [bytes] = %d", len(frame))
+        countPacket(frame)
+        return frame
+
+
+# Purpose:
+#   Make a selector that wakes up when a serial port or socket has bytes to read, so a link can sleep until data arrives
+#   and then take all of it, rather than waking up to poll
+# Input:
+#   transport [serial.Serial or socket.socket]: The open port or socket
+#   oldSelector [selectors.BaseSelector]: The selector for the link's previous transport (e.g., before reconnecting), to close. None if none.
+# Output:
+#   selector [selectors.BaseSelector]: Registered to read transport. None if it can't be waited on (python 2, or a
+#                                      serial port on Windows), in which case reads wait with a timeout instead.
+#
+def createSelector(transport, oldSelector=None):
+    if oldSelector is not None:
+        oldSelector.close()
+    if selectors is None:
+        return None
+    try:
+        transport.fileno()
+    except (AttributeError, IOError, OSError, ValueError):
+        return None
+    selector = selectors.DefaultSelector()
+    try:
+        selector.register(transport, selectors.EVENT_READ)
+    except (IOError, OSError, ValueError):  # e.g., select() on Windows only takes sockets
+        selector.close()
+        return None
+    return selector
+
+
+# Purpose:
+#   Reopen a lost link, waiting longer after each failed attempt (with jitter, so stations that lost the same server don't
+#   all retry at once). The link's scanner is kept, so a frame that was partly received can still be completed.
+# Input:
+#   link [connect_serial or connect_socket]: The lost link
+#   error [Exception]: What went wrong, for the debug log
+# Output:
+#   None. Raises EOFError if the link was closed (before or while reconnecting) or can't be reconnected.
+#
+def reconnect(link, error):
+    if link.closeEvent.is_set():
+        raise EOFError("Link closed")
+    if not link.canReconnect():
+        raise EOFError("Lost {0}: {1}".format(link.name, error))
+    link.log.warning("Lost {0}: {1}. Reconnecting".format(link.name, error))
+    pipeline_metrics.increment('link_disconnects')
+    try:
+        link.closeTransport()
+    except (IOError, OSError):
+        pass
+    lostTime = tallyTime = time.time()
+    attempt = 0
+    while True:
+        stopping = link.closeEvent.wait(reconnectDelay(attempt))  # Sleeps rather than spinning, but wakes up on close
+        currentTime = time.time()
+        link.downtime += currentTime - tallyTime  # Counted as it goes, so the metrics show an outage that hasn't ended
+        pipeline_metrics.increment('link_downtime_seconds', currentTime - tallyTime)
+        tallyTime = currentTime
+        if stopping:
+            raise EOFError("Link closed while reconnecting")
+        try:
+            link.openTransport()
+            break
+        except (IOError, OSError) as error:
+            attempt += 1
+            link.log.debug("Attempt %d to reconnect %s failed: %s", attempt, link.name, error)
+    pipeline_metrics.increment('link_reconnects')
+    link.log.info("Reconnected to {0} after {1:.1f} s".format(link.name, time.time() - lostTime))
+
+
+# Purpose:
+#   How long to wait before an attempt to reconnect: exponential backoff, jittered between half and all of it
+# Input:
+#   attempt [int]: Number of failed attempts so far
+# Output:
+#   delay [float]: Seconds to wait
+#
+def reconnectDelay(attempt):
+    delay = min(initialReconnectDelay * 2 ** min(attempt, 16), maxReconnectDelay)
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+# Purpose:
+#   Count a packet returned by read_packet in the metrics (the bytes read from the link are counted as they're read)
+# Input:
+#   packet [bytearray]: What read_packet is about to return
+# Output:
+#   None
+#
+def countPacket(packet):
+    if packet:
+        pipeline_metrics.increment('frames_found')
+        pipeline_metrics.increment('frame_bytes', len(packet))
+
+
+# Purpose:
+#   CPU time used by this process (all threads), in seconds
+#
+def processTime():
+    if hasattr(time, 'process_time'):
+        return time.process_time()
+    return time.clock()  # python 2
+
 
 def testReadMain(port, baudRate, log):
     log.info("Opening port: {0}".format(port))
@@ -3,15 +3,23 @@ __authors__ = "James Paul Mason"
 __contact__ = "jmason86@gmail.com"
 
 import requests
+import pipeline_metrics
 
 def upload(filename, log):
     # Server settings
     url = 'http://lasp.colorado.edu/minxss/beacon/fileupload.php'
     
-    # Access the file
-    fileToSend = {'filename': (filename, open(filename, 'rb'))}
+    pipeline_metrics.increment('uploads_started')
+    try:
+        # Access the file
+        fileToSend = {'filename': (filename, open(filename, 'rb'))}
 
-    # Send the file
-    r = requests.post(url, files = fileToSend)
+        # Send the file
+        r = requests.post(url, files = fileToSend)
+    except Exception:
+        pipeline_metrics.increment('upload_failures')
+        raise
+    finally:
+        pipeline_metrics.increment('uploads_finished')
 
     log.info(r.text)
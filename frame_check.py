@@ -0,0 +1,109 @@
+"""Table-driven CRCs for checking frame integrity: the AX.25 frame check sequence and packet-level checksums, one frame at a
+time as frames arrive or vectorized over a whole archive at once"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import numpy
+
+
+class Crc_Algorithm():
+    """
+    Purpose:
+        A 16-bit CRC, computed a byte at a time from a 256-entry table made once, instead of 8 shift-and-xor steps per byte
+    Input:
+        name [string]: e.g., 'crc16X25'
+        polynomial [int]: The generator polynomial (bit reversed if reflected)
+        initialValue [int]: The CRC register's starting value
+        finalXor [int]: Xored into the register at the end
+        reflected [bool]: Whether bytes are fed in least significant bit first (as AX.25 sends them)
+    Output:
+        N/A
+    """
+    def __init__(self, name, polynomial, initialValue, finalXor, reflected):
+        self.name = name
+        self.initialValue = initialValue
+        self.finalXor = finalXor
+        self.reflected = reflected
+        self.table = [self.tableEntry(polynomial, byte) for byte in range(256)]
+        self.numpyTable = numpy.array(self.table, dtype=numpy.uint16)
+
+    def tableEntry(self, polynomial, byte):
+        if self.reflected:
+            crc = byte
+            for _ in range(8):
+                crc = (crc >> 1) ^ polynomial if crc & 1 else crc >> 1
+        else:
+            crc = byte << 8
+            for _ in range(8):
+                crc = ((crc << 1) ^ polynomial if crc & 0x8000 else crc << 1) & 0xffff
+        return crc
+
+    def compute(self, data, start=0, stop=None):
+        """
+        Purpose:
+            CRC of part of a frame, read in place
+        Input:
+            data [bytearray]: The frame
+            start [int]: First byte covered
+            stop [int]: One past the last byte covered. None for the end of data.
+        Output:
+            crc [int]: The CRC
+        """
+        table = self.table
+        crc = self.initialValue
+        if self.reflected:
+            for byte in bytearray(data[start:stop]):
+                crc = (crc >> 8) ^ table[(crc ^ byte) & 0xff]
+        else:
+            for byte in bytearray(data[start:stop]):
+                crc = ((crc << 8) & 0xffff) ^ table[((crc >> 8) ^ byte) & 0xff]
+        return crc ^ self.finalXor
+
+    def computeBulk(self, rows):
+        """
+        Purpose:
+            CRC of many equal-length byte strings at once, stepping through the bytes column by column with each step
+            done for every row in one numpy operation, e.g., to check millions of archived packets
+        Input:
+            rows [numpy.ndarray]: uint8, one byte string per row (see stackPackets)
+        Output:
+            crcs [numpy.ndarray]: uint16, one CRC per row
+        """
+        table = self.numpyTable
+        crcs = numpy.full(rows.shape[0], self.initialValue, dtype=numpy.uint16)
+        for column in rows.T:
+            if self.reflected:
+                crcs = (crcs >> 8) ^ table[(crcs ^ column) & 0xff]
+            else:
+                crcs = (crcs << 8) ^ table[((crcs >> 8) ^ column) & 0xff]
+        return crcs ^ numpy.uint16(self.finalXor)
+
+
+# The CRCs a telemetry schema can name. Other CubeSats: add your checksum here if it isn't one of these.
+crc16X25 = Crc_Algorithm('crc16X25', 0x8408, 0xffff, 0xffff, True)  # The AX.25 frame check sequence (CRC-16/X.25)
+crc16Ccitt = Crc_Algorithm('crc16Ccitt', 0x1021, 0xffff, 0x0000, False)  # The CCSDS packet error control (CRC-16/CCITT-FALSE)
+crcAlgorithms = {crc16X25.name: crc16X25, crc16Ccitt.name: crc16Ccitt}
+
+
+# Purpose:
+#   Read a 16-bit CRC sent least significant byte first, as AX.25 sends its frame check sequence and MinXSS its telemetry
+# Input:
+#   data [bytearray]: The frame
+#   offset [int]: Index of the CRC's first byte
+# Output:
+#   crc [int]: The CRC
+#
+def readCrc(data, offset):
+    return data[offset] | (data[offset + 1] << 8)
+
+
+# Purpose:
+#   Stack the first length bytes of each packet into rows of a numpy array for Crc_Algorithm.computeBulk
+# Input:
+#   packets [list of bytearray]: The packets, each at least length bytes long
+#   length [int]: Bytes to take from each
+# Output:
+#   rows [numpy.ndarray]: uint8, shape (number of packets, length)
+#
+def stackPackets(packets, length):
+    return numpy.frombuffer(b''.join(bytes(packet[:length]) for packet in packets), dtype=numpy.uint8).reshape(len(packets), length)
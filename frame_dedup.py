@@ -0,0 +1,95 @@
+"""Drop frames that have already been received (e.g., heard on another radio, or sent again by a TNC after a reconnect)
+right after framing, before they're decoded, archived or displayed again"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import hashlib
+import threading
+from collections import OrderedDict
+import latency_monitor
+import pipeline_metrics
+
+defaultCacheSize = 4096  # [frames] About 10 hours of 9 s beacons, or a few minutes of a fast downlink on several radios
+defaultWindow = 60.0  # [s] How long a frame is remembered after it was last received
+
+
+# Purpose:
+#   A 64-bit hash of a packet, which is plenty to tell apart the packets received in one window
+# Input:
+#   packet [bytearray]: The bytes to hash
+# Output:
+#   packetHash [bytes]: 8 bytes
+#
+def hashPacket(packet):
+    if hasattr(hashlib, 'blake2b'):
+        return hashlib.blake2b(bytes(packet), digest_size=8).digest()
+    return hashlib.md5(bytes(packet)).digest()[:8]  # python 2 and < 3.6
+
+
+class Dedup_Cache():
+    """
+    Purpose:
+        Remember the hashes of recently received packets, least recently received first, so a repeat can be recognized in
+        constant time. Hashes are forgotten once they haven't been received for window seconds or when more than size
+        are held, so memory stays bounded on an unattended station. Safe to share between links reading on different threads.
+    Input:
+        size [int]: Most hashes to hold
+        window [float]: Seconds a packet is remembered after it was last received
+    Output:
+        N/A
+    """
+    def __init__(self, size=defaultCacheSize, window=defaultWindow):
+        self.size = max(int(size), 1)
+        self.window = int(float(window) * 1e9)  # [ns]
+        self.lock = threading.Lock()
+        self.receivedTimes = OrderedDict()  # Packet hash -> when it was last received [monotonic ns], least recent first
+
+    def isDuplicate(self, frame, syncOffset=0, receivedTime=None):
+        """
+        Purpose:
+            Check whether a packet was already received within the window, and remember it either way. Only the packet
+            itself (from its start sync) is compared, since each TNC may put different KISS headers in front of it.
+        Input:
+            frame [bytearray]: The frame holding the packet, as framed (before any KISS decoding)
+            syncOffset [int]: Index of the packet's start sync bytes in the frame
+            receivedTime [int]: When its last byte was read (latency_monitor.Receive_Times.lastByteMonotonic), so the window
+                                is measured between receptions rather than whenever each was checked. None for now.
+        Output:
+            duplicate [bool]: True if it had already been received
+        """
+        packetHash = hashPacket(frame[max(syncOffset, 0):])
+        currentTime = receivedTime if receivedTime is not None else latency_monitor.now()
+        with self.lock:
+            receivedTimes = self.receivedTimes
+            while receivedTimes:  # Forget packets not received within the window
+                oldestHash, oldestTime = next(iter(receivedTimes.items()))
+                if currentTime - oldestTime < self.window:
+                    break
+                del receivedTimes[oldestHash]
+            duplicate = receivedTimes.pop(packetHash, None) is not None
+            receivedTimes[packetHash] = currentTime  # Now the most recently received
+            if len(receivedTimes) > self.size:
+                receivedTimes.popitem(last=False)
+        pipeline_metrics.increment('dedup_hits' if duplicate else 'dedup_misses')
+        return duplicate
+
+    def __len__(self):
+        return len(self.receivedTimes)
+
+    def clear(self):
+        with self.lock:
+            self.receivedTimes.clear()
+
+
+# Purpose:
+#   Make the cache the links share, as configured
+# Input:
+#   size [int]: Most packets to remember (the dedupCacheSize setting). 0 to turn duplicate suppression off.
+#   window [float]: Seconds to remember each packet for (the dedupWindow setting)
+# Output:
+#   dedupCache [Dedup_Cache]: The cache. None if turned off.
+#
+def createCache(size=defaultCacheSize, window=defaultWindow):
+    if size is None or int(size) <= 0:
+        return None
+    return Dedup_Cache(size, window if window is not None else defaultWindow)
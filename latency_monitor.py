@@ -0,0 +1,326 @@
+"""Time each frame through the pipeline stages (arrival, framing, KISS decoding, parsing, archiving, display) and keep latency histograms per stage"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import os
+import time
+import datetime
+import threading
+
+stageNames = ['firstByte', 'frameComplete', 'kissDecoded', 'parsed', 'persisted', 'rendered']  # In pipeline order; firstByte is the reference
+subBucketBits = 5  # 32 linear buckets per power of two, i.e., each bucket is within ~3% of the values it holds
+maxLatencyBits = 42  # Latencies up to 2^42 ns (~73 minutes) get their own buckets; longer ones are counted in the last
+bucketCount = (maxLatencyBits - subBucketBits + 1) << subBucketBits
+defaultSampleSpacing = 10000000  # [ns] Time at most one frame per 10 ms: every frame at beacon rates, a sample of a fast replay
+unixEpoch = datetime.datetime(1970, 1, 1)
+
+
+# Purpose:
+#   A monotonic clock in integer nanoseconds for stamping frames; only differences between stamps are meaningful
+# Input:
+#   None
+# Output:
+#   now [int]: Nanoseconds
+#
+if hasattr(time, 'monotonic_ns'):
+    now = time.monotonic_ns
+else:
+    def now():
+        return int(time.time() * 1e9)  # python 2
+
+
+# Purpose:
+#   The wall clock in integer nanoseconds since 1970 (UTC), for stamps that are compared between stations or with the
+#   spacecraft's clock
+# Input:
+#   None
+# Output:
+#   utcNow [int]: Nanoseconds
+#
+if hasattr(time, 'time_ns'):
+    utcNow = time.time_ns
+else:
+    def utcNow():
+        return int(time.time() * 1e9)  # python < 3.7
+
+
+# Purpose:
+#   Read both clocks back to back, e.g., just after bytes are read from a link
+# Input:
+#   None
+# Output:
+#   stamp [tuple of int]: (monotonic, UTC) nanoseconds
+#
+def receiveClock():
+    return now(), utcNow()
+
+
+# Purpose:
+#   Format a UTC stamp as ISO 8601, to the microsecond
+# Input:
+#   utcNanoseconds [int]: Nanoseconds since 1970 (UTC)
+# Output:
+#   isoTime [string]: e.g., '2018-12-03T18:34:56.123456'
+#
+def utcIsoFormat(utcNanoseconds):
+    seconds, nanoseconds = divmod(int(utcNanoseconds), 1000000000)
+    return (unixEpoch + datetime.timedelta(seconds=seconds, microseconds=nanoseconds // 1000)).isoformat()
+
+
+# Purpose:
+#   Format a UTC stamp as ISO 8601 in this computer's time zone, to the microsecond
+# Input:
+#   utcNanoseconds [int]: Nanoseconds since 1970 (UTC)
+# Output:
+#   isoTime [string]: e.g., '2018-12-03T11:34:56.123456'
+#
+def localIsoFormat(utcNanoseconds):
+    seconds, nanoseconds = divmod(int(utcNanoseconds), 1000000000)
+    return datetime.datetime.fromtimestamp(seconds).replace(microsecond=nanoseconds // 1000).isoformat()
+
+
+class Receive_Times():
+    """
+    Purpose:
+        When a frame's first and last bytes were read from the link, before any processing, on both the monotonic clock (for
+        intervals, e.g., latency and how long ago a duplicate was received) and the UTC wall clock (for merging stations and
+        comparing with the spacecraft's clock). Travels with the frame through decoding, archiving, upload and dedup.
+    Input:
+        firstByte [tuple of int]: (monotonic, UTC) nanoseconds from receiveClock when the read holding the first byte returned
+        lastByte [tuple of int]: The same for the read holding the last byte
+    Output:
+        N/A
+    """
+    def __init__(self, firstByte, lastByte):
+        self.firstByteMonotonic, self.firstByteUtc = firstByte
+        self.lastByteMonotonic, self.lastByteUtc = lastByte
+
+    def asDictionary(self):
+        return {'firstByteUtc': utcIsoFormat(self.firstByteUtc), 'lastByteUtc': utcIsoFormat(self.lastByteUtc),
+                'firstByteMonotonicNs': self.firstByteMonotonic, 'lastByteMonotonicNs': self.lastByteMonotonic}
+
+
+class Latency_Histogram():
+    """
+    Purpose:
+        Count latencies in log-linear buckets, as an HDR histogram does, so that memory is fixed no matter how many values
+        are recorded or how long the run is, while percentiles stay accurate to a few percent from nanoseconds to minutes
+    Input:
+        None
+    Output:
+        N/A
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.counts = [0] * bucketCount
+        self.count = 0
+        self.total = 0
+        self.minimum = None
+        self.maximum = 0
+
+    def record(self, value):
+        """
+        Purpose:
+            Add one latency to the histogram
+        Input:
+            value [int]: Latency in nanoseconds. Negative values (clock oddities) are counted as 0.
+        Output:
+            None
+        """
+        if value < 0:
+            value = 0
+        magnitude = value.bit_length() - subBucketBits - 1
+        if magnitude < 0:
+            magnitude = 0
+        index = (magnitude << subBucketBits) + (value >> magnitude)
+        if index >= bucketCount:
+            index = bucketCount - 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        if self.minimum is None or value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+
+    def percentile(self, percent):
+        """
+        Purpose:
+            Find the latency that the given percentage of recorded values are at or below
+        Input:
+            percent [float]: e.g., 50 for the median or 99.9
+        Output:
+            value [int]: The upper edge of the bucket holding that percentile, in nanoseconds. 0 if nothing recorded.
+        """
+        if self.count == 0:
+            return 0
+        target = max(percent / 100.0 * self.count, 1)
+        runningCount = 0
+        for index, bucketCount in enumerate(self.counts):
+            runningCount += bucketCount
+            if runningCount >= target:
+                magnitude = max((index >> subBucketBits) - 1, 0)
+                subBucket = index - (magnitude << subBucketBits)
+                return min(((subBucket + 1) << magnitude) - 1, self.maximum)
+        return self.maximum
+
+    def mean(self):
+        return self.total / float(self.count) if self.count else 0.0
+
+    def cumulativeCounts(self, boundaries):
+        """
+        Purpose:
+            Count the values at or below each boundary, e.g., for the buckets of a Prometheus histogram
+        Input:
+            boundaries [list of int]: Increasing latencies in nanoseconds
+        Output:
+            cumulativeCounts [list of int]: One count per boundary (a bucket counts as below a boundary if its upper edge is)
+        """
+        cumulativeCounts = [0] * len(boundaries)
+        for index, bucketCount in enumerate(self.counts):
+            if bucketCount:
+                magnitude = max((index >> subBucketBits) - 1, 0)
+                upperEdge = ((index - (magnitude << subBucketBits) + 1) << magnitude) - 1
+                for boundaryIndex, boundary in enumerate(boundaries):
+                    if upperEdge <= boundary:
+                        cumulativeCounts[boundaryIndex] += bucketCount
+        return cumulativeCounts
+
+
+class Latency_Monitor():
+    """
+    Purpose:
+        Keep a latency histogram for each pipeline stage (time since the previous stage the frame reached) and one for the
+        total time from the first byte of a frame arriving to its last stage. A timed frame carries its stamps in a list that
+        the reading loop passes along: the first byte's time, then each stage's name and time in the order they were
+        stamped. Frames that aren't timed (when disabled, or within sampleSpacing of the last timed frame) get None, for
+        which every method is a no-op, so the reading loop needn't check.
+    Input:
+        enabled [bool]: Whether to record anything
+        sampleSpacing [int]: Least time between timed frames [ns], so a flood of frames costs a fixed amount of timing. 0 to
+                             time every frame.
+    Output:
+        N/A
+    """
+    def __init__(self, enabled=True, sampleSpacing=defaultSampleSpacing):
+        self.enabled = enabled
+        self.sampleSpacing = sampleSpacing
+        self.nextSampleTime = 0  # [ns] When the next frame may be timed
+        self.lock = threading.Lock()  # finishFrame can be called from the reading thread while the GUI thread reads a summary
+        self.histograms = dict((name, Latency_Histogram()) for name in stageNames[1:] + ['total'])
+
+    def startFrame(self, connectedPort):
+        """
+        Purpose:
+            Begin timing a frame just returned by read_packet
+        Input:
+            connectedPort [connect_serial, connect_socket or connect_replay]: The link the frame came from, whose receiveTimes
+                                                                              record when the frame's first byte arrived
+        Output:
+            stamps [list]: The first byte's time, then 'frameComplete' and its time [ns]. None if the frame isn't timed.
+        """
+        if not self.enabled:
+            return None
+        frameComplete = now()
+        if frameComplete < self.nextSampleTime:
+            return None
+        self.nextSampleTime = frameComplete + self.sampleSpacing
+        receiveTimes = getattr(connectedPort, 'receiveTimes', None)
+        return [receiveTimes.firstByteMonotonic if receiveTimes is not None else frameComplete, 'frameComplete', frameComplete]
+
+    def resumeFrame(self, stamps):
+        """
+        Purpose:
+            Continue timing a frame whose earlier stages were stamped elsewhere (e.g., in the reader process)
+        Input:
+            stamps [list]: As from startFrame and stamp
+        Output:
+            stamps [list]: The same, or None if the frame isn't timed
+        """
+        if not self.enabled:
+            return None
+        currentTime = now()
+        if currentTime < self.nextSampleTime:
+            return None
+        self.nextSampleTime = currentTime + self.sampleSpacing
+        return stamps
+
+    def stamp(self, stamps, stage):
+        if stamps is not None:
+            stamps += (stage, now())
+
+    def finishFrame(self, stamps):
+        """
+        Purpose:
+            Record a frame's stage latencies. Stages are in the order they were stamped (e.g., the GUI archives before parsing),
+            and stages the frame skipped (e.g., persisted when not saving a log) are simply absent.
+        Input:
+            stamps [list]: From startFrame and stamp
+        Output:
+            None
+        """
+        if stamps is None:
+            return
+        histograms = self.histograms
+        previousTime = stamps[0]
+        with self.lock:
+            for position in range(1, len(stamps), 2):
+                stageTime = stamps[position + 1]
+                histograms[stamps[position]].record(stageTime - previousTime)
+                previousTime = stageTime
+            histograms['total'].record(previousTime - stamps[0])
+
+    def bucketCounts(self, boundaries):
+        """
+        Purpose:
+            Get every stage's histogram as cumulative bucket counts, e.g., for the metrics endpoint
+        Input:
+            boundaries [list of int]: Increasing latencies in nanoseconds
+        Output:
+            bucketCounts [list of tuples]: (stage, cumulative counts at each boundary, count, total in nanoseconds)
+        """
+        with self.lock:
+            return [(stage, self.histograms[stage].cumulativeCounts(boundaries), self.histograms[stage].count, self.histograms[stage].total)
+                    for stage in stageNames[1:] + ['total']]
+
+    def reset(self):
+        with self.lock:
+            for histogram in self.histograms.values():
+                histogram.reset()
+
+    def summary(self):
+        """
+        Purpose:
+            Format the histograms as a table for the diagnostics panel or a dump
+        Input:
+            None
+        Output:
+            summary [string]: One line per stage with count, mean and percentiles in milliseconds
+        """
+        lines = ["{0:14s} {1:>8s} {2:>9s} {3:>9s} {4:>9s} {5:>9s} {6:>9s}".format('Stage [ms]', 'count', 'mean', 'p50', 'p90', 'p99', 'max')]
+        with self.lock:
+            for stage in stageNames[1:] + ['total']:
+                histogram = self.histograms[stage]
+                lines.append("{0:14s} {1:8d} {2:9.3f} {3:9.3f} {4:9.3f} {5:9.3f} {6:9.3f}".format(
+                    stage, histogram.count, histogram.mean() / 1e6, histogram.percentile(50) / 1e6, histogram.percentile(90) / 1e6,
+                    histogram.percentile(99) / 1e6, histogram.maximum / 1e6))
+        return '\n'.join(lines)
+
+    def dump(self):
+        """
+        Purpose:
+            Write the summary to a timestamped file next to the debug log
+        Input:
+            None
+        Output:
+            filename [string]: The file written, in ~/MinXSS_Beacon_Decoder/log
+        """
+        import beacon_pipeline  # Here rather than at the top since the packet handlers that beacon_pipeline loads use this module's clocks
+        if not os.path.exists(beacon_pipeline.logDirectory):
+            os.makedirs(beacon_pipeline.logDirectory)
+        filename = os.path.join(beacon_pipeline.logDirectory, "latency_" + datetime.datetime.now().isoformat().replace(':', '_') + ".txt")
+        with open(filename, 'w') as dumpFile:
+            dumpFile.write(self.summary() + '\n')
+        return filename
@@ -0,0 +1,144 @@
+"""Keep MinXSS log packets (0x08 0x1D) in an indexed store, searchable by when they were received"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import os
+import sys
+import json
+import atexit
+import sqlite3
+import argparse
+import binascii
+import threading
+import latency_monitor
+import pipeline_metrics
+
+logStoreFilename = os.path.join(os.path.expanduser("~"), "MinXSS_Beacon_Decoder", "output", "spacecraft_log.sqlite")
+# This tree has no definition of the flight software's log packet layout, so log packets are stored raw (as received, i.e.,
+# still KISS encoded from a live link) rather than decoded into made-up fields. Other CubeSats: once your log packet layout
+# is known, decode the stored packets with it.
+logStore = None  # The Log_Store that storeLogPacket appends to, opened on the first log packet
+logStoreLock = threading.Lock()  # Several links may each be reading on their own thread
+
+
+# Purpose:
+#   Make a log entry from a log packet
+# Input:
+#   frame [bytearray]: The frame holding the log packet
+#   syncOffset [int]: Index of the packet's start sync bytes in the frame
+#   receiveTimes [latency_monitor.Receive_Times]: When the packet's bytes were read. None to use the current time.
+# Output:
+#   entry [dictionary]: packet (its raw bytes from the start sync on, hex) and receivedTime (when its last byte was read,
+#                       UTC, ISO 8601)
+#
+def logEntry(frame, syncOffset=0, receiveTimes=None):
+    return {'packet': binascii.hexlify(bytes(frame[syncOffset:])).decode('ascii'),
+            'receivedTime': latency_monitor.utcIsoFormat(receiveTimes.lastByteUtc if receiveTimes is not None else latency_monitor.utcNow())}
+
+
+class Log_Store():
+    """
+    Purpose:
+        Keep log packets in a SQLite database indexed by when they were received, so a whole mission's worth of them can be
+        searched without reading it all back. The same packet (e.g., from a replay or reprocessing an archive) is only
+        stored once. Safe to append to from the reading thread while another thread searches.
+    Input:
+        filename [string]: The database file. Created if it doesn't exist.
+    Output:
+        N/A
+    """
+    def __init__(self, filename=logStoreFilename):
+        directory = os.path.dirname(filename)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.filename = filename
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(filename, timeout=30, check_same_thread=False)  # Reprocessing workers share the file
+        self.connection.execute("PRAGMA journal_mode=WAL")  # With synchronous=NORMAL, committing each entry doesn't wait for the disk
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute("CREATE TABLE IF NOT EXISTS log_entries (receivedTime TEXT, packet TEXT)")
+        self.connection.execute("CREATE INDEX IF NOT EXISTS log_entries_receivedTime ON log_entries (receivedTime)")
+        self.connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS log_entries_packet ON log_entries (packet)")
+        self.connection.commit()
+
+    def append(self, entry):
+        """
+        Purpose:
+            Add a log entry
+        Input:
+            entry [dictionary]: From logEntry
+        Output:
+            None
+        """
+        with self.lock:
+            self.connection.execute("INSERT OR IGNORE INTO log_entries (receivedTime, packet) VALUES (?, ?)",
+                                    (entry['receivedTime'], entry['packet']))
+            self.connection.commit()  # Right away, so other processes (e.g., reprocessing workers) aren't locked out
+
+    def search(self, startTime=None, stopTime=None, limit=1000):
+        """
+        Purpose:
+            Find log entries
+        Input:
+            startTime, stopTime [string]: Only entries received in this range (UTC, ISO 8601, e.g., 2017-06-01T12:00). None for unbounded.
+            limit [int]: Most entries to return
+        Output:
+            entries [list of dictionaries]: Matching entries (as from logEntry), in the order they were received
+        """
+        conditions, parameters = [], []
+        if startTime is not None:
+            conditions.append("receivedTime >= ?")
+            parameters.append(startTime)
+        if stopTime is not None:
+            conditions.append("receivedTime <= ?")
+            parameters.append(stopTime)
+        query = ("SELECT receivedTime, packet FROM log_entries" + (" WHERE " + " AND ".join(conditions) if conditions else "") +
+                 " ORDER BY receivedTime LIMIT ?")
+        with self.lock:
+            rows = self.connection.execute(query, parameters + [limit]).fetchall()
+        return [{'receivedTime': row[0], 'packet': row[1]} for row in rows]
+
+    def close(self):
+        with self.lock:
+            self.connection.commit()
+            self.connection.close()
+
+
+# Purpose:
+#   Handler for log packets (see packet_dispatcher): add the packet to the log store
+# Input:
+#   frame [bytearray]: The frame holding the log packet
+#   syncOffset [int]: Index of the packet's start sync bytes in the frame
+#   log [logging.Logger]: The debug log
+#   receiveTimes [latency_monitor.Receive_Times]: When the packet's bytes were read. None if unknown.
+# Output:
+#   None
+#
+def storeLogPacket(frame, syncOffset, log, receiveTimes=None):
+    global logStore
+    entry = logEntry(frame, syncOffset, receiveTimes)
+    with logStoreLock:
+        if logStore is None:
+            logStore = Log_Store()
+            atexit.register(logStore.close)
+    logStore.append(entry)
+    pipeline_metrics.increment('log_packets_stored')
+    log.debug("Stored a %d byte log packet", len(frame) - syncOffset)
+
+
+def main(argv=None):
+    argumentParser = argparse.ArgumentParser(description="Search the MinXSS log packets in the log store")
+    argumentParser.add_argument('--start', default=None, help="Earliest time received (UTC, ISO 8601, e.g., 2017-06-01T12:00)")
+    argumentParser.add_argument('--stop', default=None, help="Latest time received (UTC, ISO 8601)")
+    argumentParser.add_argument('--limit', type=int, default=1000, help="Most entries to print")
+    argumentParser.add_argument('--store', default=logStoreFilename, help="The log store")
+    arguments = argumentParser.parse_args(argv)
+
+    store = Log_Store(arguments.store)
+    for entry in store.search(arguments.start, arguments.stop, arguments.limit):
+        sys.stdout.write(json.dumps(entry) + '\n')
+    store.close()
+
+
+if __name__ == '__main__':
+    main()
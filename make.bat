@@ -1 +1,5 @@
-pyinstaller minxss_beacon_decoder.py --onefile -n MinXSS_Beacon_DecoderWin --clean --windowed --noconfirm
\ No newline at end of file
+rem Bundle the binary resources if they're built (or rcc is there to build them); without them the GUI uses QtAssets_rc.py
+if not exist assets\QtAssets.rcc (where rcc >nul 2>nul && rcc -binary -o assets\QtAssets.rcc assets\QtAssets.qrc)
+set rccData=
+if exist assets\QtAssets.rcc set rccData=--add-data "assets/QtAssets.rcc;assets"
+pyinstaller minxss_beacon_decoder.py --onefile -n MinXSS_Beacon_DecoderWin --clean --windowed --noconfirm --add-data "ui_mainWindow.ui;." %rccData% --add-data "schemas;schemas"
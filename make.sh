@@ -1,2 +1,10 @@
 #!/bin/bash
-pyinstaller minxss_beacon_decoder.py --onefile -n MinXSS_Beacon_DecoderMac --clean --windowed --noconfirm
+# Bundle the binary resources if they're built (or rcc is there to build them); without them the GUI uses QtAssets_rc.py
+if [ ! -f assets/QtAssets.rcc ] && command -v rcc > /dev/null; then
+    rcc -binary -o assets/QtAssets.rcc assets/QtAssets.qrc
+fi
+rccData=()
+if [ -f assets/QtAssets.rcc ]; then
+    rccData=(--add-data "assets/QtAssets.rcc:assets")
+fi
+pyinstaller minxss_beacon_decoder.py --onedir -n MinXSS_Beacon_DecoderMac --clean --windowed --noconfirm --add-data "ui_mainWindow.ui:." "${rccData[@]}" --add-data "schemas:schemas"
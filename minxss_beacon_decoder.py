@@ -1,47 +1,222 @@
+import time
+processStartTime = time.time()  # As early as possible so the startup timing includes the imports below
 import sys
 import os
-import logging
-from ConfigParser import SafeConfigParser
+import multiprocessing
 from PySide import QtGui, QtCore
 from PySide.QtGui import QMainWindow, QApplication, QColor
-from ui_mainWindow import Ui_MainWindow
+import ui_loader
 import connect_port_get_packet
+import beacon_pipeline
+import frame_dedup
 import file_upload
-import datetime
-from serial.tools import list_ports
+import port_discovery
+import settings_store
+import latency_monitor
+import profiling_mode
+import pipeline_metrics
+import reader_process
 import minxss_parser
 
 """Call the GUI and attach it to functions."""
 __author__ = "James Paul Mason"
 __contact__ = "jmason86@gmail.com"
 
-
-class MainWindow(QMainWindow, Ui_MainWindow):
-    def __init__(self):
+portRefreshIntervalMilliseconds = 5000  # How often to re-enumerate serial ports when udev hot-plug events aren't available
+diagnosticsRefreshIntervalMilliseconds = 1000  # How often the diagnostics tab redraws the latency histograms
+telemetryRefreshIntervalMilliseconds = 1000  # How often the telemetry tab redraws the latest packet's values
+limitColors = {'green': QColor(55, 195, 58), 'yellow': QColor(244, 212, 66), 'red': QColor(242, 86, 77)}
+
+# The main panel's value labels (in ui_mainWindow.ui) and the telemetry point (schema field name) each one shows. Their
+# colors come from the field's limits in the schema. Other CubeSats: bind your own labels to your schema's fields here.
+mainPanelLabels = [('Time Stamp', 'label_TimeStamp'), ('Commands Received', 'label_CommandsReceived'),
+                   ('Last Command Received', 'label_LastCommandReceived'), ('Temperature', 'label_Temperature'),
+                   ('C&DH Primary Data', 'label_CDHPrimaryData'), ('Rejected CIP Packets', 'label_RejectedCIPPacket'),
+                   ('Last Downlinked HK Sector', 'label_LastDownlinkedHKSector'),
+                   ('Last downlinked Science Sector', 'label_LastdownlinkedScienceSector'),
+                   ('Last downlinked ADCS Sector', 'label_LastdownlinkedADCSSector'), ('Battery Voltage', 'label_BattertVoltage'),
+                   ('Battery Current', 'label_BatteryCurrent'), ('Battery SOC', 'label_BatterySOC'),
+                   ('Battery Temperature', 'label_batteryTemperature'), ('Solar Panel Voltage', 'label_SolarPanelVoltag'),
+                   ('Solar Panel Current', 'label_SolarPanelCurrent'), ('Interface Board Temperature', 'label_InterfaceBoardTemperature'),
+                   ('EPS Board Temperature', 'label_EPSBoardTemperature'), ('CIP Voltage', 'label_CIPVoltage'),
+                   ('CIP Current', 'label_CIPCurrent'), ('ADCS Voltage', 'label_ADCSVoltage'), ('ADCS Current', 'label_ADCSCurrent'),
+                   ('S-Band Voltage', 'label_SBandVoltage'), ('S-Band Current', 'label_SBandCurrent'),
+                   ('UHF Voltage', 'label_UHFVoltage'), ('UHF Current', 'label_UHFCurrent'), ('C&DH Voltage', 'label_CDHVoltage'),
+                   ('C&DH Current', 'label_CDHCurrent'), ('GPS 3.3 Voltage', 'label_GPS3Voltage'), ('GPS 3.3 Current', 'label_GPS3Current'),
+                   ('GPS 12 Voltage', 'label_GPS12Voltage'), ('GPS 12 Current', 'label_GPS12Current'),
+                   ('General Information', 'label_GeneralInfo'), ('CIP Temperature', 'label_CIPTemperature'),
+                   ('System Check Temperature', 'label_SystemChecksTemp'), ('System Check Current Channel', 'label_SystemCheckCurrent'),
+                   ('Shell Temperature', 'label_ShellTemp'), ('Check Sum Counter', 'label_CheckSumCounter'),
+                   ('Configuration Status', 'label_ConfigurationStatus'), ('SBandByte', 'label_SBandByte'),
+                   ('Command Status', 'label_CommandStatus'), ('Command Reject Count', 'label_CommandRejectCoun'),
+                   ('Command Accept Count', 'label_CommandAcceptCount'), ('Time Valid', 'label_TimeValid'), ('Time Now', 'label_TimeNow'),
+                   ('Refs Valid', 'label_RefsValid'), ('Attitude Valid', 'label_AttitudeValid'), ('ADCS Mode', 'label_ADCSMode'),
+                   ('Recommend Sun Point', 'label_RecommendSunPoint'), ('Sun Point State', 'label_SunPointState'),
+                   ('Star Tracker Temperature', 'label_StarTrackerTemperature'), ('Wheel Temperatures', 'label_WheelTemperatures'),
+                   ('Digital Bus Voltage', 'label_DigitalBusVoltage_2'), ('Sun Vector', 'label_SunVector'),
+                   ('Wheel Est Drag', 'label_WheelEstDrag'), ('Wheel Measured Speed', 'label_WheelMeasuredSpeed'),
+                   ('Body Frame Rate', 'label_BodyFrameRate')]
+
+
+# Purpose:
+#   Format a telemetry value for display
+# Input:
+#   value [number]: The value (None if the point isn't decoded)
+# Output:
+#   text [string]: e.g., '7.35'; '-' for None
+#
+def formatTelemetryValue(value):
+    if value is None:
+        return "-"
+    return "{0:.2f}".format(value) if isinstance(value, float) else str(value)
+
+
+class MainWindow(QMainWindow):
+    hotplugDetected = QtCore.Signal()  # Emitted from the udev thread; the connection queues it onto the GUI thread
+
+    def __init__(self, startupTimer=None, latencyMonitor=None, profile=False):
         super(MainWindow, self).__init__()
+        self.startupTimer = startupTimer or Startup_Timer(False)
+        self.latencyMonitor = latencyMonitor or latency_monitor.Latency_Monitor()
         self.log = self.createLog()  # Debug log
-        self.setupUi(self)
+        self.profiling = profiling_mode.Profiling_Mode(self.log, profile)
+        self.settings = settings_store.Settings_Store(self.log)
+        self.startupTimer.mark("Debug log created and settings loaded")
+        ui_loader.setupUi(self)
+        self.mainPanelWidgets = self.bindMainPanelLabels()
+        self.startupTimer.mark("UI loaded")
+        self.lazyTabBuilders = {}
+        self.replay = self.addLazyTab(self.tabWidget_serialIp, "Replay", self.buildReplayTab)
+        self.addLazyTab(self.tabWidget, "Diagnostics", self.buildDiagnosticsTab)
+        self.latestTelemetry = None  # The last packet parsed, shown in the telemetry tab
+        self.addLazyTab(self.tabWidget, "Telemetry", self.buildTelemetryTab)
         self.setupAvailablePorts()
         self.assignWidgets()
         self.setupLastUsedSettings()
         self.setupOutputLog()  # Log of buffer data
-        self.portReadThread = PortReadThread(self.readPort, self.stopRead)
+        self.setupMetricsServer()
+        self.portReadThread = None  # A new one for each connection
         QApplication.instance().aboutToQuit.connect(self.prepareToExit)
+        self.startupTimer.mark("Settings and output log ready")
         self.show()
+        QtCore.QTimer.singleShot(0, self.startupFinished)
+
+    def setupMetricsServer(self):
+        """
+        Purpose:
+            Serve the pipeline metrics in Prometheus format if a metrics port is set in input_properties.cfg
+         Input:
+            None
+         Output:
+            None
+        """
+        metricsPort = self.settings.get('metricsPort', 0)
+        if metricsPort:
+            try:
+                pipeline_metrics.startServer(metricsPort, latencyMonitor=self.latencyMonitor)
+                self.log.info("Serving metrics on port {0}".format(metricsPort))
+            except Exception as error:
+                self.log.error("Couldn't serve metrics on port {0}: {1}".format(metricsPort, error))
+
+    def startupFinished(self):
+        """
+        Purpose:
+            Called on the first pass through the event loop after show(), i.e., once the window has been painted
+         Input:
+           None
+         Output:
+           None (but reports the startup timing if enabled)
+        """
+        self.startupTimer.mark("First paint")
+        self.startupTimer.report(self.log)
+
+    def addLazyTab(self, tabWidget, title, builder):
+        """
+        Purpose:
+            Add a tab whose contents aren't built until the user first opens it, so it costs nothing at startup
+         Input:
+           tabWidget [QTabWidget]: The tab widget to add the tab to
+           title [string]: The tab text
+           builder [function]: Called with the (empty) tab page the first time it is shown; should populate it
+         Output:
+           page [QWidget]: The tab page
+        """
+        page = QtGui.QWidget()
+        self.lazyTabBuilders[page] = builder
+        tabWidget.addTab(page, title)
+        return page
+
+    def buildLazyTab(self, index):
+        """
+        Purpose:
+            Respond to a tab being shown -- build its contents if it was added with addLazyTab and hasn't been built yet
+         Input:
+           index [int]: The index of the newly shown tab (unused; the sender's current widget is used)
+         Output:
+           None
+        """
+        page = self.sender().currentWidget()
+        builder = self.lazyTabBuilders.pop(page, None)
+        if builder:
+            builder(page)
 
     def setupAvailablePorts(self):
         """
         Purpose:
-            Determine what ports are available for serial reading and populate the combo box with these options
+            Populate the serial port combo box instantly with the ports found last time, then determine what ports are available
+            in the background and keep them up to date -- on udev hot-plug events where available, otherwise by polling
          Input:
            None
          Output:
            None
         """
         self.comboBox_serialPort.clear()
-        listPortInfoObjects = list_ports.comports()
-        portNames = [x[0] for x in listPortInfoObjects]
+        self.lastScannedPortNames = port_discovery.readCachedPortNames()
+        self.comboBox_serialPort.addItems(self.lastScannedPortNames)
+
+        self.portScanThread = PortScanThread()
+        self.portScanThread.portsFound.connect(self.updateAvailablePorts)
+        self.hotplugDetected.connect(self.refreshAvailablePorts)
+        self.hotplugObserver = port_discovery.startHotplugMonitor(self.hotplugDetected.emit)
+        if self.hotplugObserver is None:
+            self.portRefreshTimer = QtCore.QTimer(self)
+            self.portRefreshTimer.timeout.connect(self.refreshAvailablePorts)
+            self.portRefreshTimer.start(portRefreshIntervalMilliseconds)
+        self.refreshAvailablePorts()
+
+    def refreshAvailablePorts(self):
+        """
+        Purpose:
+            Start enumerating the serial ports in the background, unless that is already underway
+         Input:
+           None
+         Output:
+           None (but updateAvailablePorts is called when the enumeration finishes)
+        """
+        if not self.portScanThread.isRunning():
+            self.portScanThread.start()
+
+    def updateAvailablePorts(self, portNames):
+        """
+        Purpose:
+            Respond to the background port enumeration finishing -- update the combo box if the ports changed, keeping the current selection
+         Input:
+           portNames [list of strings]: The serial ports that exist now
+         Output:
+           None (but the port names are cached to disk for the next startup)
+        """
+        if portNames == self.lastScannedPortNames:
+            return
+        self.lastScannedPortNames = portNames
+        port_discovery.writeCachedPortNames(portNames)
+
+        currentPort = self.comboBox_serialPort.currentText()
+        self.comboBox_serialPort.clear()
         self.comboBox_serialPort.addItems(portNames)
+        if currentPort:
+            if currentPort not in portNames:
+                self.comboBox_serialPort.insertItem(0, currentPort)
+            self.comboBox_serialPort.setCurrentIndex(self.comboBox_serialPort.findText(currentPort))
 
     def assignWidgets(self):
         """
@@ -57,34 +232,30 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         self.checkBox_forwardData.stateChanged.connect(self.forwardDataToggled)
         self.checkBox_decodeKiss.stateChanged.connect(self.decodeKissToggled)
         self.actionCompletePass.triggered.connect(self.completePassClicked)
+        self.actionRefreshSerialPorts.triggered.connect(self.refreshAvailablePorts)
+        self.tabWidget.currentChanged.connect(self.buildLazyTab)
+        self.tabWidget_serialIp.currentChanged.connect(self.buildLazyTab)
 
     def setupLastUsedSettings(self):
         """
         Purpose:
            Grab the last used input settings and use those as the startup values
          Input:
-           None (though uses the input_properties.cfg configuration file on disk)
+           None (though uses the settings loaded from the input_properties.cfg configuration file on disk)
          Output:
            None
         """
-        parser = SafeConfigParser()
-        if os.path.isfile(os.path.join(os.path.expanduser("~"), "MinXSS_Beacon_Decoder", "input_properties.cfg")):
-            parser.read(os.path.join(os.path.expanduser("~"), "MinXSS_Beacon_Decoder", "input_properties.cfg"))
-            self.comboBox_serialPort.insertItem(0, parser.get('input_properties', 'serialPort'))
+        if self.settings.get('serialPort'):
+            self.comboBox_serialPort.insertItem(0, self.settings.get('serialPort'))
             self.comboBox_serialPort.setCurrentIndex(0)
-            self.lineEdit_baudRate.setText(parser.get('input_properties', 'baudRate'))
-            self.lineEdit_ipAddress.setText(parser.get('input_properties', 'ipAddress'))
-            self.lineEdit_ipPort.setText(parser.get('input_properties', 'port'))
-            self.lineEdit_latitude.setText(parser.get('input_properties', 'latitude'))
-            self.lineEdit_longitude.setText(parser.get('input_properties', 'longitude'))
-            if parser.get('input_properties', 'decodeKiss') == "True":
-                self.checkBox_decodeKiss.setChecked(True)
-            else:
-                self.checkBox_decodeKiss.setChecked(False)
-            if parser.get('input_properties', 'forwardData') == "True":
-                self.checkBox_forwardData.setChecked(True)
-            else:
-                self.checkBox_decodeKiss.setChecked(False)
+        self.lineEdit_baudRate.setText(str(self.settings.get('baudRate', '')))
+        self.lineEdit_ipAddress.setText(self.settings.get('ipAddress', ''))
+        self.lineEdit_ipPort.setText(str(self.settings.get('port', '')))
+        self.lineEdit_latitude.setText(self.settings.get('latitude', ''))
+        self.lineEdit_longitude.setText(self.settings.get('longitude', ''))
+        self.checkBox_decodeKiss.setChecked(self.settings.get('decodeKiss', True))
+        self.checkBox_forwardData.setChecked(self.settings.get('forwardData', True))
+        self.checkBox_saveLog.setChecked(self.settings.get('saveLog', True))
 
     def connectClicked(self):
         """
@@ -95,17 +266,15 @@ class MainWindow(QMainWindow, Ui_MainWindow):
          Output:
            None
         """
-        # Write the input settings used to the input_properties.cfg configuration file
-        config = SafeConfigParser()
-        config.read('input_properties.cfg')
-        config.set('input_properties', 'serialPort', self.comboBox_serialPort.currentText())
-        config.set('input_properties', 'baudRate', self.lineEdit_baudRate.text())
-        config.set('input_properties', 'ipAddress', self.lineEdit_ipAddress.text())
-        config.set('input_properties', 'port', self.lineEdit_ipPort.text())
-        config.set('input_properties', 'latitude', self.lineEdit_latitude.text())
-        config.set('input_properties', 'longitude', self.lineEdit_longitude.text())
-        with open(os.path.join(os.path.expanduser("~"), "MinXSS_Beacon_Decoder", "input_properties.cfg"), 'wb') as configfile:
-            config.write(configfile)
+        # Store the input settings used (saved to the input_properties.cfg configuration file in the background)
+        self.settings.update(serialPort=self.comboBox_serialPort.currentText(),
+                             baudRate=self.lineEdit_baudRate.text(),
+                             ipAddress=self.lineEdit_ipAddress.text(),
+                             port=self.lineEdit_ipPort.text(),
+                             latitude=self.lineEdit_latitude.text(),
+                             longitude=self.lineEdit_longitude.text())
+        if self.replay not in self.lazyTabBuilders:  # i.e., the replay tab has been built
+            self.settings.update(replayFile=self.lineEdit_replayFile.text(), replaySpeed=self.lineEdit_replaySpeed.text())
 
         connectButtonText = str(self.actionConnect.iconText())
         if connectButtonText == "Connect":
@@ -115,45 +284,73 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             self.actionConnect.setText(QtGui.QApplication.translate("MainWindow", "Disconnect", None, QtGui.QApplication.UnicodeUTF8))
 
             # Grab the port information from the UI
-            if self.tabWidget_serialIp.currentIndex() == self.tabWidget_serialIp.indexOf(self.serial):
+            dedupCache = frame_dedup.createCache(self.settings.get('dedupCacheSize', frame_dedup.defaultCacheSize), self.settings.get('dedupWindow'))
+            additionalLinkSpecs = [linkSpec for linkSpec in self.settings.get('additionalLinks', '').split(',') if linkSpec.strip()]
+            if additionalLinkSpecs and self.settings.get('readerProcess'):
+                self.log.info("Reading {0} additional links in this process; the reader process only reads one link".format(len(additionalLinkSpecs)))
+            if self.settings.get('readerProcess') and reader_process.available() and not additionalLinkSpecs:
+                # Read and decode in a separate process so GUI repaints can't delay reading the port
+                if self.tabWidget_serialIp.currentWidget() == self.replay:
+                    linkType, linkArguments = 'replay', (self.lineEdit_replayFile.text(), self.settings.get('replaySpeed', 1.0))
+                elif self.tabWidget_serialIp.currentIndex() == self.tabWidget_serialIp.indexOf(self.serial):
+                    linkType, linkArguments = 'serial', (self.comboBox_serialPort.currentText(), self.lineEdit_baudRate.text())
+                else:
+                    linkType, linkArguments = 'socket', (self.lineEdit_ipAddress.text(), self.lineEdit_ipPort.text())
+                connectedPort = reader_process.Reader_Process(linkType, linkArguments, self.log, self.settings.get('decodeKiss'),
+                                                              dedupSettings=(self.settings.get('dedupCacheSize', frame_dedup.defaultCacheSize), self.settings.get('dedupWindow')))
+                portReadable = connectedPort.testRead()
+            elif self.tabWidget_serialIp.currentWidget() == self.replay:
+                # Replay a recorded log through the same pipeline as a live link
+                connectedPort = connect_port_get_packet.connect_replay(self.lineEdit_replayFile.text(), self.log, self.settings.get('replaySpeed', 1.0))
+                portReadable = connectedPort.testRead()
+            elif self.tabWidget_serialIp.currentIndex() == self.tabWidget_serialIp.indexOf(self.serial):
                 port = self.comboBox_serialPort.currentText()
                 baudRate = self.lineEdit_baudRate.text()
 
                 # Connect to the serial port and test that it is readable
-                connectedPort = connect_port_get_packet.connect_serial(port, baudRate, self.log)
+                connectedPort = connect_port_get_packet.connect_serial(port, baudRate, self.log, dedupCache)
                 portReadable = connectedPort.testRead()
             else:
                 ipAddress = self.lineEdit_ipAddress.text()
                 port = self.lineEdit_ipPort.text()
 
                 # Connect to the IP socket but there's no test option so just have to assume its working
-                connectedPort = connect_port_get_packet.connect_socket(ipAddress, port, self.log)
+                connectedPort = connect_port_get_packet.connect_socket(ipAddress, port, self.log, dedupCache=dedupCache)
                 portReadable = 1
 
+            # Merge in the packets from any other TNCs (e.g., on other antennas), dropping packets heard on more than one
+            if additionalLinkSpecs and portReadable and not isinstance(connectedPort, connect_port_get_packet.connect_replay):
+                links = [connectedPort]
+                try:
+                    for linkSpec in additionalLinkSpecs:
+                        links.append(connect_port_get_packet.openLinkSpec(linkSpec, self.lineEdit_baudRate.text(), self.log, dedupCache))
+                except Exception as error:  # e.g., serial.SerialException or socket.error; don't leave the links already opened open
+                    self.log.error("Could not open additional link {0}: {1}".format(linkSpec, error))
+                    for link in links:
+                        link.close()
+                    portReadable = 0
+                else:
+                    connectedPort = connect_port_get_packet.connect_multiple(links, self.log, dedupCache)
+                    portReadable = connectedPort.testRead()
+
             # If port is readable, store the reference to it and start reading. Either way, update the GUI serial status
             if portReadable:
-                # Store port in instance variable and start reading
+                # Store port in instance variable and start reading it on a thread of its own, so a thread still finishing
+                # with the last port can't read this one or close it when it finishes
                 self.connectedPort = connectedPort
+                self.portReadThread = PortReadThread(self.readPort, self.stopRead, connectedPort)
                 self.portReadThread.start()
 
                 # Update GUI
                 palette = QtGui.QPalette()
                 palette.setColor(QtGui.QPalette.Foreground, QColor(55, 195, 58))  # Green
-                if self.tabWidget_serialIp.currentIndex() == self.tabWidget_serialIp.indexOf(self.serial):
-                    self.label_serialStatus.setText(QtGui.QApplication.translate("MainWindow", "Reading", None, QtGui.QApplication.UnicodeUTF8))
-                    self.label_serialStatus.setPalette(palette)
-                else:
-                    self.label_socketStatus.setText(QtGui.QApplication.translate("MainWindow", "Reading", None, QtGui.QApplication.UnicodeUTF8))
-                    self.label_socketStatus.setPalette(palette)
+                self.currentStatusLabel().setText(QtGui.QApplication.translate("MainWindow", "Reading", None, QtGui.QApplication.UnicodeUTF8))
+                self.currentStatusLabel().setPalette(palette)
             else:
                 palette = QtGui.QPalette()
                 palette.setColor(QtGui.QPalette.Foreground, QColor(242, 86, 77))  # Red
-                if self.tabWidget_serialIp.currentTabText == "Serial":
-                    self.label_serialStatus.setText(QtGui.QApplication.translate("MainWindow", "Read failed", None, QtGui.QApplication.UnicodeUTF8))
-                    self.label_serialStatus.setPalette(palette)
-                else:
-                    self.label_socketStatus.setText(QtGui.QApplication.translate("MainWindow", "Read failed", None, QtGui.QApplication.UnicodeUTF8))
-                    self.label_socketStatus.setPalette(palette)
+                self.currentStatusLabel().setText(QtGui.QApplication.translate("MainWindow", "Read failed", None, QtGui.QApplication.UnicodeUTF8))
+                self.currentStatusLabel().setPalette(palette)
         else:
             self.log.info("Attempting to disconnect from port")
 
@@ -161,16 +358,249 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             self.actionConnect.setText(QtGui.QApplication.translate("MainWindow", "Connect", None, QtGui.QApplication.UnicodeUTF8))
             palette = QtGui.QPalette()
             palette.setColor(QtGui.QPalette.Foreground, QColor(242, 86, 77))  # Red
-            if self.tabWidget_serialIp.currentIndex() == self.tabWidget_serialIp.indexOf(self.serial):
-                self.label_serialStatus.setText(QtGui.QApplication.translate("MainWindow", "Port closed", None, QtGui.QApplication.UnicodeUTF8))
-                self.label_serialStatus.setPalette(palette)
-            else:
-                self.label_socketStatus.setText(QtGui.QApplication.translate("MainWindow", "Port closed", None, QtGui.QApplication.UnicodeUTF8))
-                self.label_socketStatus.setPalette(palette)
+            self.currentStatusLabel().setText(QtGui.QApplication.translate("MainWindow", "Port closed", None, QtGui.QApplication.UnicodeUTF8))
+            self.currentStatusLabel().setPalette(palette)
 
             # Actually close the port
             self.stopRead()
 
+    def currentStatusLabel(self):
+        """
+        Purpose:
+            Get the status label on the currently selected link tab (serial, TCP/IP or replay)
+         Input:
+            None
+         Output:
+            label [QLabel]: The status label
+        """
+        if self.tabWidget_serialIp.currentWidget() == self.replay:
+            return self.label_replayStatus
+        elif self.tabWidget_serialIp.currentIndex() == self.tabWidget_serialIp.indexOf(self.serial):
+            return self.label_serialStatus
+        else:
+            return self.label_socketStatus
+
+    def buildReplayTab(self, page):
+        """
+        Purpose:
+            Populate the replay tab (built the first time it is shown) with the log file and speed inputs
+         Input:
+            page [QWidget]: The empty tab page
+         Output:
+            None
+        """
+        layout = QtGui.QGridLayout(page)
+        layout.addWidget(QtGui.QLabel("Log file (.dat or .txt)"), 0, 0)
+        self.lineEdit_replayFile = QtGui.QLineEdit(self.settings.get('replayFile', ''))
+        layout.addWidget(self.lineEdit_replayFile, 0, 1)
+        browseButton = QtGui.QPushButton("Browse...")
+        browseButton.clicked.connect(self.browseReplayFileClicked)
+        layout.addWidget(browseButton, 0, 2)
+        layout.addWidget(QtGui.QLabel("Speed (1 = real time, 0 = unthrottled)"), 1, 0)
+        self.lineEdit_replaySpeed = QtGui.QLineEdit(str(self.settings.get('replaySpeed', 1.0)))
+        layout.addWidget(self.lineEdit_replaySpeed, 1, 1)
+        self.label_replayStatus = QtGui.QLabel("Not replaying")
+        layout.addWidget(self.label_replayStatus, 2, 0, 1, 3)
+        layout.setRowStretch(3, 1)
+
+    def buildDiagnosticsTab(self, page):
+        """
+        Purpose:
+            Populate the diagnostics tab (built the first time it is shown) with the per-stage latency histograms, which
+            then redraw every second
+         Input:
+            page [QWidget]: The empty tab page
+         Output:
+            None
+        """
+        layout = QtGui.QGridLayout(page)
+        self.textBrowser_latency = QtGui.QTextBrowser()
+        self.textBrowser_latency.setFont(QtGui.QFont("Courier"))
+        layout.addWidget(self.textBrowser_latency, 0, 0, 1, 2)
+        dumpButton = QtGui.QPushButton("Dump to log folder")
+        dumpButton.clicked.connect(self.dumpLatencyClicked)
+        layout.addWidget(dumpButton, 1, 0)
+        resetButton = QtGui.QPushButton("Reset")
+        resetButton.clicked.connect(self.latencyMonitor.reset)
+        layout.addWidget(resetButton, 1, 1)
+        self.checkBox_profiling = QtGui.QCheckBox("Profile the reading thread (cProfile for {0:g} s, tracemalloc every {1:g} s) to the log folder".format(
+            self.profiling.window, self.profiling.snapshotInterval))
+        self.checkBox_profiling.setChecked(self.profiling.enabled)
+        self.checkBox_profiling.toggled.connect(self.profilingToggled)
+        layout.addWidget(self.checkBox_profiling, 2, 0, 1, 2)
+
+        self.diagnosticsTimer = QtCore.QTimer(self)
+        self.diagnosticsTimer.timeout.connect(self.updateDiagnostics)
+        self.diagnosticsTimer.start(diagnosticsRefreshIntervalMilliseconds)
+        self.updateDiagnostics()
+
+    def updateDiagnostics(self):
+        """
+        Purpose:
+            Redraw the per-link frame counts (when reading several links) and latency histograms in the diagnostics tab, unless it is hidden
+         Input:
+            None
+         Output:
+            None
+        """
+        if not self.textBrowser_latency.isVisible():
+            return
+        linkSummary = ""
+        if isinstance(getattr(self, 'connectedPort', None), connect_port_get_packet.connect_multiple):
+            linkSummary = "Frames per link (first heard there), duplicates dropped and time spent reconnecting:\n" + self.connectedPort.summary("\n") + "\n\n"
+        if not self.latencyMonitor.enabled:
+            self.textBrowser_latency.setPlainText(linkSummary + "Latency statistics are disabled (MINXSS_LATENCY_STATS=0 or --no-latency-stats)")
+            return
+        self.textBrowser_latency.setPlainText(linkSummary + "Time each frame spent reaching each stage from the previous one, and from its first byte to its last stage (total)\n\n" +
+                                              self.latencyMonitor.summary())
+
+    def buildTelemetryTab(self, page):
+        """
+        Purpose:
+            Populate the telemetry tab (built the first time it is shown) with a row for every field in the telemetry schema,
+            which then shows the latest packet's values every second, colored by their limits
+         Input:
+            page [QWidget]: The empty tab page
+         Output:
+            None
+        """
+        layout = QtGui.QGridLayout(page)
+        self.label_telemetrySchema = QtGui.QLabel()
+        layout.addWidget(self.label_telemetrySchema, 0, 0)
+        self.tableWidget_telemetry = QtGui.QTableWidget(0, 3)
+        self.tableWidget_telemetry.setHorizontalHeaderLabels(["Telemetry point", "Value", "Unit"])
+        self.tableWidget_telemetry.setEditTriggers(QtGui.QAbstractItemView.NoEditTriggers)
+        layout.addWidget(self.tableWidget_telemetry, 1, 0)
+        self.setTelemetryTableRows(minxss_parser.telemetryRegistry)
+
+        self.telemetryTimer = QtCore.QTimer(self)
+        self.telemetryTimer.timeout.connect(self.updateTelemetryTable)
+        self.telemetryTimer.start(telemetryRefreshIntervalMilliseconds)
+        self.updateTelemetryTable()
+
+    def setTelemetryTableRows(self, registry):
+        """
+        Purpose:
+            Lay out the telemetry tab for a schema: one row per field with its name and unit
+         Input:
+            registry [telemetry_record.Telemetry_Registry]: The schema's compiled fields
+         Output:
+            None
+        """
+        self.telemetryTableRegistry = registry
+        self.label_telemetrySchema.setText("Schema: {0}".format(registry.name))
+        self.tableWidget_telemetry.setRowCount(len(registry.fields))
+        for field in registry.fields:
+            self.tableWidget_telemetry.setItem(field.fieldId, 0, QtGui.QTableWidgetItem(field.name))
+            self.tableWidget_telemetry.setItem(field.fieldId, 1, QtGui.QTableWidgetItem(""))
+            self.tableWidget_telemetry.setItem(field.fieldId, 2, QtGui.QTableWidgetItem(field.unit))
+
+    def updateTelemetryTable(self):
+        """
+        Purpose:
+            Show the latest packet's values in the telemetry tab, unless it is hidden or nothing has been parsed yet
+         Input:
+            None
+         Output:
+            None
+        """
+        selectedTelemetryDictionary = self.latestTelemetry
+        if selectedTelemetryDictionary is None or not self.tableWidget_telemetry.isVisible():
+            return
+        if selectedTelemetryDictionary.registry is not self.telemetryTableRegistry:  # A packet from another spacecraft
+            self.setTelemetryTableRows(selectedTelemetryDictionary.registry)
+        for field in self.telemetryTableRegistry.fields:
+            value = selectedTelemetryDictionary[field.fieldId]
+            item = self.tableWidget_telemetry.item(field.fieldId, 1)
+            item.setText("" if value is None else formatTelemetryValue(value))
+            limitState = field.limitState(value)
+            if limitState:
+                item.setForeground(limitColors[limitState])
+
+    def bindMainPanelLabels(self):
+        """
+        Purpose:
+            Look up the main panel's labels once, so a label missing from the .ui (e.g., renamed in Qt Designer) is logged
+            and skipped here rather than stopping the reading thread on the first packet
+         Input:
+            None
+         Output:
+            mainPanelWidgets [list of (string, QLabel)]: Each telemetry point (schema field name) in mainPanelLabels and its label
+        """
+        mainPanelWidgets = []
+        for fieldName, labelName in mainPanelLabels:
+            label = getattr(self, labelName, None)
+            if label is None:
+                self.log.error("No label {0} in ui_mainWindow.ui, so {1} won't be shown on the main panel".format(labelName, fieldName))
+                continue
+            mainPanelWidgets.append((fieldName, label))
+        return mainPanelWidgets
+
+    def displayTelemetry(self, selectedTelemetryDictionary):
+        """
+        Purpose:
+            Show a packet's telemetry on the main panel: each label found for mainPanelLabels gets its field's value, colored green,
+            yellow or red by the field's limits in the packet's schema. Labels for fields the schema doesn't have show "-".
+         Input:
+            selectedTelemetryDictionary [telemetry_record.Telemetry_Record]: From parsePacket
+         Output:
+            None
+        """
+        registry = selectedTelemetryDictionary.registry
+        for fieldName, label in self.mainPanelWidgets:
+            if fieldName not in registry.fieldIds:  # A packet from a spacecraft without this point
+                label.setText("-")
+                continue
+            field = registry.field(fieldName)
+            value = selectedTelemetryDictionary[field.fieldId]
+            label.setText(formatTelemetryValue(value))
+            limitState = field.limitState(value)
+            if limitState:
+                palette = QtGui.QPalette()
+                palette.setColor(QtGui.QPalette.Foreground, limitColors[limitState])
+                label.setPalette(palette)
+
+    def dumpLatencyClicked(self):
+        """
+        Purpose:
+            Respond to the dump button in the diagnostics tab -- write the latency histograms to a file in the log folder
+         Input:
+            None
+         Output:
+            None
+        """
+        filename = self.latencyMonitor.dump()
+        self.log.info("Wrote latency statistics to {0}".format(filename))
+        QtGui.QMessageBox.information(self, "Latency statistics", "Wrote latency statistics to {0}".format(filename))
+
+    def profilingToggled(self):
+        """
+        Purpose:
+            Respond to the profiling checkbox in the diagnostics tab -- start or stop profiling
+         Input:
+            None
+         Output:
+            None (though profiles and memory snapshots are written to the log folder)
+        """
+        if self.checkBox_profiling.isChecked():
+            self.profiling.start()
+        else:
+            self.profiling.stop()
+
+    def browseReplayFileClicked(self):
+        """
+        Purpose:
+            Respond to the replay browse button being clicked -- let the user pick a recorded log
+         Input:
+            None
+         Output:
+            None
+        """
+        filename, _ = QtGui.QFileDialog.getOpenFileName(self, "Select log to replay", os.path.join(beacon_pipeline.decoderHomeDirectory, "output"),
+                                                        "MinXSS logs (*.dat *.txt)")
+        if filename:
+            self.lineEdit_replayFile.setText(filename)
+
     def completePassClicked(self):
         """
         Purpose:
@@ -182,228 +612,80 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         """
         self.uploadData()
 
-    def readPort(self):
+    def readPort(self, connectedPort):
         """
         Purpose:
-            Read the buffer data from the port (be it serial or socket) in an infinite loop; decode and display any MinXSS housekeeping packets
+            Read the buffer data from the port (be it serial, socket or replay) in an infinite loop; decode and display any MinXSS housekeeping packets
          Input:
-            None
+            connectedPort [connect_serial, connect_socket, connect_multiple, connect_replay or reader_process.Reader_Process]: The port to read
          Output:
             None
         """
         # Infinite loop to read the port and display the data in the GUI and optionally write to output file
+        decodedInReaderProcess = isinstance(connectedPort, reader_process.Reader_Process)
         while(True):
-            bufferData = self.connectedPort.read_packet()
+            self.profiling.tick('reader')
+            try:
+                if decodedInReaderProcess:
+                    bufferData, selectedTelemetryDictionary, stamps, receiveTimes = connectedPort.read_decoded()
+                    stamps = self.latencyMonitor.resumeFrame(stamps)
+                else:
+                    bufferData = connectedPort.read_packet()
+                    receiveTimes = connectedPort.receiveTimes
+            except EOFError:
+                return  # End of a replay, the port was closed, or the reader process stopped; finishing the thread closes the port
             if len(bufferData) > 0:
-                # Decode KISS escape characters if necessary
-                if self.checkBox_decodeKiss.isChecked:
-                    bufferData = bufferData.replace(bytearray([0xdb, 0xdc]), bytearray([0xc0]))  # C0 is a special KISS character that get replaced; unreplace it
-                    bufferData = bufferData.replace(bytearray([0xdb, 0xdd]), bytearray([0xdd]))  # DB is a special KISS character that get replaced; unreplace it
-                formattedBufferData = ' '.join('0x{:02x}'.format(x) for x in bufferData)
+                if not decodedInReaderProcess:
+                    stamps = self.latencyMonitor.startFrame(connectedPort)
+
+                    # Decode KISS escape characters if necessary
+                    if self.settings.get('decodeKiss'):
+                        bufferData = beacon_pipeline.decodeKiss(bufferData)
+                        self.latencyMonitor.stamp(stamps, 'kissDecoded')
+                # Don't display, archive or parse corrupt frames (the reader process has already dropped them)
+                if not decodedInReaderProcess and not beacon_pipeline.checkFrame(bufferData, self.log):
+                    continue
+
+                formattedBufferData = beacon_pipeline.formatBufferData(bufferData)
                 self.textBrowser_serialOutput.append(formattedBufferData)
                 self.textBrowser_serialOutput.verticalScrollBar().setValue(self.textBrowser_serialOutput.verticalScrollBar().maximum())
 
-                if self.checkBox_saveLog.isChecked:
-                    # Human readable
-                    bufferOutputLog = open(self.bufferOutputFilename, 'a', 0)  # append to existing file
-                    bufferOutputLog.write(formattedBufferData)
-                    bufferOutputLog.closed
-
-                    # Binary
-                    bufferOutputBinaryLog = open(self.bufferOutputBinaryFilename, 'a', 0)  # append to existing file
-                    bufferOutputBinaryLog.write(bufferData)
-                    bufferOutputBinaryLog.closed
+                if self.settings.get('saveLog'):
+                    self.outputLog.write(bufferData, formattedBufferData, receiveTimes)
+                    self.latencyMonitor.stamp(stamps, 'persisted')
 
                 # Parse and interpret the binary data into human readable telemetry
-                minxssParser = minxss_parser.Minxss_Parser(bufferData, self.log)
-                selectedTelemetryDictionary = minxssParser.parsePacket(bufferData)
+                if not decodedInReaderProcess:
+                    selectedTelemetryDictionary = beacon_pipeline.parsePacket(bufferData, self.log)
+                    self.latencyMonitor.stamp(stamps, 'parsed')
 
                 # If valid data, update GUI with telemetry points
                 if selectedTelemetryDictionary != -1:
-                    ##
-                    # Display numbers in GUI
-                    ##
-
-                    # Current timestamp
-                    self.label_lastPacketTime.setText("Last packet at: {} local, {} UTC".format(datetime.datetime.now().isoformat(), datetime.datetime.utcnow().isoformat()))
-
-                    # Spacecraft State
-                    self.label_flightModel.setText("{0:0=1d}".format(selectedTelemetryDictionary['FlightModel']))
-                    self.label_commandAcceptCount.setText("{0:0=1d}".format(selectedTelemetryDictionary['CommandAcceptCount']))
-                    if selectedTelemetryDictionary['SpacecraftMode'] == 0:
-                        self.label_spacecraftMode.setText("Unknown")
-                    elif selectedTelemetryDictionary['SpacecraftMode'] == 1:
-                        self.label_spacecraftMode.setText("Phoenix")
-                    elif selectedTelemetryDictionary['SpacecraftMode'] == 2:
-                        self.label_spacecraftMode.setText("Safe")
-                    elif selectedTelemetryDictionary['SpacecraftMode'] == 4:
-                        self.label_spacecraftMode.setText("Science")
-                    if selectedTelemetryDictionary['PointingMode'] == 0:
-                        self.label_pointingMode.setText("Coarse Point")
-                    elif selectedTelemetryDictionary['PointingMode'] == 1:
-                        self.label_pointingMode.setText("Fine Point")
-                    if selectedTelemetryDictionary['EnableX123'] == 1:
-                        self.label_enableX123.setText("Yes")
-                    else:
-                        self.label_enableX123.setText("No")
-                    if selectedTelemetryDictionary['EnableSps'] == 1:
-                        self.label_enableSps.setText("Yes")
-                    else:
-                        self.label_enableSps.setText("No")
-                    if selectedTelemetryDictionary['Eclipse'] == 1:
-                        self.label_eclipse.setText("Eclipse")
-                    else:
-                        self.label_eclipse.setText("In Sun")
-
-                    # Solar Data
-                    self.label_spsX.setText("{0:.2f}".format(round(selectedTelemetryDictionary['SpsX'], 2)))
-                    self.label_spsY.setText("{0:.2f}".format(round(selectedTelemetryDictionary['SpsY'], 2)))
-                    self.label_xp.setText("{0:.2f}".format(round(selectedTelemetryDictionary['Xp'], 2)))
-
-                    # Power
-                    self.label_batteryVoltage.setText("{0:.2f}".format(round(selectedTelemetryDictionary['BatteryVoltage'], 2)))
-                    if selectedTelemetryDictionary['BatteryChargeCurrent'] > selectedTelemetryDictionary['BatteryDischargeCurrent']:
-                        batteryCurrent = selectedTelemetryDictionary['BatteryChargeCurrent'] / 1e3
-                        self.label_batteryCurrentText.setText("Battery Charge Current")
-                    else:
-                        batteryCurrent = selectedTelemetryDictionary['BatteryDischargeCurrent'] / 1e3
-                        self.label_batteryCurrentText.setText("Battery Discharge Current")
-                    self.label_batteryCurrent.setText("{0:.2f}".format(round(batteryCurrent, 2)))
-                    solarPanelMinusYPower = selectedTelemetryDictionary['SolarPanelMinusYVoltage'] * selectedTelemetryDictionary['SolarPanelMinusYCurrent'] / 1e3
-                    self.label_solarPanelMinusYPower.setText("{0:.2f}".format(round(solarPanelMinusYPower, 2)))
-                    solarPanelPlusXPower = selectedTelemetryDictionary['SolarPanelPlusXVoltage'] * selectedTelemetryDictionary['SolarPanelPlusXCurrent'] / 1e3
-                    self.label_solarPanelPlusXPower.setText("{0:.2f}".format(round(solarPanelPlusXPower, 2)))
-                    solarPanelPlusYPower = selectedTelemetryDictionary['SolarPanelPlusYVoltage'] * selectedTelemetryDictionary['SolarPanelPlusYCurrent'] / 1e3
-                    self.label_solarPanelPlusYPower.setText("{0:.2f}".format(round(solarPanelPlusYPower, 2)))
-
-                    # Temperature
-                    self.label_commBoardTemperature.setText("{0:.2f}".format(round(selectedTelemetryDictionary['CommBoardTemperature'], 2)))
-                    self.label_batteryTemperature.setText("{0:.2f}".format(round(selectedTelemetryDictionary['BatteryTemperature'], 2)))
-                    self.label_epsBoardTemperature.setText("{0:.2f}".format(round(selectedTelemetryDictionary['EpsBoardTemperature'], 2)))
-                    self.label_cdhTemperature.setText("{0:.2f}".format(round(selectedTelemetryDictionary['CdhBoardTemperature'], 2)))
-                    self.label_motherboardTemperature.setText("{0:.2f}".format(round(selectedTelemetryDictionary['MotherboardTemperature'], 2)))
-                    self.label_solarPanelMinusYTemperature.setText("{0:.2f}".format(round(selectedTelemetryDictionary['SolarPanelMinusYTemperature'], 2)))
-                    self.label_solarPanelPlusXTemperature.setText("{0:.2f}".format(round(selectedTelemetryDictionary['SolarPanelPlusXTemperature'], 2)))
-                    self.label_solarPanelPlusYTemperature.setText("{0:.2f}".format(round(selectedTelemetryDictionary['SolarPanelPlusYTemperature'], 2)))
-
-                    # Setup color palettes
-                    paletteGreen = QtGui.QPalette()
-                    paletteGreen.setColor(QtGui.QPalette.Foreground, QColor(55, 195, 58))  # Green
-                    paletteYellow = QtGui.QPalette()
-                    paletteYellow.setColor(QtGui.QPalette.Foreground, QColor(244, 212, 66))  # Yellow
-                    paletteRed = QtGui.QPalette()
-                    paletteRed.setColor(QtGui.QPalette.Foreground, QColor(242, 86, 77))  # Red
-
-                    ##
-                    # Color code telemetry
-                    ##
-
-                    # Spacecraft State
-                    if selectedTelemetryDictionary['SpacecraftMode'] == 0:
-                        self.label_spacecraftMode.setPalette(paletteRed)
-                    elif selectedTelemetryDictionary['SpacecraftMode'] == 1:
-                        self.label_spacecraftMode.setPalette(paletteRed)
-                    elif selectedTelemetryDictionary['SpacecraftMode'] == 2:
-                        self.label_spacecraftMode.setPalette(paletteYellow)
-                    elif selectedTelemetryDictionary['SpacecraftMode'] == 4:
-                        self.label_spacecraftMode.setPalette(paletteGreen)
-                    if selectedTelemetryDictionary['PointingMode'] == 0:
-                        self.label_pointingMode.setPalette(paletteYellow)
-                    elif selectedTelemetryDictionary['PointingMode'] == 1:
-                        self.label_pointingMode.setPalette(paletteGreen)
-
-                    # Solar Data
-                    if abs(selectedTelemetryDictionary['SpsX']) <= 3.0:
-                        self.label_spsX.setPalette(paletteGreen)
-                    else:
-                        self.label_spsX.setPalette(paletteRed)
-                    if abs(selectedTelemetryDictionary['SpsY']) <= 3.0:
-                        self.label_spsY.setPalette(paletteGreen)
-                    else:
-                        self.label_spsY.setPalette(paletteRed)
-                    if selectedTelemetryDictionary['Xp'] <= 24860.0 and selectedTelemetryDictionary['Xp'] >= 0:
-                        self.label_xp.setPalette(paletteGreen)
-                    else:
-                        self.label_xp.setPalette(paletteRed)
-
-                    # Power
-                    if solarPanelMinusYPower >= -1.0 and solarPanelMinusYPower <= 9.7:
-                        self.label_solarPanelMinusYPower.setPalette(paletteGreen)
-                    else:
-                        self.label_solarPanelMinusYPower.setPalette(paletteRed)
-                    if solarPanelPlusXPower >= -1.0 and solarPanelPlusXPower <= 5.9:
-                        self.label_solarPanelPlusXPower.setPalette(paletteGreen)
-                    else:
-                        self.label_solarPanelPlusXPower.setPalette(paletteRed)
-                    if solarPanelPlusYPower >= -1.0 and solarPanelPlusYPower <= 10.4:
-                        self.label_solarPanelPlusYPower.setPalette(paletteGreen)
-                    else:
-                        self.label_solarPanelPlusYPower.setPalette(paletteRed)
-                    if selectedTelemetryDictionary['BatteryVoltage'] >= 7.1:
-                        self.label_batteryVoltage.setPalette(paletteGreen)
-                    elif selectedTelemetryDictionary['BatteryVoltage'] >= 6.9:
-                        self.label_batteryVoltage.setPalette(paletteYellow)
-                    else:
-                        self.label_batteryVoltage.setPalette(paletteRed)
-                    if batteryCurrent >= 0 and batteryCurrent <= 2.9:
-                        self.label_batteryCurrent.setPalette(paletteGreen)
-                    else:
-                        self.label_batteryCurrent.setPalette(paletteRed)
-
-                    # Temperature
-                    if selectedTelemetryDictionary['CommBoardTemperature'] >= -8.0 and \
-                       selectedTelemetryDictionary['CommBoardTemperature'] <= 60.0:
-                        self.label_commBoardTemperature.setPalette(paletteGreen)
-                    else:
-                        self.label_commBoardTemperature.setPalette(paletteRed)
-                    if selectedTelemetryDictionary['BatteryTemperature'] >= 5.0 and \
-                       selectedTelemetryDictionary['BatteryTemperature'] <= 25:
-                        self.label_batteryTemperature.setPalette(paletteGreen)
-                    elif selectedTelemetryDictionary['BatteryTemperature'] >= 2.0 and selectedTelemetryDictionary['BatteryTemperature'] < 5.0 or selectedTelemetryDictionary['BatteryTemperature'] > 25.0:
-                        self.label_batteryTemperature.setPalette(paletteYellow)
-                    else:
-                        self.label_batteryTemperature.setPalette(paletteRed)
-                    if selectedTelemetryDictionary['EpsBoardTemperature'] >= -8.0 and \
-                       selectedTelemetryDictionary['EpsBoardTemperature'] <= 45.0:
-                        self.label_epsBoardTemperature.setPalette(paletteGreen)
-                    else:
-                        self.label_epsBoardTemperature.setPalette(paletteRed)
-                    if selectedTelemetryDictionary['CdhBoardTemperature'] >= -8.0 and \
-                       selectedTelemetryDictionary['CdhBoardTemperature'] <= 29.0:
-                        self.label_cdhTemperature.setPalette(paletteGreen)
-                    else:
-                        self.label_cdhTemperature.setPalette(paletteRed)
-                    if selectedTelemetryDictionary['MotherboardTemperature'] >= -13.0 and \
-                       selectedTelemetryDictionary['MotherboardTemperature'] <= 28.0:
-                        self.label_motherboardTemperature.setPalette(paletteGreen)
-                    else:
-                        self.label_motherboardTemperature.setPalette(paletteRed)
-                    if selectedTelemetryDictionary['SolarPanelMinusYTemperature'] >= -42.0 and \
-                       selectedTelemetryDictionary['SolarPanelMinusYTemperature'] <= 61.0:
-                        self.label_solarPanelMinusYTemperature.setPalette(paletteGreen)
-                    else:
-                        self.label_solarPanelMinusYTemperature.setPalette(paletteRed)
-                    if selectedTelemetryDictionary['SolarPanelPlusXTemperature'] >= -24.0 and \
-                       selectedTelemetryDictionary['SolarPanelPlusXTemperature'] <= 65.0:
-                        self.label_solarPanelPlusXTemperature.setPalette(paletteGreen)
-                    else:
-                        self.label_solarPanelPlusXTemperature.setPalette(paletteRed)
-                    if selectedTelemetryDictionary['SolarPanelPlusYTemperature'] >= -35.0 and \
-                       selectedTelemetryDictionary['SolarPanelPlusYTemperature'] <= 58.0:
-                        self.label_solarPanelPlusYTemperature.setPalette(paletteGreen)
-                    else:
-                        self.label_solarPanelPlusYTemperature.setPalette(paletteRed)
-
-    def stopRead(self):
-        """
-        Purpose:
-            Respond to disconnect button being clicked -- disconnect from the port, be it serial or socket
+                    self.latestTelemetry = selectedTelemetryDictionary
+
+                    # When the packet's last byte arrived (not when it was displayed)
+                    self.label_lastPacketTime.setText("Last packet at: {} local, {} UTC".format(latency_monitor.localIsoFormat(receiveTimes.lastByteUtc),
+                                                                                             latency_monitor.utcIsoFormat(receiveTimes.lastByteUtc)))
+
+                    # Every telemetry point bound to a label, colored by its limits in the schema
+                    self.displayTelemetry(selectedTelemetryDictionary)
+                    self.latencyMonitor.stamp(stamps, 'rendered')
+                self.latencyMonitor.finishFrame(stamps)
+
+    def stopRead(self, connectedPort=None):
+        """
+        Purpose:
+            Respond to disconnect button being clicked, or a port's reading thread finishing -- disconnect from the port, be it serial or socket
         Input:
-            None
+            connectedPort [connect_serial, connect_socket, etc.]: The port to close. None for the current one.
         Output:
             None
         """
-        self.connectedPort.close()
+        if connectedPort is None:
+            connectedPort = self.connectedPort
+        connectedPort.close()
+        if connectedPort is not self.connectedPort:
+            return  # An earlier port's thread finishing after a new port was connected
 
         # Update GUI
         self.label_serialStatus.setText(QtGui.QApplication.translate("MainWindow", "Port closed", None, QtGui.QApplication.UnicodeUTF8))
@@ -420,6 +702,7 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         Output:
             Creates a log file on disk if toggling on
         """
+        self.settings.set('saveLog', self.checkBox_saveLog.isChecked())
         if self.checkBox_saveLog.isChecked():
             self.setupOutputLog()
         else:
@@ -438,27 +721,13 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         Output:
             Creates a log file on disk if toggling on
         """
+        self.settings.set('forwardData', self.checkBox_forwardData.isChecked())
+        self.log.info("Forward data set to {0}".format(self.checkBox_forwardData.isChecked()))
         if self.checkBox_forwardData.isChecked():
             self.label_uploadStatus.setText("Upload status: Idle")
-
-            # Write the input settings used to the input_properties.cfg configuration file
-            config = SafeConfigParser()
-            config.read('input_properties.cfg')
-            config.set('input_properties', 'forwardData', "True")
-            self.log.info("Forward data set to True")
-            with open(os.path.join(os.path.expanduser("~"), "MinXSS_Beacon_Decoder", "input_properties.cfg"), 'wb') as configfile:
-                config.write(configfile)
         else:
             self.label_uploadStatus.setText("Upload status: Disabled")
 
-            # Write the input settings used to the input_properties.cfg configuration file
-            config = SafeConfigParser()
-            config.read('input_properties.cfg')
-            config.set('input_properties', 'forwardData', "False")
-            self.log.info("Forward data set to False")
-            with open(os.path.join(os.path.expanduser("~"), "MinXSS_Beacon_Decoder", "input_properties.cfg"), 'wb') as configfile:
-                config.write(configfile)
-
     def decodeKissToggled(self):
         """
         Purpose:
@@ -468,20 +737,8 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         Output:
             Creates a log file on disk if toggling on
         """
-        if self.checkBox_decodeKiss.isChecked():
-            config = SafeConfigParser()
-            config.read('input_properties.cfg')
-            config.set('input_properties', 'decodeKiss', "True")
-            self.log.info("Decode KISS set to True")
-            with open(os.path.join(os.path.expanduser("~"), "MinXSS_Beacon_Decoder", "input_properties.cfg"), 'wb') as configfile:
-                config.write(configfile)
-        else:
-            config = SafeConfigParser()
-            config.read('input_properties.cfg')
-            config.set('input_properties', 'decodeKiss', "False")
-            self.log.info("Decode KISS set to False")
-            with open(os.path.join(os.path.expanduser("~"), "MinXSS_Beacon_Decoder", "input_properties.cfg"), 'wb') as configfile:
-                config.write(configfile)
+        self.settings.set('decodeKiss', self.checkBox_decodeKiss.isChecked())
+        self.log.info("Decode KISS set to {0}".format(self.checkBox_decodeKiss.isChecked()))
 
     def setupOutputLog(self):
         """
@@ -492,30 +749,13 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         Output:
             A .tex file with hex MinXSS data and a .dat file with binary MinXSS data
         """
-        # Human readable log
-        if not os.path.exists(os.path.join(os.path.expanduser("~"), "MinXSS_Beacon_Decoder", "output")):
-            os.makedirs(os.path.join(os.path.expanduser("~"), "MinXSS_Beacon_Decoder", "output"))
-        self.bufferOutputFilename = os.path.join(os.path.expanduser("~"), "MinXSS_Beacon_Decoder", "output", datetime.datetime.now().isoformat().replace(':', '_')) + ".txt"
+        self.outputLog = beacon_pipeline.Output_Log(self.lineEdit_latitude.text(), self.lineEdit_longitude.text(), self.log)
 
-        with open(self.bufferOutputFilename, 'w') as bufferOutputLog:
-            # Update the GUI for the log file - is saving
-            self.textBrowser_savingToLogFile.setText("Saving to log file: " + self.bufferOutputFilename)
-            palette = QtGui.QPalette()
-            palette.setColor(QtGui.QPalette.Text, QColor(55, 195, 58))  # Green
-            self.textBrowser_savingToLogFile.setPalette(palette)
-        bufferOutputLog.closed
-
-        # Binary log
-        if not os.path.exists(os.path.join(os.path.expanduser("~"), "MinXSS_Beacon_Decoder", "output")):
-            os.makedirs(os.path.join(os.path.expanduser("~"), "MinXSS_Beacon_Decoder", "output"))
-        latitude = self.lineEdit_latitude.text()
-        longitude = self.lineEdit_longitude.text()
-
-        self.bufferOutputBinaryFilename = os.path.join(os.path.expanduser("~"), "MinXSS_Beacon_Decoder", "output", datetime.datetime.now().isoformat().replace(':', '_')) + "_" + latitude + "_" + longitude + ".dat"
-
-        with open(self.bufferOutputBinaryFilename, 'w') as bufferOutputBinaryLog:
-            self.log.info("Opening binary file for buffer data")
-        bufferOutputBinaryLog.closed
+        # Update the GUI for the log file - is saving
+        self.textBrowser_savingToLogFile.setText("Saving to log file: " + self.outputLog.bufferOutputFilename)
+        palette = QtGui.QPalette()
+        palette.setColor(QtGui.QPalette.Text, QColor(55, 195, 58))  # Green
+        self.textBrowser_savingToLogFile.setPalette(palette)
 
     def createLog(self):
         """
@@ -526,30 +766,22 @@ class MainWindow(QMainWindow, Ui_MainWindow):
         Output:
             The .log file for informational and debug statements
         """
-        if not os.path.exists(os.path.join(os.path.expanduser("~"), "MinXSS_Beacon_Decoder", "log")):
-            os.makedirs(os.path.join(os.path.expanduser("~"), "MinXSS_Beacon_Decoder", "log"))
-        log = logging.getLogger('serial_reader_debug')
-        handler = logging.FileHandler(os.path.join(os.path.expanduser("~"), "MinXSS_Beacon_Decoder", "log", "minxss_beacon_decoder_debug.log"))
-        formatter = logging.Formatter('%(asctime)s %(levelname)s %(message)s')
-        handler.setFormatter(formatter)
-        log.addHandler(handler)
-        log.setLevel(logging.DEBUG)
-        log.info("Launched MinXSS Beacon Decoder")
-        return log
+        return beacon_pipeline.createLog()
 
     def uploadData(self):
         """
         Purpose:
             Upload binary data to the MinXSS team
         Input:
-            None (though will grab the .dat binary file from disk)
+            None (though will grab the .dat binary file and its receive times from disk)
         Output:
-            None (though will send that .dat binary file over the internet via scp to a server handled by the MinXSS team)
+            None (though will send those files over the internet via scp to a server handled by the MinXSS team)
         """
-        if self.checkBox_forwardData.isChecked:
+        if self.settings.get('forwardData'):
             self.label_uploadStatus.setText("Upload status: Uploading")
             self.log.info("Uploading data")
-            file_upload.upload(self.bufferOutputBinaryFilename, self.log)
+            file_upload.upload(self.outputLog.bufferOutputBinaryFilename, self.log)
+            file_upload.upload(self.outputLog.receiveTimesFilename, self.log)
             self.label_uploadStatus.setText("Upload status: Complete")
             self.log.info("Upload complete")
 
@@ -563,39 +795,99 @@ class MainWindow(QMainWindow, Ui_MainWindow):
             None
         """
         self.log.info("About to quit")
+        if self.hotplugObserver:
+            self.hotplugObserver.stop()
         self.uploadData()
+        self.profiling.stop()
+        self.settings.flush()
         self.log.info("Closing MinXSS Beacon Decoder")
 
 
+class Startup_Timer():
+    """
+    Purpose:
+        Record how long after the process started each stage of startup finished. Enable with the --startup-timing
+        command line flag or the MINXSS_STARTUP_TIMING environment variable. Results go to the debug log and stderr.
+    Input:
+        enabled [bool]: When False, mark and report do nothing
+    Output:
+        N/A
+    """
+    def __init__(self, enabled):
+        self.enabled = enabled
+        self.stages = []
+
+    def mark(self, stage):
+        if self.enabled:
+            self.stages.append((stage, time.time() - processStartTime))
+
+    def report(self, log):
+        if not self.enabled:
+            return
+        for stage, elapsed in self.stages:
+            message = "Startup: {0} after {1:.3f} s".format(stage, elapsed)
+            log.info(message)
+            sys.stderr.write(message + "\n")
+
+
+class PortScanThread(QtCore.QThread):
+    """
+    Purpose:
+        Enumerate the serial ports off of the GUI thread, since that can take a while on machines with many USB/virtual ports
+    Input:
+        QtCore.QThread: The thread to run this task on
+    Output:
+        portsFound signal: Emitted with the list of port names when done
+    """
+    portsFound = QtCore.Signal(list)
+
+    def run(self):
+        self.portsFound.emit(port_discovery.listPortNames())
+
+
 class PortReadThread(QtCore.QThread):
     """
     Purpose:
-        Separate class that handles reading the port in an infinite loop -- means the main loop can still be responsive to user interaction
+        Separate class that handles reading the port in an infinite loop -- means the main loop can still be responsive to user interaction.
+        Make a new one for each port rather than starting one again.
     Input:
         QtCore.QThread: The thread to run this task on
+        target [function]: Called with the port to read it
+        slotOnFinished [function]: Called (on the GUI thread) with the port once target returns
+        connectedPort: The port
     Output:
-        N/A
+        readFinished signal: Emitted with the port when target returns
     """
-    def __init__(self, target, slotOnFinished=None):
+    readFinished = QtCore.Signal(object)
+
+    def __init__(self, target, slotOnFinished=None, connectedPort=None):
         super(PortReadThread, self).__init__()
         self.target = target
+        self.connectedPort = connectedPort
         if slotOnFinished:
-            self.finished.connect(slotOnFinished)
+            self.readFinished.connect(slotOnFinished)
 
-    def run(self, *args, **kwargs):
+    def run(self):
         """
         Purpose:
             Run a specific block of code in the thread
         Input:
-            args, kwargs: flexible input for arguments
+            None
         Output:
             None
         """
-        self.target(*args, **kwargs)
+        try:
+            self.target(self.connectedPort)
+        finally:
+            self.readFinished.emit(self.connectedPort)
 
 
 if __name__ == '__main__':
+    multiprocessing.freeze_support()  # For the reader process in a PyInstaller build
+    startupTimer = Startup_Timer('--startup-timing' in sys.argv or bool(os.environ.get('MINXSS_STARTUP_TIMING')))
+    startupTimer.mark("Imports done")
     app = QApplication(sys.argv)
-    mainWin = MainWindow()
+    latencyMonitor = latency_monitor.Latency_Monitor('--no-latency-stats' not in sys.argv and os.environ.get('MINXSS_LATENCY_STATS') != '0')
+    mainWin = MainWindow(startupTimer, latencyMonitor, '--profile' in sys.argv or bool(os.environ.get('MINXSS_PROFILE')))
     ret = app.exec_()
     sys.exit(ret)
@@ -0,0 +1,174 @@
+"""Decode MinXSS beacons from a serial port or TCP/IP socket without the GUI (never imports Qt)"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import os
+import sys
+import signal
+import json
+import logging
+import argparse
+import connect_port_get_packet
+import beacon_pipeline
+import frame_dedup
+import settings_store
+import latency_monitor
+import profiling_mode
+import pipeline_metrics
+
+
+# Purpose:
+#   Read packets forever, decoding each one and writing it to stdout as a JSON line (stamped with when it was received)
+#   and/or to the output logs
+# Input:
+#   connectedPort [connect_serial, connect_socket, connect_multiple or connect_replay]: An open ground station link (or links, or replay)
+#   log [logging.Logger]: The debug log
+#   decodeKissCharacters [bool]: Undo KISS escaping before parsing
+#   outputLog [beacon_pipeline.Output_Log]: Where to archive the packets. None to skip archiving.
+#   outputStream [file]: Where to write the JSON lines. None to skip.
+#   latencyMonitor [latency_monitor.Latency_Monitor]: Where to record per-stage latencies. None to skip.
+#   profiling [profiling_mode.Profiling_Mode]: Profiles this loop while enabled. None to skip.
+# Output:
+#   None
+#
+def readPort(connectedPort, log, decodeKissCharacters=True, outputLog=None, outputStream=sys.stdout, latencyMonitor=None, profiling=None):
+    latencyMonitor = latencyMonitor or latency_monitor.Latency_Monitor(False)
+    profiling = profiling or profiling_mode.Profiling_Mode(log)
+    while True:
+        profiling.tick('reader')
+        bufferData = connectedPort.read_packet()
+        if len(bufferData) == 0:
+            continue
+        stamps = latencyMonitor.startFrame(connectedPort)
+        receiveTimes = connectedPort.receiveTimes
+        if decodeKissCharacters:
+            bufferData = beacon_pipeline.decodeKiss(bufferData)
+            latencyMonitor.stamp(stamps, 'kissDecoded')
+        if not beacon_pipeline.checkFrame(bufferData, log):
+            continue
+        if outputLog:
+            outputLog.write(bufferData, receiveTimes=receiveTimes)
+            latencyMonitor.stamp(stamps, 'persisted')
+
+        selectedTelemetryDictionary = beacon_pipeline.parsePacket(bufferData, log)
+        latencyMonitor.stamp(stamps, 'parsed')
+        if selectedTelemetryDictionary != -1 and outputStream:
+            record = {'time': latency_monitor.utcIsoFormat(receiveTimes.lastByteUtc), 'received': receiveTimes.asDictionary(),
+                      'schema': selectedTelemetryDictionary.registry.name, 'telemetry': selectedTelemetryDictionary}
+            outputStream.write(json.dumps(record, default=beacon_pipeline.jsonDefault) + '\n')
+            outputStream.flush()
+            latencyMonitor.stamp(stamps, 'rendered')
+        latencyMonitor.finishFrame(stamps)
+
+
+# Purpose:
+#   Write the latency histograms to the log directory and say where
+# Input:
+#   latencyMonitor [latency_monitor.Latency_Monitor]: The histograms to dump
+#   log [logging.Logger]: The debug log
+# Output:
+#   None
+#
+def dumpLatency(latencyMonitor, log):
+    filename = latencyMonitor.dump()
+    log.info("Wrote latency statistics to {0}".format(filename))
+    sys.stderr.write(latencyMonitor.summary() + "\nWrote latency statistics to {0}\n".format(filename))
+
+
+def main(argv=None):
+    log = logging.getLogger(beacon_pipeline.logName)  # Its file isn't set up until the arguments are parsed, so --help doesn't create it
+    settings = settings_store.Settings_Store(log)  # Defaults come from the last settings used in the GUI
+
+    argumentParser = argparse.ArgumentParser(description="Decode MinXSS beacons without the GUI")
+    linkGroup = argumentParser.add_mutually_exclusive_group()
+    linkGroup.add_argument('--serial-port', help="Serial port the TNC is on, e.g., /dev/ttyUSB0 or COM3")
+    linkGroup.add_argument('--ip-address', help="IP address of the TNC's TCP/IP server")
+    linkGroup.add_argument('--replay', help="Recorded .dat or .txt log to play back instead of a live link")
+    argumentParser.add_argument('--link', action='append', default=[],
+                                help="Another TNC to read at the same time (repeat for each): tcp://IP_ADDRESS:PORT or SERIAL_PORT[@BAUD_RATE]. "
+                                     "Packets heard on more than one link are only decoded once.")
+    argumentParser.add_argument('--baud-rate', default=settings.get('baudRate', 19200), help="Baud rate for the serial port")
+    argumentParser.add_argument('--port', default=settings.get('port', 10000), help="Port of the TNC's TCP/IP server")
+    argumentParser.add_argument('--dedup-cache-size', type=int, default=settings.get('dedupCacheSize', frame_dedup.defaultCacheSize),
+                                help="Packets to remember so one received again (e.g., on another link, or resent after a reconnect) is dropped (0 for off)")
+    argumentParser.add_argument('--dedup-window', type=float, default=settings.get('dedupWindow', frame_dedup.defaultWindow),
+                                help="Seconds to remember each packet for")
+    argumentParser.add_argument('--replay-speed', type=float, default=1.0, help="Replay speed: 1 for real time, N for N times faster, 0 for as fast as possible")
+    argumentParser.add_argument('--no-decode-kiss', action='store_true', help="Don't undo KISS escaping")
+    argumentParser.add_argument('--save-log', action='store_true', help="Write the .txt and .dat logs to ~/MinXSS_Beacon_Decoder/output")
+    argumentParser.add_argument('--latitude', default=settings.get('latitude', '0'), help="Ground station latitude for the binary log filename")
+    argumentParser.add_argument('--longitude', default=settings.get('longitude', '0'), help="Ground station longitude for the binary log filename")
+    argumentParser.add_argument('--no-json', action='store_true', help="Don't write decoded telemetry to stdout")
+    argumentParser.add_argument('--forward-data', action='store_true', help="Upload the binary log to the MinXSS team on exit (requires --save-log)")
+    argumentParser.add_argument('--latency-stats', action='store_true', help="Time each pipeline stage and write the latency histograms to ~/MinXSS_Beacon_Decoder/log on exit (and on SIGUSR1)")
+    argumentParser.add_argument('--metrics-port', type=int, default=settings.get('metricsPort', 0),
+                                help="Serve Prometheus metrics at http://localhost:PORT/metrics (0 for off)")
+    argumentParser.add_argument('--metrics-host', default='127.0.0.1', help="Address for the metrics endpoint (0.0.0.0 to allow scraping from other computers)")
+    argumentParser.add_argument('--profile', action='store_true', default=bool(os.environ.get('MINXSS_PROFILE')),
+                                help="Profile the reading loop with cProfile and snapshot memory with tracemalloc, writing to ~/MinXSS_Beacon_Decoder/log "
+                                     "(also enabled by the MINXSS_PROFILE environment variable, and toggled by SIGUSR2)")
+    argumentParser.add_argument('--profile-window', type=float, default=60.0, help="Seconds of cProfile data to capture each time profiling is enabled")
+    argumentParser.add_argument('--snapshot-interval', type=float, default=300.0, help="Seconds between tracemalloc snapshots while profiling")
+    arguments = argumentParser.parse_args(argv)
+    if not (arguments.serial_port or arguments.ip_address or arguments.replay or arguments.link):
+        argumentParser.error("one of the arguments --serial-port --ip-address --replay --link is required")
+    if arguments.replay and arguments.link:
+        argumentParser.error("--link can't be used with --replay")
+    log = beacon_pipeline.createLog()
+
+    profiling = profiling_mode.Profiling_Mode(log, arguments.profile, arguments.profile_window, arguments.snapshot_interval)
+    if hasattr(signal, 'SIGUSR2'):  # Not on Windows
+        signal.signal(signal.SIGUSR2, lambda signalNumber, frame: profiling.toggle())
+
+    latencyMonitor = latency_monitor.Latency_Monitor(arguments.latency_stats or arguments.metrics_port > 0)
+    if arguments.latency_stats and hasattr(signal, 'SIGUSR1'):  # Not on Windows
+        signal.signal(signal.SIGUSR1, lambda signalNumber, frame: dumpLatency(latencyMonitor, log))
+
+    if arguments.metrics_port:
+        pipeline_metrics.startServer(arguments.metrics_port, arguments.metrics_host, latencyMonitor)
+        log.info("Serving metrics on {0}:{1}".format(arguments.metrics_host, arguments.metrics_port))
+
+    outputLog = None
+    if arguments.save_log:
+        outputLog = beacon_pipeline.Output_Log(arguments.latitude, arguments.longitude, log)
+
+    dedupCache = frame_dedup.createCache(arguments.dedup_cache_size, arguments.dedup_window)
+    links = []
+    if arguments.serial_port:
+        links.append(connect_port_get_packet.connect_serial(arguments.serial_port, arguments.baud_rate, log, dedupCache))
+        if not links[0].testRead():
+            sys.exit("Could not read from {0}".format(arguments.serial_port))
+    elif arguments.ip_address:
+        links.append(connect_port_get_packet.connect_socket(arguments.ip_address, arguments.port, log, dedupCache=dedupCache))
+    for linkSpec in arguments.link:
+        links.append(connect_port_get_packet.openLinkSpec(linkSpec, arguments.baud_rate, log, dedupCache))
+
+    if arguments.replay:
+        connectedPort = connect_port_get_packet.connect_replay(arguments.replay, log, arguments.replay_speed)
+    elif len(links) > 1:
+        connectedPort = connect_port_get_packet.connect_multiple(links, log, dedupCache)
+    else:
+        connectedPort = links[0]
+
+    outputStream = None if arguments.no_json else sys.stdout
+    try:
+        readPort(connectedPort, log, not arguments.no_decode_kiss, outputLog, outputStream, latencyMonitor, profiling)
+    except (KeyboardInterrupt, EOFError):
+        log.info("About to quit")
+    finally:
+        connectedPort.close()
+        profiling.stop()
+        profiling.tick('reader')  # Write out the reading loop's profile if its window hadn't finished
+        if arguments.latency_stats:
+            dumpLatency(latencyMonitor, log)
+        if arguments.forward_data and outputLog:
+            import file_upload  # Only needed on exit, and pulls in requests
+            log.info("Uploading data")
+            file_upload.upload(outputLog.bufferOutputBinaryFilename, log)
+            file_upload.upload(outputLog.receiveTimesFilename, log)
+            log.info("Upload complete")
+        log.info("Closing MinXSS Beacon Decoder")
+
+
+if __name__ == '__main__':
+    main()
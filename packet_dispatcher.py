@@ -0,0 +1,295 @@
+"""Recognize every registered packet type by its start sync bytes in a single scan, frame packets out of the bytes coming in
+from a link, and route each packet to the handler for its type"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import re
+import log_packets
+import minxss_parser
+import pipeline_metrics
+
+logSyncBytes = bytes(bytearray([0x08, 0x1d]))  # MinXSS log packets
+maxFrameLength = 500  # [bytes] Assuming that there's no way to have this much header on the 254 byte MinXSS packet
+maxHeaderLength = 18  # [bytes] KISS command (2 bytes with the FEND) and AX.25 header kept in front of a packet's start sync
+kissEscape = bytes(bytearray([0xdb]))  # In a KISS encoded stream, each of these stands for one byte of the packet
+
+
+class Packet_Type():
+    """
+    Purpose:
+        One kind of packet the links can receive, e.g., housekeeping (0x08 0x19) or log (0x08 0x1D)
+    Input:
+        name [string]: e.g., 'housekeeping'
+        startSyncBytes [bytes]: The header that starts the packet
+        stopSyncBytes [bytes]: The footer that ends it
+        handler [function]: Called as handler(frame, syncOffset, log, receiveTimes) for each packet of this type, with the
+                            packet's latency_monitor.Receive_Times (None if unknown, e.g., reprocessing an archive). None to
+                            have the link return the packet from read_packet instead, i.e., send it down the telemetry pipeline.
+        trailerLength [int]: Bytes after the stop sync that belong to the frame, e.g., 2 for an AX.25 frame check sequence
+        packetLength [int]: Bytes from the start sync through the stop sync, if every packet of this type is that long.
+                            Packets are then only accepted with their stop sync exactly there. None for variable length.
+    Output:
+        N/A
+    """
+    def __init__(self, name, startSyncBytes, stopSyncBytes, handler=None, trailerLength=0, packetLength=None):
+        self.name = name
+        self.startSyncBytes = bytes(bytearray(startSyncBytes))
+        self.stopSyncBytes = bytes(bytearray(stopSyncBytes))
+        self.handler = handler
+        self.trailerLength = trailerLength
+        self.packetLength = packetLength
+        self.cutOffSyncs = (self.startSyncBytes,)  # Start sync bytes that mean a packet of this type was cut off; set by register
+
+
+class Packet_Dispatcher():
+    """
+    Purpose:
+        Hold the registered packet types and find whichever of their start sync bytes comes first in a buffer with one
+        precompiled regular expression (an alternation of every header), so adding a packet type doesn't add another scan
+    Input:
+        None
+    Output:
+        N/A
+    """
+    def __init__(self):
+        self.packetTypes = []
+        self.startPattern = None
+        self.longestStartSync = 0
+
+    def register(self, packetType):
+        """
+        Purpose:
+            Add a packet type, replacing any already registered with the same start sync bytes
+        Input:
+            packetType [Packet_Type]: The packet type
+        Output:
+            None
+        """
+        self.packetTypes = [registered for registered in self.packetTypes if registered.startSyncBytes != packetType.startSyncBytes]
+        self.packetTypes.append(packetType)
+        self.packetTypes.sort(key=lambda registered: len(registered.startSyncBytes), reverse=True)  # Longest header wins a tie
+        self.startPattern = re.compile(b'|'.join(b'(' + re.escape(registered.startSyncBytes) + b')' for registered in self.packetTypes))
+        self.longestStartSync = len(self.packetTypes[0].startSyncBytes)
+        pipelineStartSyncs = [registered.startSyncBytes for registered in self.packetTypes if registered.handler is None]
+        for registered in self.packetTypes:
+            registered.cutOffSyncs = tuple(set([registered.startSyncBytes] + pipelineStartSyncs))
+
+    def packetType(self, name):
+        for packetType in self.packetTypes:
+            if packetType.name == name:
+                return packetType
+        return None
+
+    def findStart(self, buffer, position=0):
+        """
+        Purpose:
+            Find the first packet header of any registered type
+        Input:
+            buffer [bytearray]: The bytes to search
+            position [int]: Where to start searching
+        Output:
+            startIndex [int]: Index of the start sync bytes. -1 if none found.
+            packetType [Packet_Type]: Which type of packet starts there. None if none found.
+        """
+        match = self.startPattern.search(buffer, position)
+        if match is None:
+            return -1, None
+        return match.start(), self.packetTypes[match.lastindex - 1]
+
+    def findCutOff(self, buffer, packetType, start, stop):
+        """
+        Purpose:
+            Check whether a packet was cut off before its stop sync bytes, i.e., another packet of its type, or a housekeeping
+            packet (which shouldn't be lost to e.g. a truncated log packet), starts before them
+        Input:
+            buffer [bytearray]: The bytes holding the packet
+            packetType [Packet_Type]: The packet's type
+            start [int]: Index just past the packet's start sync bytes
+            stop [int]: Index of its stop sync bytes
+        Output:
+            cutOffIndex [int]: Index of the first start sync bytes in between. -1 if the packet is whole.
+        """
+        cutOffIndex = -1
+        for syncBytes in packetType.cutOffSyncs:
+            index = buffer.find(syncBytes, start, stop)
+            if index != -1 and (cutOffIndex == -1 or index < cutOffIndex):
+                cutOffIndex = index
+        return cutOffIndex
+
+    def findExpectedStop(self, buffer, startIndex, packetType):
+        """
+        Purpose:
+            Validate a candidate fixed-length packet: its stop sync bytes must be exactly packetLength bytes from its start,
+            counting the packet either as is or as KISS encoded (where each escape stands for one byte)
+        Input:
+            buffer [bytearray]: The bytes holding the candidate
+            startIndex [int]: Index of its start sync bytes
+            packetType [Packet_Type]: Its type, with packetLength set
+        Output:
+            stopIndex [int]: Index of its stop sync bytes. -1 if they aren't where they should be (not a whole packet, e.g.,
+                             a start sync in noise or a packet cut short). None if there aren't enough bytes yet to tell.
+        """
+        stopSyncBytes = packetType.stopSyncBytes
+        stopIndex = startIndex + packetType.packetLength - len(stopSyncBytes)
+        if len(buffer) < stopIndex + len(stopSyncBytes):
+            return None
+        if buffer.startswith(stopSyncBytes, stopIndex):
+            return stopIndex
+        escapedStopIndex = stopIndex
+        while True:  # Each escape pushes the stop sync one byte further, which may take in more escapes
+            nextStopIndex = stopIndex + buffer.count(kissEscape, startIndex, escapedStopIndex)
+            if nextStopIndex == escapedStopIndex:
+                break
+            escapedStopIndex = nextStopIndex
+            if len(buffer) < escapedStopIndex + len(stopSyncBytes):
+                return None
+        if escapedStopIndex != stopIndex and buffer.startswith(stopSyncBytes, escapedStopIndex):
+            return escapedStopIndex
+        return -1
+
+    def route(self, frame, log, receiveTimes=None):
+        """
+        Purpose:
+            Hand a frame to its packet type's handler, if it has one
+        Input:
+            frame [bytearray]: A complete frame (e.g., from a replayed log)
+            log [logging.Logger]: The debug log
+            receiveTimes [latency_monitor.Receive_Times]: When the frame was received. None if unknown.
+        Output:
+            handled [bool]: True if a handler took the frame; False if it should go down the telemetry pipeline
+        """
+        syncOffset, packetType = self.findStart(frame)
+        if packetType is None or packetType.handler is None:
+            return False
+        packetType.handler(frame, syncOffset, log, receiveTimes)
+        return True
+
+
+class Frame_Scanner():
+    """
+    Purpose:
+        Collect bytes from a link and cut them into frames: a packet from its start sync through its stop sync (and any
+        trailer), with up to maxHeaderLength bytes in front of it (the KISS and AX.25 headers). A start sync that doesn't
+        begin a whole packet (in noise, or a packet cut short) is passed over and the search resumes just after it, so good
+        packets behind a corrupted one aren't lost. Each byte is searched for start sync bytes about once, however many
+        packet types are registered and however the bytes arrive.
+    Input:
+        log [logging.Logger]: The debug log
+        dispatcher [Packet_Dispatcher]: The packet types to look for
+    Output:
+        N/A
+    """
+    def __init__(self, log, dispatcher=None):
+        self.log = log
+        self.dispatcher = dispatcher or globals()['dispatcher']
+        self.buffer = bytearray()
+        self.resetSearch()
+
+    def resetSearch(self):
+        self.startIndex = -1
+        self.packetType = None
+        self.searchFrom = 0
+
+    def feed(self, data):
+        self.buffer.extend(data)
+
+    def nextFrame(self):
+        """
+        Purpose:
+            Take the next complete frame out of the bytes fed so far
+        Input:
+            None
+        Output:
+            frame [bytearray]: The frame. None if there isn't a complete one yet.
+            packetType [Packet_Type]: The type of the packet in it
+            syncOffset [int]: Index of the packet's start sync bytes in the frame
+        """
+        while True:
+            if self.packetType is None:
+                self.startIndex, self.packetType = self.dispatcher.findStart(self.buffer, self.searchFrom)
+                if self.packetType is None:
+                    self.searchFrom = max(len(self.buffer) - self.dispatcher.longestStartSync + 1, 0)  # A header may be split across reads
+                    noise = self.searchFrom - maxHeaderLength
+                    if noise > 0:  # Keep only what could be the headers of a packet yet to arrive
+                        del self.buffer[:noise]
+                        self.searchFrom -= noise
+                    return None, None, -1
+                self.searchFrom = self.startIndex + len(self.packetType.startSyncBytes)
+
+            stopSyncBytes = self.packetType.stopSyncBytes
+            if self.packetType.packetLength is not None:
+                stopIndex = self.dispatcher.findExpectedStop(self.buffer, self.startIndex, self.packetType)
+                if stopIndex is None:
+                    if len(self.buffer) <= maxFrameLength:
+                        return None, None, -1
+                    self.resetBuffer()
+                    continue
+                if stopIndex == -1:
+                    self.passOver(self.startIndex + 1)
+                    continue
+            else:
+                stopIndex = self.buffer.find(stopSyncBytes, self.searchFrom)
+                if stopIndex == -1:
+                    self.searchFrom = max(len(self.buffer) - len(stopSyncBytes) + 1, self.searchFrom)
+                    if len(self.buffer) <= maxFrameLength:
+                        return None, None, -1
+                    self.resetBuffer()
+                    continue
+                cutOffIndex = self.dispatcher.findCutOff(self.buffer, self.packetType, self.startIndex + len(self.packetType.startSyncBytes), stopIndex)
+                if cutOffIndex != -1:
+                    self.passOver(cutOffIndex)
+                    continue
+
+            frameEnd = stopIndex + len(stopSyncBytes) + self.packetType.trailerLength
+            if len(self.buffer) < frameEnd:
+                self.searchFrom = stopIndex  # Wait for the trailer
+                return None, None, -1
+            frameStart = max(self.startIndex - maxHeaderLength, 0)
+            frame, packetType, syncOffset = self.buffer[frameStart:frameEnd], self.packetType, self.startIndex - frameStart
+            del self.buffer[:frameEnd]
+            self.resetSearch()
+            return frame, packetType, syncOffset
+
+    def passOver(self, searchFrom):
+        """
+        Purpose:
+            Give up on the current candidate packet and resume the search for start sync bytes after its own
+        Input:
+            searchFrom [int]: Where to resume
+        Output:
+            None
+        """
+        self.log.debug("Start sync at %d isn't a whole %s packet, resynchronizing", self.startIndex, self.packetType.name)
+        pipeline_metrics.increment('false_starts')
+        self.packetType = None
+        self.searchFrom = searchFrom
+
+    def resetBuffer(self):
+        """
+        Purpose:
+            Give up on a packet that has gone too many bytes without its stop sync: keep the bytes from its start sync on
+            (unless the buffer already starts there), otherwise discard everything
+        Input:
+            None
+        Output:
+            None
+        """
+        self.log.error("Too many bytes in packet, resetting packet buffer")
+        pipeline_metrics.increment('buffer_resets')
+        if self.packetType is not None and self.startIndex > 0:
+            self.log.info("Resetting packet buffer to start at the identified start sync index")
+            del self.buffer[:self.startIndex]
+        else:
+            self.log.info("Resetting packet buffer to null")
+            del self.buffer[:]
+        self.resetSearch()
+
+
+# The packet types every link looks for. Housekeeping packets (one type per start sync in the telemetry schemas) go down the
+# telemetry pipeline; log packets are decoded into the log store. Other CubeSats: register any other packet types you send, with a handler for each.
+dispatcher = Packet_Dispatcher()
+for schema in minxss_parser.schemaSet.schemas:
+    dispatcher.register(Packet_Type('housekeeping', schema.syncBytes, schema.stopSyncBytes, trailerLength=2 if schema.ax25Fcs else 0,
+                                    packetLength=schema.packetLength))
+# Log packets have no packetLength: their layout isn't known (log_packets stores them raw), so they're framed by their stop sync
+dispatcher.register(Packet_Type('log', logSyncBytes, minxss_parser.schemaSet.defaultSchema.stopSyncBytes, log_packets.storeLogPacket))
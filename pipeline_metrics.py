@@ -0,0 +1,218 @@
+"""Count what the pipeline reads, decodes and drops, and optionally serve the counts over HTTP in Prometheus text format for monitoring unattended stations"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import threading
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer  # python 2
+    from SocketServer import ThreadingMixIn
+
+# Counter name -> help text. Other CubeSats: add any new counters here, then call increment('name') where they happen.
+counterDescriptions = {
+    'bytes_read': "Bytes read from the links (serial ports, sockets or a replayed log), before framing",
+    'frame_bytes': "Bytes in the frames returned by the link's read_packet",
+    'frames_found': "Frames (possible packets) returned by the link's read_packet",
+    'log_packets_stored': "MinXSS log packets (0x08 0x1D) added to the log store (raw)",
+    'buffer_resets': "Times the link discarded its buffer after too many bytes without a complete packet",
+    'link_disconnects': "Times a serial port or TCP/IP connection was lost",
+    'link_reconnects': "Times a lost link was reopened",
+    'link_downtime_seconds': "Time spent waiting to reconnect lost links",
+    'false_starts': "Start syncs passed over because they didn't begin a whole packet (noise or a packet cut short)",
+    'dedup_hits': "Frames dropped right after framing because the same packet was already received (on any link)",
+    'dedup_misses': "Frames checked for duplicates and kept",
+    'frames_rejected': "Frames that failed their packet checksum or AX.25 frame check sequence",
+    'packets_decoded': "Housekeeping packets parsed successfully",
+    'parse_failures': "Frames that failed to parse (parsePacket returned -1)",
+    'uploads_started': "Uploads of the binary log to the MinXSS team started",
+    'uploads_finished': "Uploads of the binary log finished, successfully or not",
+    'upload_failures': "Uploads of the binary log that raised an error",
+}
+metricPrefix = 'minxss_'
+latencyBucketSeconds = [0.0001, 0.0003, 0.001, 0.003, 0.01, 0.03, 0.1, 0.3, 1.0, 3.0, 10.0, 30.0]
+
+
+class Metrics_Registry():
+    """
+    Purpose:
+        Hold the counters. Each thread increments its own dictionary, so the reading loop never waits on a lock (one is only
+        taken the first time a thread counts anything); the exporter adds up all of the threads' dictionaries when scraped.
+    Input:
+        None
+    Output:
+        N/A
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.threadCounters = []
+        self.local = threading.local()
+        self.gauges = []  # (name, help text, function returning the current value)
+        self.counterSources = []  # Functions returning counter name -> count kept elsewhere (e.g., by the reader process)
+        self.latencyMonitor = None
+
+    def reset(self):
+        """
+        Purpose:
+            Start every counter from zero, e.g., in a forked child, which inherits a copy of its parent's counts (and its
+            lock, possibly held by a thread that wasn't forked)
+        Input:
+            None
+        Output:
+            None
+        """
+        self.lock = threading.Lock()
+        for counters in self.threadCounters:
+            for name in counters:
+                counters[name] = 0
+
+    def increment(self, name, amount=1):
+        try:
+            counters = self.local.counters
+        except AttributeError:
+            counters = self.local.counters = dict((counterName, 0) for counterName in counterDescriptions)
+            with self.lock:
+                self.threadCounters.append(counters)
+        counters[name] += amount
+
+    def totals(self):
+        """
+        Purpose:
+            Add up the counters from every thread
+        Input:
+            None
+        Output:
+            totals [dictionary]: Counter name -> total
+        """
+        with self.lock:
+            threadCounters = list(self.threadCounters)
+            counterSources = list(self.counterSources)
+        totals = dict((name, 0) for name in counterDescriptions)
+        for counters in threadCounters + [source() for source in counterSources]:
+            for name, value in list(counters.items()):
+                totals[name] += value
+        return totals
+
+    def registerCounterSource(self, source):
+        """
+        Purpose:
+            Add counts kept somewhere this registry can't increment (e.g., shared memory written by another process) to the totals
+        Input:
+            source [function]: Called with no arguments at each scrape; returns a dictionary of counter name -> count
+        Output:
+            None
+        """
+        with self.lock:
+            self.counterSources.append(source)
+
+    def unregisterCounterSource(self, source):
+        with self.lock:
+            self.counterSources = [registered for registered in self.counterSources if registered != source]  # Bound methods are equal, not identical
+
+    def registerGauge(self, name, description, function):
+        """
+        Purpose:
+            Report a value that is read when scraped rather than counted (e.g., a queue depth)
+        Input:
+            name [string]: Metric name without the minxss_ prefix, e.g., 'log_queue_depth'
+            description [string]: Help text
+            function [function]: Called with no arguments at each scrape; returns a number
+        Output:
+            None
+        """
+        with self.lock:
+            self.gauges = [gauge for gauge in self.gauges if gauge[0] != name] + [(name, description, function)]
+
+    def unregisterGauge(self, name):
+        with self.lock:
+            self.gauges = [gauge for gauge in self.gauges if gauge[0] != name]
+
+    def prometheusText(self):
+        """
+        Purpose:
+            Format all metrics in the Prometheus text exposition format
+        Input:
+            None
+        Output:
+            text [string]: Counters, gauges, and a histogram per pipeline stage if a latency monitor is attached
+        """
+        lines = []
+        totals = self.totals()
+        for name, value in sorted(totals.items()):
+            lines.append("# HELP {0}{1}_total {2}".format(metricPrefix, name, counterDescriptions[name]))
+            lines.append("# TYPE {0}{1}_total counter".format(metricPrefix, name))
+            lines.append("{0}{1}_total {2}".format(metricPrefix, name, value))
+
+        with self.lock:
+            gauges = list(self.gauges)
+        gauges.append(('upload_backlog', "Uploads started but not yet finished", lambda: totals['uploads_started'] - totals['uploads_finished']))
+        for name, description, function in gauges:
+            lines.append("# HELP {0}{1} {2}".format(metricPrefix, name, description))
+            lines.append("# TYPE {0}{1} gauge".format(metricPrefix, name))
+            lines.append("{0}{1} {2}".format(metricPrefix, name, function()))
+
+        if self.latencyMonitor is not None and self.latencyMonitor.enabled:
+            name = metricPrefix + 'stage_latency_seconds'
+            lines.append("# HELP {0} Time frames took to reach each pipeline stage from the previous one (total: from first byte to last stage)".format(name))
+            lines.append("# TYPE {0} histogram".format(name))
+            for stage, buckets, count, total in self.latencyMonitor.bucketCounts([int(seconds * 1e9) for seconds in latencyBucketSeconds]):
+                for seconds, bucketCount in zip(latencyBucketSeconds, buckets):
+                    lines.append('{0}_bucket{{stage="{1}",le="{2:g}"}} {3}'.format(name, stage, seconds, bucketCount))
+                lines.append('{0}_bucket{{stage="{1}",le="+Inf"}} {2}'.format(name, stage, count))
+                lines.append('{0}_sum{{stage="{1}"}} {2:.9f}'.format(name, stage, total / 1e9))
+                lines.append('{0}_count{{stage="{1}"}} {2}'.format(name, stage, count))
+        return '\n'.join(lines) + '\n'
+
+
+registry = Metrics_Registry()  # The one registry for the process; the links, parser and uploader count into it
+
+
+# Purpose:
+#   Count an event in the process's registry (see counterDescriptions for the names)
+# Input:
+#   name [string]: e.g., 'parse_failures'
+#   amount [int]: How much to add
+# Output:
+#   None
+#
+def increment(name, amount=1):
+    registry.increment(name, amount)
+
+
+class Metrics_Request_Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = registry.prometheusText().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # Don't write every scrape to stderr
+
+
+class Metrics_Server(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+# Purpose:
+#   Serve the registry at http://host:port/metrics from a background thread
+# Input:
+#   port [int]: e.g., 9100
+#   host [string]: Address to listen on. The default only accepts connections from this computer.
+#   latencyMonitor [latency_monitor.Latency_Monitor]: Whose histograms to include. None to skip.
+# Output:
+#   server [Metrics_Server]: The running server (call .shutdown() to stop it)
+#
+def startServer(port, host='127.0.0.1', latencyMonitor=None):
+    registry.latencyMonitor = latencyMonitor
+    server = Metrics_Server((host, int(port)), Metrics_Request_Handler)
+    serverThread = threading.Thread(target=server.serve_forever, name='metrics server')
+    serverThread.daemon = True
+    serverThread.start()
+    return server
@@ -0,0 +1,80 @@
+"""Enumerate serial ports, cache the last result on disk, and watch for hot-plugged radios where udev is available"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import os
+from serial.tools import list_ports
+import beacon_pipeline
+
+try:
+    import pyudev  # Optional: only on Linux with pyudev installed
+except ImportError:
+    pyudev = None
+
+portCacheFilename = os.path.join(beacon_pipeline.decoderHomeDirectory, "available_ports.txt")
+
+
+# Purpose:
+#   Ask the operating system which serial ports exist. This can be slow on machines with many USB/virtual ports,
+#   so don't call it on the GUI thread.
+# Input:
+#   None
+# Output:
+#   portNames [list of strings]: e.g., ['/dev/ttyUSB0', '/dev/ttyS0'] or ['COM3']
+#
+def listPortNames():
+    return [x[0] for x in list_ports.comports()]
+
+
+# Purpose:
+#   Get the port names found the last time the ports were enumerated, so they can be shown instantly at startup
+# Input:
+#   None
+# Output:
+#   portNames [list of strings]: Empty if there is no cache yet
+#
+def readCachedPortNames():
+    if not os.path.isfile(portCacheFilename):
+        return []
+    with open(portCacheFilename, 'r') as portCacheFile:
+        return [line.strip() for line in portCacheFile if line.strip()]
+
+
+# Purpose:
+#   Remember the port names for the next startup
+# Input:
+#   portNames [list of strings]: The ports just found
+# Output:
+#   None
+#
+def writeCachedPortNames(portNames):
+    if not os.path.exists(beacon_pipeline.decoderHomeDirectory):
+        os.makedirs(beacon_pipeline.decoderHomeDirectory)
+    with open(portCacheFilename, 'w') as portCacheFile:
+        portCacheFile.write('\n'.join(portNames))
+
+
+# Purpose:
+#   Call a function whenever a tty device is added or removed, using udev if it is available
+# Input:
+#   callback [function]: Called with no arguments, from a background thread, after each add/remove
+# Output:
+#   observer [pyudev.MonitorObserver]: The running observer (call .stop() to end it). None if udev isn't available,
+#                                      in which case the caller should fall back to polling.
+#
+def startHotplugMonitor(callback):
+    if pyudev is None:
+        return None
+    def deviceChanged(device):
+        if device.action in ('add', 'remove'):
+            callback()
+
+    try:
+        monitor = pyudev.Monitor.from_netlink(pyudev.Context())
+        monitor.filter_by('tty')
+        observer = pyudev.MonitorObserver(monitor, callback=deviceChanged)
+        observer.daemon = True
+        observer.start()
+        return observer
+    except Exception:
+        return None
@@ -0,0 +1,184 @@
+"""Profile the reading thread with cProfile for a bounded window and track memory growth with tracemalloc snapshots, writing results to the log folder"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import os
+import time
+import pstats
+import cProfile
+import datetime
+import threading
+import beacon_pipeline
+
+try:
+    import tracemalloc  # python 3.4+
+except ImportError:
+    tracemalloc = None
+
+
+# Purpose:
+#   Make a timestamped filename in the log folder (creating the folder if needed)
+# Input:
+#   prefix [string]: e.g., "profile_reader"
+#   extension [string]: e.g., ".prof"
+# Output:
+#   filename [string]: e.g., ~/MinXSS_Beacon_Decoder/log/profile_reader_2017-05-01T12_00_00.000000.prof
+#
+def logFilename(prefix, extension):
+    if not os.path.exists(beacon_pipeline.logDirectory):
+        os.makedirs(beacon_pipeline.logDirectory)
+    return os.path.join(beacon_pipeline.logDirectory, prefix + "_" + datetime.datetime.now().isoformat().replace(':', '_') + extension)
+
+
+class Profiling_Mode():
+    """
+    Purpose:
+        When enabled, profile each participating thread with cProfile for the first `window` seconds and take a tracemalloc
+        snapshot every `snapshotInterval` seconds, writing the top memory differences. cProfile only sees the thread that
+        enabled it, so the threads to be profiled call tick() once per loop; it costs one attribute check when profiling is off.
+    Input:
+        log [logging.Logger]: The debug log
+        enabled [bool]: Start profiling right away (e.g., from a --profile flag or MINXSS_PROFILE environment variable)
+        window [float]: Seconds of cProfile data to capture per thread each time profiling is enabled
+        snapshotInterval [float]: Seconds between tracemalloc snapshots
+        topCount [int]: Number of lines to report from each profile and snapshot difference
+    Output:
+        N/A
+    """
+    def __init__(self, log, enabled=False, window=60.0, snapshotInterval=300.0, topCount=25):
+        self.log = log
+        self.window = window
+        self.snapshotInterval = snapshotInterval
+        self.topCount = topCount
+        self.lock = threading.Lock()
+        self.enabled = False
+        self.threadProfiles = {}  # Thread name -> (cProfile.Profile, start time), while that thread is being profiled
+        self.finishedThreads = set()  # Threads that already captured their window since profiling was enabled
+        self.snapshotThread = None
+        self.stopSnapshots = threading.Event()
+        if enabled:
+            self.start()
+
+    def start(self):
+        """
+        Purpose:
+            Turn profiling on: profiling threads start capturing on their next tick and tracemalloc starts tracing
+        Input:
+            None
+        Output:
+            None
+        """
+        with self.lock:
+            if self.enabled:
+                return
+            self.enabled = True
+            self.finishedThreads = set()
+        self.log.info("Profiling enabled: {0:g} s cProfile window, tracemalloc snapshots every {1:g} s".format(self.window, self.snapshotInterval))
+        if tracemalloc is None:
+            self.log.warning("tracemalloc needs python 3.4 or later; only CPU profiling is available")
+            return
+        tracemalloc.start()
+        self.stopSnapshots = threading.Event()
+        self.snapshotThread = threading.Thread(target=self.takeSnapshots, args=(self.stopSnapshots,), name='tracemalloc snapshots')
+        self.snapshotThread.daemon = True
+        self.snapshotThread.start()
+
+    def stop(self):
+        """
+        Purpose:
+            Turn profiling off: profiling threads write their results on their next tick, and a final snapshot difference is written
+        Input:
+            None
+        Output:
+            None
+        """
+        with self.lock:
+            if not self.enabled:
+                return
+            self.enabled = False
+        self.log.info("Profiling disabled")
+        if self.snapshotThread:
+            self.stopSnapshots.set()
+            self.snapshotThread.join()
+            self.snapshotThread = None
+            tracemalloc.stop()
+
+    def toggle(self):
+        if self.enabled:
+            self.stop()
+        else:
+            self.start()
+
+    def tick(self, threadName):
+        """
+        Purpose:
+            Called by a profiled thread once per loop, so that it can start or finish its own cProfile window
+        Input:
+            threadName [string]: Names the thread in the output files, e.g., "reader"
+        Output:
+            None
+        """
+        if not self.enabled and not self.threadProfiles:
+            return
+        profileAndStartTime = self.threadProfiles.get(threadName)
+        if profileAndStartTime is None:
+            if self.enabled and threadName not in self.finishedThreads:
+                profile = cProfile.Profile()
+                self.threadProfiles[threadName] = (profile, time.time())
+                profile.enable()
+            return
+        profile, startTime = profileAndStartTime
+        if not self.enabled or time.time() - startTime >= self.window:
+            profile.disable()
+            del self.threadProfiles[threadName]
+            self.finishedThreads.add(threadName)
+            self.writeProfile(profile, threadName, time.time() - startTime)
+
+    def writeProfile(self, profile, threadName, duration):
+        """
+        Purpose:
+            Save a thread's profile in binary form (for snakeviz, pstats, etc.) and as a text summary of the top functions
+        Input:
+            profile [cProfile.Profile]: The finished profile
+            threadName [string]: The profiled thread's name
+            duration [float]: Seconds profiled
+        Output:
+            None
+        """
+        filename = logFilename("profile_" + threadName.replace(' ', '_'), ".prof")
+        profile.dump_stats(filename)
+        with open(filename.replace(".prof", ".txt"), 'w') as summaryFile:
+            summaryFile.write("cProfile of thread {0} for {1:.1f} s\n\n".format(threadName, duration))
+            pstats.Stats(profile, stream=summaryFile).sort_stats('cumulative').print_stats(self.topCount)
+        self.log.info("Wrote {0:.1f} s profile of thread {1} to {2}".format(duration, threadName, filename))
+
+    def takeSnapshots(self, stopSnapshots):
+        """
+        Purpose:
+            Runs on its own thread while profiling is enabled: every snapshotInterval, and once more on stopping, write the
+            allocations that grew the most since the previous snapshot and since profiling was enabled
+        Input:
+            stopSnapshots [threading.Event]: Set to finish
+        Output:
+            None
+        """
+        filename = logFilename("tracemalloc", ".txt")
+        firstSnapshot = previousSnapshot = self.takeSnapshot()
+        finished = False
+        while not finished:
+            finished = stopSnapshots.wait(self.snapshotInterval)
+            snapshot = self.takeSnapshot()
+            currentSize, peakSize = tracemalloc.get_traced_memory()
+            with open(filename, 'a') as snapshotFile:
+                snapshotFile.write("{0} traced memory: {1:.1f} MB (peak {2:.1f} MB)\n".format(datetime.datetime.now().isoformat(), currentSize / 1e6, peakSize / 1e6))
+                for title, baseSnapshot in (("since previous snapshot", previousSnapshot), ("since profiling was enabled", firstSnapshot)):
+                    snapshotFile.write("Top {0} differences {1}:\n".format(self.topCount, title))
+                    for statistic in snapshot.compare_to(baseSnapshot, 'lineno')[:self.topCount]:
+                        snapshotFile.write("    {0}\n".format(statistic))
+                snapshotFile.write("\n")
+            previousSnapshot = snapshot
+        self.log.info("Wrote tracemalloc snapshot differences to {0}".format(filename))
+
+    def takeSnapshot(self):
+        return tracemalloc.take_snapshot().filter_traces((tracemalloc.Filter(False, tracemalloc.__file__),
+                                                          tracemalloc.Filter(False, "<frozen importlib._bootstrap>")))
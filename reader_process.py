@@ -0,0 +1,384 @@
+"""Read and decode the link in a child process, handing fixed-size decoded records to the GUI process through a shared-memory ring buffer"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import time
+import struct
+import multiprocessing
+import minxss_parser
+import beacon_pipeline
+import frame_dedup
+import latency_monitor
+import pipeline_metrics
+import connect_port_get_packet
+
+try:
+    from multiprocessing import shared_memory  # python 3.8+
+except ImportError:
+    shared_memory = None
+
+maxFrameLength = 512  # [bytes] connect_socket gives up on a packet after 500 bytes
+schemas = minxss_parser.schemaSet.schemas  # The same in both processes, since both load the same schema files
+schemaIndexes = dict((schema.registry.recordClass, schemaIndex) for schemaIndex, schema in enumerate(schemas))
+fieldCount = max(len(schema.registry.fields) for schema in schemas)  # Room for the schema with the most fields
+# Record: sequence, frame length, parsed OK, (padding), schema index, first byte/frame complete/KISS decoded/parsed times
+# [ns, 0 if absent], receive times (first byte monotonic and UTC, last byte monotonic and UTC [ns]), frame bytes, then a
+# type code and a value for each telemetry field (as stored in a telemetry_record.Telemetry_Record)
+recordStruct = struct.Struct('<QHBxHxxqqqqqqqq{0}s{1}B{1}d'.format(maxFrameLength, fieldCount))
+frameField = 12  # Index of the frame bytes in an unpacked record
+headerStruct = struct.Struct('<QQQI')  # Records written, records read, records dropped because the ring was full, reader status
+counterNames = sorted(pipeline_metrics.counterDescriptions)  # The reader process's pipeline_metrics counters, after the status
+countersOffset = 32
+countersStruct = struct.Struct('<{0}d'.format(len(counterNames)))
+headerLength = (countersOffset + countersStruct.size + 63) // 64 * 64  # Records start on a cache line
+metricsPublishInterval = 0.5  # [s] How often the reader process copies its counters into the header (and when it stops)
+starting, running, finished, failed = 0, 1, 2, 3  # Reader status
+
+
+# Purpose:
+#   Whether this python can share memory between processes (otherwise read in the GUI process as usual)
+#
+def available():
+    return shared_memory is not None
+
+
+class Ring_Buffer():
+    """
+    Purpose:
+        A single-producer, single-consumer ring of fixed-size records in shared memory. The producer fills a slot and then
+        advances the write count; the consumer unpacks slots straight out of the shared buffer and then advances the read count,
+        so records are never pickled or sent through a pipe. When the ring is full, new records are dropped and counted.
+    Input:
+        name [string]: Name of an existing ring to attach to. None to create a new one.
+        slotCount [int]: Records the ring holds
+    Output:
+        N/A
+    """
+    def __init__(self, name=None, slotCount=1024):
+        self.slotCount = slotCount
+        size = headerLength + slotCount * recordStruct.size
+        if name is None:
+            self.sharedMemory = shared_memory.SharedMemory(create=True, size=size)
+            headerStruct.pack_into(self.sharedMemory.buf, 0, 0, 0, 0, starting)
+        else:
+            self.sharedMemory = attachSharedMemory(name)
+        self.name = self.sharedMemory.name
+        self.buffer = self.sharedMemory.buf
+
+    def header(self):
+        return headerStruct.unpack_from(self.buffer, 0)
+
+    def setStatus(self, status):
+        struct.pack_into('<I', self.buffer, 24, status)
+
+    def publishCounters(self, totals):
+        """
+        Purpose:
+            Copy the producer's pipeline_metrics counters into the header, where the consumer's process can read them
+        Input:
+            totals [dictionary]: From pipeline_metrics.registry.totals()
+        Output:
+            None
+        """
+        countersStruct.pack_into(self.buffer, countersOffset, *[totals[name] for name in counterNames])
+
+    def counters(self):
+        """
+        Purpose:
+            The producer's counters as last published
+        Input:
+            None
+        Output:
+            counters [dictionary]: Counter name -> count
+        """
+        return dict((name, int(count) if count.is_integer() else count)  # Stored as doubles for link_downtime_seconds
+                    for name, count in zip(counterNames, countersStruct.unpack_from(self.buffer, countersOffset)))
+
+    def put(self, frame, selectedTelemetryDictionary, stamps, receiveTimes):
+        """
+        Purpose:
+            Write a decoded record (producer only)
+        Input:
+            frame [bytearray]: The frame after any KISS decoding (truncated to maxFrameLength)
+            selectedTelemetryDictionary [telemetry_record.Telemetry_Record]: From parsePacket, or -1 if it failed
+            stamps [list of int]: First byte, frame complete, KISS decoded and parsed times [ns]; 0 for a stage that didn't happen
+            receiveTimes [latency_monitor.Receive_Times]: When the frame's first and last bytes were read
+        Output:
+            stored [bool]: False if the ring was full and the record was dropped
+        """
+        written, read, dropped, _ = self.header()
+        if written - read >= self.slotCount:
+            struct.pack_into('<Q', self.buffer, 16, dropped + 1)
+            return False
+
+        parsed = selectedTelemetryDictionary != -1
+        if parsed:
+            schemaIndex = schemaIndexes[type(selectedTelemetryDictionary)]
+            padding = fieldCount - len(selectedTelemetryDictionary.types)
+            types = list(selectedTelemetryDictionary.types) + [0] * padding
+            values = list(selectedTelemetryDictionary.values) + [0.0] * padding
+        else:
+            schemaIndex, types, values = 0, [0] * fieldCount, [0.0] * fieldCount
+        frame = bytes(frame[:maxFrameLength])
+        recordStruct.pack_into(self.buffer, headerLength + (written % self.slotCount) * recordStruct.size,
+                               written, len(frame), parsed, schemaIndex, stamps[0], stamps[1], stamps[2], stamps[3],
+                               receiveTimes.firstByteMonotonic, receiveTimes.firstByteUtc, receiveTimes.lastByteMonotonic, receiveTimes.lastByteUtc,
+                               frame, *(types + values))
+        struct.pack_into('<Q', self.buffer, 0, written + 1)  # Publish only after the record is complete
+        return True
+
+    def get(self):
+        """
+        Purpose:
+            Read the oldest unread record (consumer only)
+        Input:
+            None
+        Output:
+            record [tuple]: (frame [bytearray], selectedTelemetryDictionary [telemetry_record.Telemetry_Record, or -1 if
+                             parsing failed], stamps [list of int], receiveTimes [latency_monitor.Receive_Times]). None if
+                             there is nothing to read.
+        """
+        written, read, _, _ = self.header()
+        if read >= written:
+            return None
+        fields = recordStruct.unpack_from(self.buffer, headerLength + (read % self.slotCount) * recordStruct.size)
+        struct.pack_into('<Q', self.buffer, 8, read + 1)
+        frameLength, parsed, schemaIndex = fields[1], fields[2], fields[3]
+        stamps = list(fields[4:8])
+        receiveTimes = latency_monitor.Receive_Times(fields[8:10], fields[10:12])
+        frame = bytearray(fields[frameField][:frameLength])
+        selectedTelemetryDictionary = -1
+        if parsed:
+            registry = schemas[schemaIndex].registry
+            schemaFieldCount = len(registry.fields)
+            selectedTelemetryDictionary = registry.recordClass()
+            typeStart = frameField + 1
+            selectedTelemetryDictionary.copyFrom(fields[typeStart + fieldCount:typeStart + fieldCount + schemaFieldCount], fields[typeStart:typeStart + schemaFieldCount])
+        return frame, selectedTelemetryDictionary, stamps, receiveTimes
+
+    def close(self):
+        self.buffer = None
+        self.sharedMemory.close()
+
+    def unlink(self):
+        self.sharedMemory.unlink()  # The memory is freed once every process has closed it
+
+
+# Purpose:
+#   Attach to shared memory created by another process. The child shares the GUI process's resource tracker, which
+#   already knows about the block, and the GUI process unlinks it, so this process must not track it separately.
+# Input:
+#   name [string]: The shared memory name
+# Output:
+#   sharedMemory [shared_memory.SharedMemory]: The attached block
+#
+def attachSharedMemory(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)  # python 3.13+
+    except TypeError:
+        return shared_memory.SharedMemory(name=name)
+
+
+# Purpose:
+#   Open a link in the child process
+# Input:
+#   linkType [string]: 'serial', 'socket' or 'replay'
+#   linkArguments [tuple]: (port, baud rate), (IP address, port) or (filename, speed)
+#   log [logging.Logger]: The debug log
+#   dedupCache [frame_dedup.Dedup_Cache]: For a serial port or socket, to drop packets already received. None to keep them all.
+# Output:
+#   connectedPort [connect_serial, connect_socket or connect_replay]: The open link. Raises if it can't be opened or read.
+#
+def openLink(linkType, linkArguments, log, dedupCache=None):
+    if linkType == 'serial':
+        connectedPort = connect_port_get_packet.connect_serial(linkArguments[0], linkArguments[1], log, dedupCache)
+        if not connectedPort.testRead():
+            raise Exception("Port not readable")
+        return connectedPort
+    if linkType == 'socket':
+        return connect_port_get_packet.connect_socket(linkArguments[0], linkArguments[1], log, dedupCache=dedupCache)
+    return connect_port_get_packet.connect_replay(linkArguments[0], log, linkArguments[1])
+
+
+# Purpose:
+#   The child process: read, KISS decode and parse packets as fast as they come in, and put them in the ring
+# Input:
+#   ringName [string]: The shared memory ring created by Reader_Process
+#   slotCount [int]: Records the ring holds
+#   linkType, linkArguments: See openLink
+#   decodeKissCharacters [bool]: Undo KISS escaping before parsing
+#   stopEvent [multiprocessing.Event]: Set by the GUI process to stop reading
+#   dataReady [multiprocessing.Event]: Set after each record is added, to wake the consumer
+#   dedupSettings [tuple]: (cache size, window [s]) for frame_dedup.createCache
+# Output:
+#   None
+#
+def runReader(ringName, slotCount, linkType, linkArguments, decodeKissCharacters, stopEvent, dataReady, dedupSettings=(0, None)):
+    pipeline_metrics.registry.reset()  # Count only what this process does; the GUI process adds it to its own counts
+    log = beacon_pipeline.createLog()
+    ring = Ring_Buffer(ringName, slotCount)
+    try:
+        connectedPort = openLink(linkType, linkArguments, log, frame_dedup.createCache(*dedupSettings))
+    except Exception as error:
+        log.error("Reader process couldn't open the link: {0}".format(error))
+        ring.publishCounters(pipeline_metrics.registry.totals())
+        ring.setStatus(failed)
+        ring.close()
+        dataReady.set()
+        return
+
+    ring.setStatus(running)
+    nextPublishTime = 0
+    try:
+        while not stopEvent.is_set():
+            if time.time() >= nextPublishTime:
+                ring.publishCounters(pipeline_metrics.registry.totals())
+                nextPublishTime = time.time() + metricsPublishInterval
+            try:
+                bufferData = connectedPort.read_packet()
+            except EOFError:
+                break  # End of a replay
+            if len(bufferData) == 0:
+                continue
+            frameComplete = latency_monitor.now()
+            receiveTimes = connectedPort.receiveTimes
+            firstByte = receiveTimes.firstByteMonotonic
+            kissDecoded = 0
+            if decodeKissCharacters:
+                bufferData = beacon_pipeline.decodeKiss(bufferData)
+                kissDecoded = latency_monitor.now()
+            if not beacon_pipeline.checkFrame(bufferData, log):
+                continue
+            selectedTelemetryDictionary = beacon_pipeline.parsePacket(bufferData, log)
+            if not ring.put(bufferData, selectedTelemetryDictionary, [firstByte, frameComplete, kissDecoded, latency_monitor.now()], receiveTimes):
+                log.warning("Reader process ring buffer full; dropped a packet")
+            dataReady.set()
+    finally:
+        connectedPort.close()
+        ring.publishCounters(pipeline_metrics.registry.totals())
+        ring.setStatus(finished)
+        ring.close()
+        dataReady.set()
+
+
+class Reader_Process():
+    """
+    Purpose:
+        The GUI process's end of a reader process: starts the child, and hands out its decoded records. Used in place of a
+        link (has testRead and close), so ingest keeps up even while the GUI is busy repainting.
+    Input:
+        linkType, linkArguments: See openLink
+        log [logging.Logger]: The debug log
+        decodeKissCharacters [bool]: Undo KISS escaping before parsing
+        slotCount [int]: Records the ring holds, i.e., how far the GUI can fall behind before packets are dropped
+        dedupSettings [tuple]: (cache size, window [s]) for dropping packets already received; a size of 0 keeps them all
+    Output:
+        N/A
+    """
+    def __init__(self, linkType, linkArguments, log, decodeKissCharacters=True, slotCount=1024, dedupSettings=(0, None)):
+        self.log = log
+        self.ring = Ring_Buffer(None, slotCount)
+        self.stopEvent = multiprocessing.Event()
+        self.dataReady = multiprocessing.Event()
+        self.closed = False
+        self.process = multiprocessing.Process(target=runReader, name='MinXSS reader',
+                                               args=(self.ring.name, slotCount, linkType, linkArguments, decodeKissCharacters, self.stopEvent, self.dataReady, dedupSettings))
+        self.process.daemon = True
+        self.process.start()
+        self.log.info("Started reader process {0} for {1} {2}".format(self.process.pid, linkType, linkArguments))
+        self.registerMetrics()
+
+    def registerMetrics(self):
+        """
+        Purpose:
+            Report the child's counters (e.g., bytes_read and parse_failures, which it counts, not this process) in this
+            process's metrics, along with the ring's records written, read and dropped and how many are waiting
+        Input:
+            None
+        Output:
+            None
+        """
+        pipeline_metrics.registry.registerCounterSource(self.ring.counters)
+        pipeline_metrics.registry.registerGauge('reader_ring_written', "Records the reader process has added to its ring buffer", lambda: self.ring.header()[0])
+        pipeline_metrics.registry.registerGauge('reader_ring_read', "Records read from the reader process's ring buffer", lambda: self.ring.header()[1])
+        pipeline_metrics.registry.registerGauge('reader_ring_dropped', "Records the reader process dropped because its ring buffer was full", lambda: self.ring.header()[2])
+        pipeline_metrics.registry.registerGauge('reader_ring_depth', "Records waiting in the reader process's ring buffer", lambda: self.ring.header()[0] - self.ring.header()[1])
+
+    def unregisterMetrics(self):
+        """
+        Purpose:
+            Stop reading the ring for metrics (before it's freed), keeping the child's final counts in this process's counters
+        Input:
+            None
+        Output:
+            None
+        """
+        pipeline_metrics.registry.unregisterCounterSource(self.ring.counters)
+        for name in ('reader_ring_written', 'reader_ring_read', 'reader_ring_dropped', 'reader_ring_depth'):
+            pipeline_metrics.registry.unregisterGauge(name)
+        for name, count in self.ring.counters().items():
+            if count:
+                pipeline_metrics.increment(name, count)
+
+    def testRead(self, timeout=10.0):
+        """
+        Purpose:
+            Wait for the child to open the link
+        Input:
+            timeout [float]: Seconds to wait
+        Output:
+            portReadable [bool]: Whether the child opened the link. If not, the child is stopped.
+        """
+        startTime = time.time()
+        while self.ring.header()[3] == starting and self.process.is_alive() and time.time() - startTime < timeout:
+            time.sleep(0.01)
+        portReadable = self.ring.header()[3] in (running, finished)
+        if not portReadable:
+            self.close()
+        return portReadable
+
+    def read_decoded(self):
+        """
+        Purpose:
+            Get the next record from the child, waiting for one if necessary
+        Input:
+            None
+        Output:
+            record [tuple]: (frame [bytearray], selectedTelemetryDictionary [telemetry_record.Telemetry_Record, or -1 if
+                             parsing failed], stamps [list, for latency_monitor.resumeFrame], receiveTimes
+                             [latency_monitor.Receive_Times]). Raises EOFError once the child has finished and every record
+                             has been read, or after close.
+        """
+        while not self.closed:
+            record = self.ring.get()
+            if record is not None:
+                frame, selectedTelemetryDictionary, stageTimes, receiveTimes = record
+                stamps = [stageTimes[0]]
+                for stage, stageTime in zip(latency_monitor.stageNames[1:], stageTimes[1:]):
+                    if stageTime:
+                        stamps += (stage, stageTime)
+                return frame, selectedTelemetryDictionary, stamps, receiveTimes
+            if self.ring.header()[3] in (finished, failed) or not self.process.is_alive():
+                written, read, _, _ = self.ring.header()
+                if read >= written:  # Otherwise the child added one last record before finishing
+                    break
+                continue
+            self.dataReady.wait(0.1)
+            self.dataReady.clear()
+        raise EOFError("Reader process finished")
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.log.info("Stopping reader process")
+        self.stopEvent.set()
+        self.process.join(1.0)
+        if self.process.is_alive():
+            self.process.terminate()  # e.g., blocked waiting for a socket that never sends anything
+            self.process.join()
+        dropped = self.ring.header()[2]
+        if dropped:
+            self.log.warning("Reader process dropped {0} packets because the GUI fell behind".format(dropped))
+        self.unregisterMetrics()
+        self.ring.unlink()  # Not closed here since the reading thread may still be in read_decoded; closed when garbage collected
@@ -0,0 +1,271 @@
+"""Re-decode archived MinXSS beacon logs in parallel without the GUI"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import os
+import sys
+import glob
+import json
+import time
+import logging
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import minxss_parser
+import beacon_pipeline
+import packet_dispatcher
+
+scanBlockSize = 65536
+hexLogByteWidth = len(b'0x00 ')  # Characters per byte in the human-readable .txt log
+
+
+# Purpose:
+#   Split a log file into byte ranges of roughly chunkSize that each begin at the start of a whole packet so no packet
+#   straddles two chunks. A boundary goes only where a fixed-length packet type's start sync has its stop sync exactly
+#   packetLength bytes on, as packet_dispatcher.Frame_Scanner checks, so the same bytes inside a payload don't split a packet.
+# Input:
+#   filename [string]: Path to the log file
+#   chunkSize [int]: Nominal number of bytes per chunk
+# Output:
+#   chunks [list of (int, int)]: The (start, stop) byte ranges covering the whole file
+#
+def findChunks(filename, chunkSize):
+    fileSize = os.path.getsize(filename)
+    hexLog = beacon_pipeline.isHexLog(filename)
+    fixedLengthTypes = [packetType for packetType in packet_dispatcher.dispatcher.packetTypes if packetType.packetLength is not None]
+
+    boundaries = [0]
+    with open(filename, 'rb') as logFile:
+        searchOffset = chunkSize
+        while searchOffset < fileSize and fixedLengthTypes:  # Without a fixed-length type, no boundary can be checked
+            startIndex = findPacketStart(logFile, fixedLengthTypes, searchOffset, hexLog)
+            if startIndex == -1:
+                break
+            boundaries.append(startIndex)
+            searchOffset = startIndex + chunkSize
+    boundaries.append(fileSize)
+
+    return [(boundaries[i], boundaries[i + 1]) for i in range(len(boundaries) - 1) if boundaries[i + 1] > boundaries[i]]
+
+
+# Purpose:
+#   Find the first whole packet of a fixed-length type in an open log file at or after offset, passing over start sync
+#   bytes that aren't followed by the packet's stop sync where it should be (e.g., in another packet's payload)
+# Input:
+#   logFile [file]: File opened in binary mode
+#   packetTypes [list of packet_dispatcher.Packet_Type]: The packet types to look for, each with packetLength set
+#   offset [int]: Where to start searching
+#   hexLog [bool]: Whether the file is a human-readable .txt log rather than binary
+# Output:
+#   startIndex [int]: The absolute file position of the packet's start sync. -1 if there's no whole packet.
+#
+def findPacketStart(logFile, packetTypes, offset, hexLog):
+    while True:
+        candidates = []
+        for packetType in packetTypes:
+            syncBytes = packetType.startSyncBytes
+            if hexLog:
+                syncBytes = beacon_pipeline.formatBufferData(bytearray(syncBytes)).encode('ascii')
+            syncIndex = findInFile(logFile, syncBytes, offset)
+            if syncIndex != -1:
+                candidates.append((syncIndex, packetType))
+        if not candidates:
+            return -1
+        startIndex, packetType = min(candidates, key=lambda candidate: candidate[0])
+        logFile.seek(startIndex)
+        if hexLog:
+            packetData = beacon_pipeline.hexLogToBytes(logFile.read(packet_dispatcher.maxFrameLength * hexLogByteWidth))
+        else:
+            packetData = bytearray(logFile.read(packet_dispatcher.maxFrameLength))
+        stopIndex = packet_dispatcher.dispatcher.findExpectedStop(packetData, 0, packetType)
+        if stopIndex is not None and stopIndex != -1:
+            return startIndex
+        offset = startIndex + 1
+
+
+# Purpose:
+#   Find the first occurrence of syncBytes in an open file at or after offset, reading in blocks rather than the whole file
+# Input:
+#   logFile [file]: File opened in binary mode
+#   syncBytes [bytes]: The pattern to search for
+#   offset [int]: Where to start searching
+# Output:
+#   syncIndex [int]: The absolute file position of the pattern. -1 if not found.
+#
+def findInFile(logFile, syncBytes, offset):
+    logFile.seek(offset)
+    carry = b''
+    blockStart = offset
+    while True:
+        block = logFile.read(scanBlockSize)
+        if not block:
+            return -1
+        window = carry + block
+        syncIndex = window.find(syncBytes)
+        if syncIndex != -1:
+            return blockStart - len(carry) + syncIndex
+        carry = window[-(len(syncBytes) - 1):]
+        blockStart += len(block)
+
+
+# Purpose:
+#   Worker: decode every packet in one chunk of one log file and write the telemetry to a shard file as JSON lines
+# Input:
+#   filename [string]: Path to the log file
+#   start [int]: First byte of the chunk
+#   stop [int]: One past the last byte of the chunk
+#   shardFilename [string]: Where to write the decoded telemetry
+#   decodeKissCharacters [bool]: Set to undo KISS escaping before parsing (archives written by the GUI are already unescaped)
+# Output:
+#   statistics [dictionary]: Counts of bytes, packets, corrupt packets rejected and parse failures for progress reporting
+#
+def decodeChunk(filename, start, stop, shardFilename, decodeKissCharacters=False):
+    log = logging.getLogger('minxss_reprocess_archive')
+    parser = minxss_parser.Minxss_Parser(None, log)
+    statistics = {'bytes': stop - start, 'packets': 0, 'failures': 0, 'rejected': 0}
+
+    binaryData = beacon_pipeline.readLogBytes(filename, start, stop)
+    packets = []
+    for packetOffset, packet in beacon_pipeline.splitPackets(binaryData):
+        if decodeKissCharacters:
+            packet = beacon_pipeline.decodeKiss(packet)
+        if packet_dispatcher.dispatcher.route(packet, log):  # e.g., a log packet, which has no housekeeping telemetry
+            continue
+        packets.append((packetOffset, packet))
+    passed = beacon_pipeline.checkFramesBulk([packet for _, packet in packets])  # Corrupt packets aren't decoded
+
+    temporaryShardFilename = shardFilename + '.partial'
+    with open(temporaryShardFilename, 'w') as shard:
+        for packetIndex, ((packetOffset, packet), packetPassed) in enumerate(zip(packets, passed)):
+            statistics['packets'] += 1
+            if not packetPassed:
+                statistics['rejected'] += 1
+                continue
+            try:
+                selectedTelemetryDictionary = parser.parsePacket(packet)
+            except Exception as error:
+                log.debug("Failed to parse packet {0} of {1} chunk {2}: {3}".format(packetIndex, filename, start, error))
+                selectedTelemetryDictionary = -1
+            if selectedTelemetryDictionary == -1:
+                statistics['failures'] += 1
+                continue
+            record = {'file': filename, 'chunkStart': start, 'packetOffset': packetOffset, 'schema': selectedTelemetryDictionary.registry.name,
+                      'telemetry': selectedTelemetryDictionary}
+            shard.write(json.dumps(record, default=beacon_pipeline.jsonDefault) + '\n')
+    beacon_pipeline.replaceFile(temporaryShardFilename, shardFilename)
+    return statistics
+
+
+class Checkpoint():
+    def __init__(self, filename):
+        self.filename = filename
+        self.completed = set()
+        if os.path.isfile(filename):
+            with open(filename, 'r') as checkpointFile:
+                self.completed = set(json.load(checkpointFile)['completed'])
+
+    # Purpose:
+    #   Identify a chunk uniquely so a rerun with the same chunk size can skip it
+    #
+    def key(self, filename, start, stop):
+        return "{0}:{1}:{2}".format(os.path.abspath(filename), start, stop)
+
+    def isComplete(self, filename, start, stop):
+        return self.key(filename, start, stop) in self.completed
+
+    # Purpose:
+    #   Record a finished chunk, writing the checkpoint atomically so a crash never leaves it half written
+    #
+    def markComplete(self, filename, start, stop):
+        self.completed.add(self.key(filename, start, stop))
+        with open(self.filename + '.partial', 'w') as checkpointFile:
+            json.dump({'completed': sorted(self.completed)}, checkpointFile)
+        beacon_pipeline.replaceFile(self.filename + '.partial', self.filename)
+
+
+# Purpose:
+#   Name the shard that a chunk gets decoded into
+#
+def shardFilenameFor(shardDirectory, filename, start, stop):
+    return os.path.join(shardDirectory, "{0}_{1}_{2}.jsonl".format(os.path.basename(filename), start, stop))
+
+
+# Purpose:
+#   Decode all of the log files matching the input patterns across a pool of processes, then merge the shards
+# Input:
+#   patterns [list of strings]: Glob patterns of .dat/.txt logs
+#   outputDirectory [string]: Where to put shards, the checkpoint and the merged telemetry
+#   workers [int]: Number of worker processes. None for one per CPU.
+#   chunkSize [int]: Nominal bytes per chunk
+#   decodeKissCharacters [bool]: Undo KISS escaping before parsing
+#   progressStream [file]: Where to write progress reports. None for silence.
+# Output:
+#   mergedFilename [string]: The JSON lines file containing all decoded telemetry in file and packet order
+#
+def reprocess(patterns, outputDirectory, workers=None, chunkSize=8 * 1024 * 1024, decodeKissCharacters=False, progressStream=sys.stderr):
+    filenames = []
+    for pattern in patterns:
+        filenames.extend(glob.glob(os.path.expanduser(pattern)))
+    filenames = sorted(set(f for f in filenames if f.lower().endswith(('.dat', '.txt'))))
+
+    shardDirectory = os.path.join(outputDirectory, 'shards')
+    if not os.path.exists(shardDirectory):
+        os.makedirs(shardDirectory)
+    checkpoint = Checkpoint(os.path.join(outputDirectory, 'checkpoint.json'))
+
+    allChunks = [(filename, start, stop) for filename in filenames for start, stop in findChunks(filename, chunkSize)]
+    pendingChunks = [chunk for chunk in allChunks if not checkpoint.isComplete(*chunk)]
+    totalBytes = sum(stop - start for _, start, stop in pendingChunks)
+
+    startTime = time.time()
+    processedBytes = 0
+    totalPackets = 0
+    totalFailures = 0
+    totalRejected = 0
+    if pendingChunks:
+        executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            futures = {}
+            for filename, start, stop in pendingChunks:
+                future = executor.submit(decodeChunk, filename, start, stop, shardFilenameFor(shardDirectory, filename, start, stop), decodeKissCharacters)
+                futures[future] = (filename, start, stop)
+            for completedCount, future in enumerate(as_completed(futures), 1):
+                statistics = future.result()
+                checkpoint.markComplete(*futures[future])
+                processedBytes += statistics['bytes']
+                totalPackets += statistics['packets']
+                totalFailures += statistics['failures']
+                totalRejected += statistics['rejected']
+                if progressStream:
+                    elapsed = max(time.time() - startTime, 1e-9)
+                    progressStream.write("[{0}/{1} chunks] {2:.1f}% of {3:.1f} MB, {4:.2f} MB/s, {5} packets, {6} corrupt, {7} parse failures\n".format(
+                        completedCount, len(pendingChunks), 100.0 * processedBytes / max(totalBytes, 1), totalBytes / 1e6,
+                        processedBytes / 1e6 / elapsed, totalPackets, totalRejected, totalFailures))
+        finally:
+            executor.shutdown()
+
+    mergedFilename = os.path.join(outputDirectory, 'telemetry.jsonl')
+    with open(mergedFilename, 'w') as mergedFile:
+        for filename, start, stop in allChunks:
+            with open(shardFilenameFor(shardDirectory, filename, start, stop), 'r') as shard:
+                for line in shard:
+                    mergedFile.write(line)
+    if progressStream:
+        progressStream.write("Merged {0} chunks from {1} files into {2}\n".format(len(allChunks), len(filenames), mergedFilename))
+    return mergedFilename
+
+
+def main(argv=None):
+    argumentParser = argparse.ArgumentParser(description="Re-decode archived MinXSS beacon logs (.dat or .txt) in parallel")
+    argumentParser.add_argument('patterns', nargs='+', help="Glob patterns of log files, e.g., '~/MinXSS_Beacon_Decoder/output/*.dat'")
+    argumentParser.add_argument('-o', '--output', default='reprocessed', help="Output directory for shards, checkpoint and merged telemetry")
+    argumentParser.add_argument('-j', '--workers', type=int, default=None, help="Number of worker processes (default: one per CPU)")
+    argumentParser.add_argument('--chunk-size', type=float, default=8, help="Nominal chunk size in MB")
+    argumentParser.add_argument('--decode-kiss', action='store_true', help="Undo KISS escaping before parsing (not needed for logs saved by the GUI)")
+    arguments = argumentParser.parse_args(argv)
+
+    reprocess(arguments.patterns, arguments.output, workers=arguments.workers, chunkSize=int(arguments.chunk_size * 1024 * 1024),
+              decodeKissCharacters=arguments.decode_kiss)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""In-memory input settings, loaded once from input_properties.cfg and saved back in the background"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import os
+import threading
+import beacon_pipeline
+try:
+    from configparser import ConfigParser
+except ImportError:
+    from ConfigParser import SafeConfigParser as ConfigParser
+
+section = 'input_properties'
+settingTypes = {'serialPort': str, 'baudRate': int, 'ipAddress': str, 'port': int,
+                'decodeKiss': bool, 'forwardData': bool, 'saveLog': bool,
+                'latitude': str, 'longitude': str, 'replayFile': str, 'replaySpeed': float,
+                'metricsPort': int, 'readerProcess': bool, 'additionalLinks': str,
+                'dedupCacheSize': int, 'dedupWindow': float}  # Other CubeSats: add any new configuration options here and in input_properties.cfg
+defaultSettingsFilename = os.path.join(os.path.dirname(os.path.abspath(__file__)), "input_properties.cfg")
+userSettingsFilename = os.path.join(beacon_pipeline.decoderHomeDirectory, "input_properties.cfg")
+
+
+# Purpose:
+#   Convert a setting to its type, whether it came from the .cfg file or from a GUI widget
+# Input:
+#   name [string]: The setting name, e.g., 'baudRate'
+#   value [anything]: The raw value, e.g., "19200" or u"True" or True
+# Output:
+#   typedValue [str, int or bool]: The converted value. Raises ValueError if it can't be converted.
+#
+def convertSetting(name, value):
+    settingType = settingTypes[name]
+    if settingType is bool:
+        if isinstance(value, bool):
+            return value
+        return str(value).strip().lower() == 'true'
+    return settingType(str(value).strip())
+
+
+class Settings_Store():
+    """
+    Purpose:
+        Hold the input settings in memory so they can be read from any thread (including the port reading thread) without
+        touching Qt or disk. Changes are written to ~/MinXSS_Beacon_Decoder/input_properties.cfg by a background timer so a
+        burst of changes results in a single atomic write.
+    Input:
+        log [logging.Logger]: The debug log
+        saveDelay [float]: Seconds to wait after the last change before saving
+    Output:
+        N/A
+    """
+    def __init__(self, log, saveDelay=1.0):
+        self.log = log
+        self.saveDelay = saveDelay
+        self.lock = threading.Lock()
+        self.saveTimer = None
+        self.values = {}
+
+        parser = ConfigParser()
+        self.loadedFilenames = parser.read([defaultSettingsFilename, userSettingsFilename])  # User's settings override the defaults
+        for name in settingTypes:
+            if parser.has_option(section, name):
+                try:
+                    self.values[name] = convertSetting(name, parser.get(section, name))
+                except ValueError:
+                    self.log.error("Ignoring invalid setting {0} = {1}".format(name, parser.get(section, name)))
+
+    def get(self, name, default=None):
+        return self.values.get(name, default)
+
+    def set(self, name, value):
+        """
+        Purpose:
+            Change a single setting and schedule a save
+        Input:
+            name [string]: The setting name, e.g., 'decodeKiss'
+            value [anything]: The new value, converted to the setting's type
+        Output:
+            None
+        """
+        self.update(**{name: value})
+
+    def update(self, **settings):
+        """
+        Purpose:
+            Change any number of settings and schedule a single save. Values that can't be converted to the setting's type
+            (e.g., a baud rate that isn't a number) are logged and ignored.
+        Input:
+            settings [keyword arguments]: Setting names and new values
+        Output:
+            None
+        """
+        with self.lock:
+            changed = False
+            for name, value in settings.items():
+                try:
+                    typedValue = convertSetting(name, value)
+                except ValueError:
+                    self.log.error("Ignoring invalid setting {0} = {1}".format(name, value))
+                    continue
+                if self.values.get(name) != typedValue:
+                    self.values[name] = typedValue
+                    changed = True
+            if changed:
+                if self.saveTimer:
+                    self.saveTimer.cancel()
+                self.saveTimer = threading.Timer(self.saveDelay, self.save)
+                self.saveTimer.daemon = True
+                self.saveTimer.start()
+
+    def save(self):
+        """
+        Purpose:
+            Write the settings to disk by writing a temporary file and renaming it over the old one, so the file is never half written
+        Input:
+            None
+        Output:
+            None
+        """
+        with self.lock:
+            self.saveTimer = None
+            parser = ConfigParser()
+            parser.add_section(section)
+            for name in sorted(self.values):
+                parser.set(section, name, str(self.values[name]))
+
+            if not os.path.exists(beacon_pipeline.decoderHomeDirectory):
+                os.makedirs(beacon_pipeline.decoderHomeDirectory)
+            with open(userSettingsFilename + '.partial', 'w') as configfile:
+                parser.write(configfile)
+            beacon_pipeline.replaceFile(userSettingsFilename + '.partial', userSettingsFilename)
+        self.log.info("Saved input settings")
+
+    def flush(self):
+        """
+        Purpose:
+            Save any pending changes right now (e.g., when about to quit)
+        Input:
+            None
+        Output:
+            None
+        """
+        with self.lock:
+            pending = self.saveTimer is not None
+            if pending:
+                self.saveTimer.cancel()
+        if pending:
+            self.save()
@@ -0,0 +1,224 @@
+"""Define telemetry fields in one registry (id, name, position in the packet, unit, converter, limits) and store a packet's
+telemetry compactly in a fixed-layout record that still reads like the dictionary parsePacket used to return"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+from array import array
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping  # python 2
+
+noValue, integerValue, floatValue = 0, 1, 2  # Type codes for each field; telemetry points are None, ints or floats
+typeCodes = {type(None): noValue, int: integerValue, float: floatValue}
+
+
+# Purpose:
+#   Get the type code for a value that isn't exactly None, an int or a float (e.g., a numpy scalar or a python 2 long)
+# Input:
+#   value [number]: The value
+# Output:
+#   valueType [int]: floatValue or integerValue
+#
+def typeCode(value):
+    if isinstance(value, float) or hasattr(value, 'dtype') and value.dtype.kind == 'f':
+        return floatValue
+    return integerValue
+
+
+class Telemetry_Record(Mapping):
+    """
+    Purpose:
+        Hold one packet's telemetry as an array of floats plus a type code per field, instead of a dictionary with a long
+        string key and a boxed number per field. A pass's worth of records then costs a few hundred bytes each, about the
+        size of the packets themselves. Fields are read by integer id (record[fieldId], a plain index) or by name
+        (record['Battery Voltage']) like the dictionary; get, keys, items, in, ==, etc. all work as for a dictionary.
+        Subclasses set fieldNames (e.g., minxss_parser.Minxss_Telemetry_Record), and registry if made by a Telemetry_Registry.
+    Input:
+        None (every field starts as None)
+    Output:
+        N/A
+    """
+    __slots__ = ('values', 'types')
+    fieldNames = []
+    fieldIds = {}  # Field name -> id (its index in fieldNames)
+    registry = None  # The Telemetry_Registry that decodes this kind of record, for its fields' units, limits, etc.
+
+    def __init__(self):
+        self.values = array('d', [0.0]) * len(self.fieldNames)
+        self.types = bytearray(len(self.fieldNames))
+
+    def __getitem__(self, key):
+        fieldId = key if isinstance(key, int) else self.fieldIds[key]
+        valueType = self.types[fieldId]
+        if valueType == floatValue:
+            return self.values[fieldId]
+        if valueType == integerValue:
+            return int(self.values[fieldId])
+        return None
+
+    def __setitem__(self, key, value):
+        fieldId = self.fieldIds[key] if key.__class__ is str else key
+        valueClass = value.__class__
+        if valueClass is float:  # The common cases first, since parsePacket sets every field of every packet
+            self.types[fieldId] = floatValue
+            self.values[fieldId] = value
+        elif valueClass is int:
+            self.types[fieldId] = integerValue
+            self.values[fieldId] = value
+        elif value is None:
+            self.types[fieldId] = noValue
+        else:
+            self.types[fieldId] = typeCode(value)
+            self.values[fieldId] = float(value)
+
+    def __iter__(self):
+        return iter(self.fieldNames)
+
+    def __len__(self):
+        return len(self.fieldNames)
+
+    def __contains__(self, key):
+        return key in self.fieldIds
+
+    def __repr__(self):
+        return repr(self.asDictionary())
+
+    def asDictionary(self):
+        return dict(zip(self.fieldNames, (self[fieldId] for fieldId in range(len(self.fieldNames)))))
+
+    @classmethod
+    def fromValues(cls, values):
+        """
+        Purpose:
+            Make a record from every field's value at once, which is much faster than setting fields one at a time
+        Input:
+            values [list]: One value (None, int or float) per field, in id order
+        Output:
+            record [Telemetry_Record]: A new record
+        """
+        record = cls.__new__(cls)
+        try:
+            record.types = bytearray(map(typeCodes.__getitem__, map(type, values)))  # Both maps run in C
+        except KeyError:
+            record.types = bytearray(typeCodes.get(type(value)) or typeCode(value) if value is not None else noValue for value in values)
+        record.values = array('d', [value or 0.0 for value in values])  # None -> 0.0 (its type code says None)
+        return record
+
+    def copyFrom(self, values, types):
+        """
+        Purpose:
+            Fill the record from stored values and type codes (e.g., unpacked from the reader process's ring buffer)
+        Input:
+            values [sequence of float]: One per field
+            types [sequence of int]: One type code per field
+        Output:
+            None
+        """
+        self.values = array('d', values)
+        self.types = bytearray(types)
+
+
+# Purpose:
+#   Make a record class for a telemetry definition
+# Input:
+#   className [string]: e.g., 'Minxss_Telemetry_Record'
+#   fieldNames [list of strings]: The fields, in id order
+# Output:
+#   recordClass [class]: A Telemetry_Record subclass with that layout
+#
+def makeRecordClass(className, fieldNames):
+    return type(className, (Telemetry_Record,), {'__slots__': (), 'fieldNames': list(fieldNames),
+                                                 'fieldIds': dict((name, fieldId) for fieldId, name in enumerate(fieldNames))})
+
+
+class Telemetry_Field():
+    """
+    Purpose:
+        One telemetry point: where it is in the packet and how to turn its bytes into a human-readable value
+    Input:
+        name [string]: The key in the telemetry record, e.g., 'Battery Voltage'
+        offset [int]: Index of the field's first byte, counted from the start sync bytes
+        width [int]: Number of bytes
+        unit [string]: e.g., 'V', 'mA', 'deg C'; '' for counts, flags, etc.
+        converter [function or value]: Called as converter(packet, offset) to get the value. Anything that isn't callable
+                                       (e.g., None for a point that isn't decoded yet) is used as the value for every packet.
+        greenLimits [tuple]: (low, high) inclusive range that is nominal. None if the field has no limits.
+        yellowLimits [tuple]: (low, high) inclusive range that is a warning; anything outside both ranges is red
+    Output:
+        N/A
+    """
+    __slots__ = ('fieldId', 'name', 'offset', 'width', 'unit', 'converter', 'greenLimits', 'yellowLimits')
+
+    def __init__(self, name, offset, width, unit='', converter=None, greenLimits=None, yellowLimits=None):
+        self.fieldId = None  # Set by the Telemetry_Registry the field is added to
+        self.name = name
+        self.offset = offset
+        self.width = width
+        self.unit = unit
+        self.converter = converter
+        self.greenLimits = greenLimits
+        self.yellowLimits = yellowLimits
+
+    def limitState(self, value):
+        """
+        Purpose:
+            Check a value against the field's limits
+        Input:
+            value [number]: The field's value
+        Output:
+            limitState [string]: 'green', 'yellow' or 'red'. None if the field has no limits or the value is None.
+        """
+        if self.greenLimits is None or value is None:
+            return None
+        if self.greenLimits[0] <= value <= self.greenLimits[1]:
+            return 'green'
+        if self.yellowLimits is not None and self.yellowLimits[0] <= value <= self.yellowLimits[1]:
+            return 'yellow'
+        return 'red'
+
+
+class Telemetry_Registry():
+    """
+    Purpose:
+        Every field of a packet in id order, and the decoder compiled from them: the fields that need converting become a
+        tuple of (id, offset, converter) that decode runs through in one tight loop, and every other field's value is filled
+        in from a template. The parser, record layout, reader process, displays and exports all work from the registry, so
+        adding a telemetry point is one Telemetry_Field entry.
+    Input:
+        recordClassName [string]: Name of the record class to make, e.g., 'Minxss_Telemetry_Record'
+        fields [list of Telemetry_Field]: The fields; each one's id is its index in this list
+        name [string]: e.g., the schema's spacecraft and version. Defaults to recordClassName.
+    Output:
+        N/A
+    """
+    def __init__(self, recordClassName, fields, name=None):
+        self.name = name or recordClassName
+        for fieldId, field in enumerate(fields):
+            field.fieldId = fieldId
+        self.fields = tuple(fields)
+        self.fieldNames = [field.name for field in fields]
+        self.fieldIds = dict((field.name, field.fieldId) for field in fields)
+        self.recordClass = makeRecordClass(recordClassName, self.fieldNames)
+        self.recordClass.registry = self
+        self.packetLength = max(field.offset + field.width for field in fields)  # Bytes from the start sync the fields span
+        self.fixedValues = [None if callable(field.converter) else field.converter for field in fields]
+        self.decoders = tuple((field.fieldId, field.offset, field.converter) for field in fields if callable(field.converter))
+
+    def field(self, key):
+        return self.fields[key if isinstance(key, int) else self.fieldIds[key]]
+
+    def decode(self, packet, start=0):
+        """
+        Purpose:
+            Convert every field of a packet
+        Input:
+            packet [bytearray]: The frame holding the packet. Fields are read in place, not sliced out.
+            start [int]: Index of the packet's start sync bytes in the frame (field offsets are counted from there)
+        Output:
+            record [Telemetry_Record]: The telemetry (of this registry's record class). Raises if the packet is too short.
+        """
+        values = list(self.fixedValues)
+        for fieldId, offset, converter in self.decoders:
+            values[fieldId] = converter(packet, start + offset)
+        return self.recordClass.fromValues(values)
@@ -0,0 +1,300 @@
+"""Load versioned telemetry schemas (one JSON file per spacecraft and packet layout version), compile each into a decoder once,
+and pick the decoder for each packet from its start sync bytes or the AX.25 source callsign"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import os
+import sys
+import math
+import glob
+import json
+import struct
+import logging
+import binascii
+import frame_check
+from telemetry_record import Telemetry_Field, Telemetry_Registry
+
+schemaDirectory = os.path.join(getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__))), "schemas")  # Also in a pyinstaller bundle
+userSchemaDirectory = os.path.join(os.path.expanduser("~"), "MinXSS_Beacon_Decoder", "schemas")  # Added to, or replacing, the above
+ax25HeaderLength = 16  # Destination and source addresses (7 bytes each), control and PID, just before the start sync bytes
+structSigned16 = struct.Struct('<h')
+structUnsigned16 = struct.Struct('<H')
+structSigned32 = struct.Struct('<i')
+structUnsigned32 = struct.Struct('<I')
+
+
+##
+# Converters: what a schema's "converter" can name. Each takes the frame and the index of the field's first byte in it.
+# Other CubeSats: add any conversions your telemetry needs here and to the converters dictionary below.
+##
+
+# Purpose:
+#   Convert the voltage across a thermistor, which is received in telemetry, to temperature
+# Input:
+#   packet [bytearray]: The frame holding the packet
+#   offset [int]: Index of the field's 2 bytes in the frame
+# Output:
+#   temperature [float]: Temperature [deg C]
+#
+def thermistorTemperature(packet, offset):
+    Tinv = 1.0 / 298
+    B = 3430  # Confirm Value
+    Voltage_thermistor = packet[offset] + packet[offset + 1]
+    Resistance_thermistor = ((Voltage_thermistor / (3.3 - Voltage_thermistor)) * 23 * 1000)
+    R = Resistance_thermistor / 10000
+    Temperature = (1/(((Tinv) + ((math.log(R) / B)))))  # In Kelvin
+    return (Temperature-273)  # In Celsius
+
+
+def unsignedInteger8(packet, offset):
+    return packet[offset]
+
+
+def signedInteger16(packet, offset):
+    return structSigned16.unpack_from(packet, offset)[0]  # Little endian, as are the others
+
+
+def unsignedInteger16(packet, offset):
+    return structUnsigned16.unpack_from(packet, offset)[0]
+
+
+def signedInteger32(packet, offset):
+    return structSigned32.unpack_from(packet, offset)[0]
+
+
+def unsignedInteger32(packet, offset):
+    return structUnsigned32.unpack_from(packet, offset)[0]
+
+
+converters = {'thermistorTemperature': thermistorTemperature, 'unsignedInteger8': unsignedInteger8,
+              'signedInteger16': signedInteger16, 'unsignedInteger16': unsignedInteger16,
+              'signedInteger32': signedInteger32, 'unsignedInteger32': unsignedInteger32}
+
+
+# Purpose:
+#   Make a converter that scales another converter's output (e.g., data numbers to volts), so the scaling is decided once
+#   when the schema is compiled rather than checked for every packet
+# Input:
+#   converter [function]: The converter to scale
+#   scale [float]: Multiplier
+# Output:
+#   scaledConverter [function]: The scaling converter
+#
+def scaledConverter(converter, scale):
+    def convert(packet, offset):
+        return converter(packet, offset) * scale
+    return convert
+
+
+# Purpose:
+#   Read a limits pair from a schema, where null means unbounded
+# Input:
+#   limits [list]: [low, high], either of which may be None. None for no limits.
+# Output:
+#   limits [tuple]: (low, high) with infinities for unbounded ends. None for no limits.
+#
+def readLimits(limits):
+    if limits is None:
+        return None
+    return (float('-inf') if limits[0] is None else limits[0], float('inf') if limits[1] is None else limits[1])
+
+
+# Purpose:
+#   Get the AX.25 source callsign of the frame a packet came in
+# Input:
+#   frame [bytearray]: The frame
+#   syncOffset [int]: Index of the packet's start sync bytes, which follow the AX.25 header
+# Output:
+#   callsign [string]: e.g., 'W1AW'. '' if the frame doesn't have a whole header before the packet.
+#
+def sourceCallsign(frame, syncOffset):
+    if syncOffset < ax25HeaderLength:
+        return ''
+    start = syncOffset - ax25HeaderLength + 7
+    return bytearray(byte >> 1 for byte in frame[start:start + 6]).decode('ascii', 'replace').strip()
+
+
+class Telemetry_Schema():
+    """
+    Purpose:
+        One spacecraft's packet layout at one version, compiled into a Telemetry_Registry (i.e., a decoder). A schema file is
+        JSON with spacecraft, version, syncBytes (hex), optionally stopSyncBytes (hex, default a5a5), callsigns (AX.25 source callsigns that send it),
+        beaconPeriod [s], recordClassName, description, default (whether it decodes packets no other schema claims),
+        checksum ({algorithm: a name in frame_check.crcAlgorithms, offset}: a CRC of the packet from the start sync up to
+        offset, sent least significant byte first at offset), ax25Fcs (whether frames arrive with the AX.25 frame check
+        sequence after the stop sync, i.e., the TNC doesn't strip it), packetLength (bytes from the start sync through the
+        stop sync, if fixed), and fields: a list of {name, offset, width, unit, converter (a name in converters) or value (for every packet), scale,
+        greenLimits, yellowLimits, note}, offsets being counted from the start sync bytes.
+    Input:
+        definition [dictionary]: The parsed schema file
+        filename [string]: Where it came from, for messages
+    Output:
+        N/A
+    """
+    def __init__(self, definition, filename=''):
+        self.filename = filename
+        self.spacecraft = definition['spacecraft']
+        self.version = definition['version']
+        self.name = "{0} v{1}".format(self.spacecraft, self.version)
+        self.description = definition.get('description', '')
+        self.syncBytes = bytes(bytearray(binascii.unhexlify(definition['syncBytes'])))
+        self.stopSyncBytes = bytes(bytearray(binascii.unhexlify(definition.get('stopSyncBytes', 'a5a5'))))
+        self.callsigns = [callsign.upper() for callsign in definition.get('callsigns', [])]
+        self.beaconPeriod = definition.get('beaconPeriod')
+        self.default = definition.get('default', False)
+        checksum = definition.get('checksum')
+        if checksum is not None and checksum['algorithm'] not in frame_check.crcAlgorithms:
+            raise ValueError("{0}: unknown checksum algorithm {1}".format(filename, checksum['algorithm']))
+        self.checksumAlgorithm = frame_check.crcAlgorithms[checksum['algorithm']] if checksum is not None else None
+        self.checksumOffset = checksum['offset'] if checksum is not None else None
+        self.ax25Fcs = definition.get('ax25Fcs', False)
+        self.packetLength = definition.get('packetLength')
+        self.hasChecks = self.checksumAlgorithm is not None or self.ax25Fcs
+        recordClassName = str(definition.get('recordClassName') or
+                              ''.join(character if character.isalnum() else '_' for character in self.name) + '_Telemetry_Record')
+        self.registry = Telemetry_Registry(recordClassName, [self.compileField(field) for field in definition['fields']], self.name)
+
+    def compileField(self, field):
+        """
+        Purpose:
+            Turn a schema's field into a Telemetry_Field, resolving its converter and scaling
+        Input:
+            field [dictionary]: One entry of the schema's fields
+        Output:
+            telemetryField [Telemetry_Field]: The field. Raises ValueError if the converter isn't known.
+        """
+        if 'converter' in field:
+            if field['converter'] not in converters:
+                raise ValueError("{0}: unknown converter {1} for {2}".format(self.filename, field['converter'], field['name']))
+            converter = converters[field['converter']]
+            if field.get('scale', 1) != 1:
+                converter = scaledConverter(converter, field['scale'])
+        else:
+            converter = field.get('value')
+        return Telemetry_Field(field['name'], field['offset'], field['width'], field.get('unit', ''), converter,
+                               readLimits(field.get('greenLimits')), readLimits(field.get('yellowLimits')))
+
+    def checkPacket(self, frame, syncOffset):
+        """
+        Purpose:
+            Check a frame's packet checksum and AX.25 frame check sequence, whichever the schema has
+        Input:
+            frame [bytearray]: The frame (after KISS decoding)
+            syncOffset [int]: Index of the packet's start sync bytes in the frame
+        Output:
+            failure [string]: Why the frame is corrupt. None if it passed (or the schema has no checks).
+        """
+        if self.checksumAlgorithm is not None:
+            checksumIndex = syncOffset + self.checksumOffset
+            if len(frame) < checksumIndex + 2:
+                return "too short for its checksum"
+            expected = self.checksumAlgorithm.compute(frame, syncOffset, checksumIndex)
+            if frame_check.readCrc(frame, checksumIndex) != expected:
+                return "packet checksum 0x{0:04x}, expected 0x{1:04x}".format(frame_check.readCrc(frame, checksumIndex), expected)
+        if self.ax25Fcs and syncOffset >= ax25HeaderLength:  # Otherwise the AX.25 header isn't there (e.g., a replayed packet)
+            stopIndex = frame.find(self.stopSyncBytes, syncOffset + len(self.syncBytes))
+            fcsIndex = stopIndex + len(self.stopSyncBytes)
+            if stopIndex == -1 or len(frame) < fcsIndex + 2:
+                return "missing its AX.25 frame check sequence"
+            expected = frame_check.crc16X25.compute(frame, syncOffset - ax25HeaderLength, fcsIndex)
+            if frame_check.readCrc(frame, fcsIndex) != expected:
+                return "AX.25 frame check sequence 0x{0:04x}, expected 0x{1:04x}".format(frame_check.readCrc(frame, fcsIndex), expected)
+        return None
+
+    def checkPacketsBulk(self, packets):
+        """
+        Purpose:
+            Check the packet checksums of many packets at once (e.g., a chunk of an archive)
+        Input:
+            packets [list of bytearray]: Packets of this schema, each starting at its start sync bytes
+        Output:
+            passed [list of bool]: Whether each packet's checksum is right (always True if the schema has no checksum)
+        """
+        if self.checksumAlgorithm is None:
+            return [True] * len(packets)
+        checkedLength = self.checksumOffset + 2
+        passed = [len(packet) >= checkedLength for packet in packets]
+        longEnoughIndexes = [index for index, longEnough in enumerate(passed) if longEnough]
+        if longEnoughIndexes:
+            rows = frame_check.stackPackets([packets[index] for index in longEnoughIndexes], checkedLength)
+            received = rows[:, self.checksumOffset].astype('uint16') | (rows[:, self.checksumOffset + 1].astype('uint16') << 8)
+            matches = self.checksumAlgorithm.computeBulk(rows[:, :self.checksumOffset]) == received
+            for index, match in zip(longEnoughIndexes, matches.tolist()):
+                passed[index] = match
+        return passed
+
+
+class Schema_Set():
+    """
+    Purpose:
+        Every schema found, compiled once (typically at startup), and the lookup tables that pick one for each packet: the
+        packet is found by its start sync bytes (one search per distinct pattern, usually just one), then its decoder is
+        looked up by (AX.25 source callsign, sync bytes), falling back to (sync bytes). No layouts are tried in turn. Where
+        several versions of a spacecraft's schema claim the same packets, the highest version is used.
+    Input:
+        directories [list of strings]: Folders of schema (.json) files. Later folders' schemas replace earlier ones with the
+                                       same spacecraft and version.
+        log [logging.Logger]: Where to say which schemas were loaded
+    Output:
+        N/A
+    """
+    def __init__(self, directories=(schemaDirectory, userSchemaDirectory), log=None):
+        log = log or logging.getLogger('minxss_telemetry_schema')
+        schemasByKey = {}
+        for directory in directories:
+            for filename in sorted(glob.glob(os.path.join(directory, '*.json'))):
+                with open(filename) as schemaFile:
+                    schema = Telemetry_Schema(json.load(schemaFile), filename)
+                schemasByKey[(schema.spacecraft, schema.version)] = schema
+                log.debug("Loaded telemetry schema {0} from {1}".format(schema.name, filename))
+        if not schemasByKey:
+            raise IOError("No telemetry schemas found in {0}".format(', '.join(directories)))
+        self.schemas = sorted(schemasByKey.values(), key=lambda schema: (schema.spacecraft, schema.version))
+
+        self.bySyncBytes = {}
+        self.byCallsign = {}
+        for schema in self.schemas:  # Ascending versions, so the highest version of a spacecraft's schema wins
+            current = self.bySyncBytes.get(schema.syncBytes)
+            if current is None or schema.default or not current.default:  # Prefer the default schema for a sync pattern
+                self.bySyncBytes[schema.syncBytes] = schema
+            for callsign in schema.callsigns:
+                self.byCallsign[(callsign, schema.syncBytes)] = schema
+        self.syncPatterns = tuple(self.bySyncBytes)
+        defaultSchemas = [schema for schema in self.schemas if schema.default]
+        self.defaultSchema = defaultSchemas[-1] if defaultSchemas else self.schemas[0]
+
+    def schema(self, spacecraft, version=None):
+        """
+        Purpose:
+            Get a schema by name
+        Input:
+            spacecraft [string]: e.g., 'MinXSS-2'
+            version [int]: The layout version. None for the highest.
+        Output:
+            schema [Telemetry_Schema]: The schema. None if there isn't one.
+        """
+        matches = [schema for schema in self.schemas if schema.spacecraft == spacecraft and version in (None, schema.version)]
+        return matches[-1] if matches else None
+
+    def findPacket(self, frame):
+        """
+        Purpose:
+            Find the packet in a frame and the schema to decode it with
+        Input:
+            frame [bytearray]: A frame from the link (after KISS decoding)
+        Output:
+            schema [Telemetry_Schema]: The schema for the packet. None if no schema's start sync bytes are in the frame.
+            syncOffset [int]: Index of the packet's start sync bytes in the frame. -1 if not found.
+        """
+        syncOffset, syncBytes = -1, None
+        for pattern in self.syncPatterns:
+            index = frame.find(pattern)
+            if index != -1 and (syncOffset == -1 or index < syncOffset):
+                syncOffset, syncBytes = index, pattern
+        if syncOffset == -1:
+            return None, -1
+        if self.byCallsign:
+            schema = self.byCallsign.get((sourceCallsign(frame, syncOffset).upper(), syncBytes))
+            if schema is not None:
+                return schema, syncOffset
+        return self.bySyncBytes[syncBytes], syncOffset
@@ -0,0 +1,31 @@
+"""The debug log's handlers in a process forked after the log was created (e.g., the reader process)"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import os
+import pytest
+import beacon_pipeline
+
+
+@pytest.mark.skipif(not hasattr(os, 'fork') or beacon_pipeline.QueueHandler is None, reason="needs fork and QueueHandler")
+def test_forkedChildReplacesInheritedQueueHandler(tmp_path, monkeypatch):
+    monkeypatch.setattr(beacon_pipeline, 'logDirectory', str(tmp_path))
+    log = beacon_pipeline.createLog()
+    assert beacon_pipeline.createLog() is log and len(beacon_pipeline.logHandlers) == 1  # Once per process
+    inheritedQueue = beacon_pipeline.logHandlers[0].queue
+
+    childId = os.fork()
+    if childId == 0:
+        exitCode = 1
+        try:
+            inheritedQueueSize = inheritedQueue.qsize()  # Anything the parent hadn't written yet when it forked
+            beacon_pipeline.createLog()
+            for index in range(1000):
+                log.debug("Debug message %d", index)
+            queueHandlers = [handler for handler in log.handlers if isinstance(handler, beacon_pipeline.QueueHandler)]
+            if len(queueHandlers) == 1 and queueHandlers[0].queue is not inheritedQueue and inheritedQueue.qsize() == inheritedQueueSize:
+                exitCode = 0
+        finally:
+            os._exit(exitCode)
+    _, status = os.waitpid(childId, 0)
+    assert os.WIFEXITED(status) and os.WEXITSTATUS(status) == 0
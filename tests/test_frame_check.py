@@ -0,0 +1,30 @@
+"""The table-driven CRCs against their standard check values, and the vectorized CRCs against the one-at-a-time ones"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import random
+import pytest
+import frame_check
+
+checkInput = bytearray(b'123456789')  # The standard input for a CRC's check value
+
+
+@pytest.mark.parametrize('algorithm, checkValue', [(frame_check.crc16X25, 0x906e), (frame_check.crc16Ccitt, 0x29b1)])
+def test_computeMatchesCheckValue(algorithm, checkValue):
+    assert algorithm.compute(checkInput) == checkValue
+    assert algorithm.compute(bytearray(b'\x08\x19') + checkInput + bytearray(b'\xa5\xa5'), 2, 11) == checkValue  # In place
+
+
+@pytest.mark.parametrize('algorithm', sorted(frame_check.crcAlgorithms.values(), key=lambda algorithm: algorithm.name))
+def test_computeBulkMatchesCompute(algorithm):
+    generator = random.Random(1)
+    packets = [bytearray(generator.getrandbits(8) for _ in range(254)) for _ in range(50)] + [checkInput + bytearray(245)]
+    for length in (9, 254):
+        crcs = algorithm.computeBulk(frame_check.stackPackets(packets, length))
+        assert [int(crc) for crc in crcs] == [algorithm.compute(packet, 0, length) for packet in packets]
+    assert int(algorithm.computeBulk(frame_check.stackPackets([checkInput], 9))[0]) == algorithm.compute(checkInput)
+
+
+def test_readCrcIsLeastSignificantByteFirst():
+    crc = frame_check.crc16X25.compute(checkInput)
+    assert frame_check.readCrc(bytearray([crc & 0xff, crc >> 8]), 0) == 0x906e
@@ -0,0 +1,22 @@
+"""The log store keeps each log packet once, raw, searchable by when it was received"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import log_packets
+import latency_monitor
+
+
+def test_storesEachPacketOnceRaw(tmp_path):
+    store = log_packets.Log_Store(str(tmp_path / 'log.sqlite'))
+    frame = bytearray(b'\xc0\x00' + b'\x08\x1d' + bytes(range(40)) + b'\xa5\xa5')
+    receiveTimes = latency_monitor.Receive_Times((0, 1496318400 * 10**9), (0, 1496318400 * 10**9))  # 2017-06-01T12:00 UTC
+    store.append(log_packets.logEntry(frame, 2, receiveTimes))
+    store.append(log_packets.logEntry(frame, 2))  # Received again, e.g., replayed
+
+    entries = store.search()
+    assert entries == [{'receivedTime': '2017-06-01T12:00:00', 'packet': frame[2:].hex()}]
+    assert store.search(startTime='2017-06-01T12:00:01') == []
+    assert store.search(stopTime='2017-06-01T12:00:00') == entries
+    columns = [column[1] for column in store.connection.execute("PRAGMA table_info(log_entries)")]
+    assert columns == ['receivedTime', 'packet']
+    store.close()
@@ -0,0 +1,109 @@
+"""Push a decoded beacon through the GUI's readPort display path"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import logging
+import pytest
+
+pytest.importorskip('PySide')
+import minxss_beacon_decoder
+import beacon_simulator
+import latency_monitor
+
+
+class Fake_Label():
+    def __init__(self):
+        self.text = None
+        self.palette = None
+
+    def setText(self, text):
+        self.text = text
+
+    def setPalette(self, palette):
+        self.palette = palette
+
+
+class Fake_Scroll_Bar():
+    def setValue(self, value):
+        pass
+
+    def maximum(self):
+        return 0
+
+
+class Fake_Text_Browser():
+    def __init__(self):
+        self.lines = []
+
+    def append(self, text):
+        self.lines.append(text)
+
+    def verticalScrollBar(self):
+        return Fake_Scroll_Bar()
+
+
+class Fake_Port():
+    """Returns one frame, then ends like a finished replay"""
+    def __init__(self, frame):
+        self.frames = [frame]
+        self.receiveTimes = None
+
+    def read_packet(self):
+        if not self.frames:
+            raise EOFError
+        clock = latency_monitor.receiveClock()
+        self.receiveTimes = latency_monitor.Receive_Times(clock, clock)
+        return self.frames.pop()
+
+
+class Fake_Window():
+    """The parts of MainWindow that readPort uses, with the main panel's labels recording what they're given"""
+    def __init__(self, missingLabels=()):
+        self.log = logging.getLogger('minxss_test')
+        self.settings = {'decodeKiss': True, 'saveLog': False}
+        self.profiling = type('Profiling', (), {'tick': lambda self, name: None})()
+        self.latencyMonitor = latency_monitor.Latency_Monitor(False)
+        self.latestTelemetry = None
+        self.textBrowser_serialOutput = Fake_Text_Browser()
+        self.label_lastPacketTime = Fake_Label()
+        for _, labelName in minxss_beacon_decoder.mainPanelLabels:
+            if labelName not in missingLabels:
+                setattr(self, labelName, Fake_Label())
+        self.mainPanelWidgets = minxss_beacon_decoder.MainWindow.bindMainPanelLabels(self)
+
+    def displayTelemetry(self, selectedTelemetryDictionary):
+        minxss_beacon_decoder.MainWindow.displayTelemetry(self, selectedTelemetryDictionary)
+
+
+def test_readPortDisplaysEveryBoundField():
+    simulator = beacon_simulator.Beacon_Simulator(logFraction=0, corruptFraction=0, escapeFraction=0, seed=1)
+    window = Fake_Window()
+    minxss_beacon_decoder.MainWindow.readPort(window, Fake_Port(simulator.nextFrame()))
+
+    assert window.latestTelemetry is not None
+    assert window.label_lastPacketTime.text.startswith("Last packet at: ")
+    registry = window.latestTelemetry.registry
+    for fieldName, labelName in minxss_beacon_decoder.mainPanelLabels:
+        assert fieldName in registry.fieldIds
+        assert getattr(window, labelName).text == minxss_beacon_decoder.formatTelemetryValue(window.latestTelemetry[fieldName])
+    assert window.label_EPSBoardTemperature.palette is not None  # Has limits in the schema
+
+
+def test_readPortSkipsMissingLabels():
+    simulator = beacon_simulator.Beacon_Simulator(logFraction=0, corruptFraction=0, escapeFraction=0, seed=1)
+    window = Fake_Window(missingLabels=('label_BattertVoltage',))
+    minxss_beacon_decoder.MainWindow.readPort(window, Fake_Port(simulator.nextFrame()))
+
+    assert window.latestTelemetry is not None
+    assert not hasattr(window, 'label_BattertVoltage')
+    assert window.label_BatteryCurrent.text == minxss_beacon_decoder.formatTelemetryValue(window.latestTelemetry['Battery Current'])
+
+
+def test_readPortDoesNotDisplayRejectedFrames(monkeypatch):
+    monkeypatch.setattr(minxss_beacon_decoder.beacon_pipeline, 'checkFrame', lambda bufferData, log: False)  # The shipped schema has no checks
+    simulator = beacon_simulator.Beacon_Simulator(logFraction=0, corruptFraction=0, escapeFraction=0, seed=1)
+    window = Fake_Window()
+    minxss_beacon_decoder.MainWindow.readPort(window, Fake_Port(simulator.nextFrame()))
+
+    assert window.textBrowser_serialOutput.lines == []
+    assert window.latestTelemetry is None
@@ -0,0 +1,73 @@
+"""Frame_Scanner's resynchronization: passing over start syncs that don't begin a whole packet without losing good packets"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import logging
+import beacon_pipeline
+import beacon_simulator
+import packet_dispatcher
+
+log = logging.getLogger('minxss_test')
+syncInPayloadOffset = 100  # [bytes] From the packet's start sync
+
+
+def makePackets(count):
+    simulator = beacon_simulator.Beacon_Simulator(logFraction=0, corruptFraction=0, escapeFraction=0, seed=1)
+    return [simulator.makeHousekeepingPacket() for _ in range(count)]
+
+
+def kissFrame(packet):
+    return beacon_simulator.kissEncode(bytearray([beacon_simulator.kissDataFrame]) + beacon_simulator.ax25Header + packet)
+
+
+def scanPackets(data, readSize=None):
+    """Feed data to a Frame_Scanner (all at once, or readSize bytes per read) and return the KISS decoded packets it frames"""
+    scanner = packet_dispatcher.Frame_Scanner(log)
+    packets = []
+    readSize = readSize or len(data)
+    for readStart in range(0, len(data), readSize):
+        scanner.feed(data[readStart:readStart + readSize])
+        while True:
+            frame, packetType, syncOffset = scanner.nextFrame()
+            if frame is None:
+                break
+            assert packetType.name == 'housekeeping'
+            packets.append(beacon_pipeline.decodeKiss(frame[syncOffset:]))
+    return packets
+
+
+def test_truncatedFrameFollowedByGoodFrames():
+    packets = makePackets(3)
+    truncatedFrame = kissFrame(packets[0])[:150]  # Cut off long before its stop sync
+    data = truncatedFrame + kissFrame(packets[1]) + kissFrame(packets[2])
+
+    assert scanPackets(data) == packets[1:]
+    assert scanPackets(data, readSize=7) == packets[1:]
+
+
+def test_startSyncInPayload():
+    packets = makePackets(2)
+    packets[0][syncInPayloadOffset:syncInPayloadOffset + 2] = beacon_simulator.housekeepingSyncBytes
+    data = kissFrame(packets[0]) + kissFrame(packets[1])
+
+    assert scanPackets(data) == packets
+    assert scanPackets(data, readSize=7) == packets
+
+
+def test_startSyncInPayloadOfTruncatedFrame():
+    packets = makePackets(2)
+    packets[0][syncInPayloadOffset:syncInPayloadOffset + 2] = beacon_simulator.housekeepingSyncBytes
+    data = kissFrame(packets[0])[:200] + kissFrame(packets[1])  # Neither start sync in the first frame begins a whole packet
+
+    assert scanPackets(data) == packets[1:]
+
+
+def test_escapedByteInFixedLengthPacket():
+    packets = makePackets(2)
+    packets[0][syncInPayloadOffset] = beacon_simulator.kissFend  # KISS encoded as two bytes, so the stop sync is one byte later
+    packets[0][syncInPayloadOffset + 1] = beacon_simulator.kissFesc
+    data = kissFrame(packets[0]) + kissFrame(packets[1])
+    assert len(kissFrame(packets[0])) >= len(beacon_simulator.ax25Header) + len(packets[0]) + 3 + 2  # FENDs, command and the escapes
+
+    assert scanPackets(data) == packets
+    assert scanPackets(data, readSize=7) == packets
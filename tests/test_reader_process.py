@@ -0,0 +1,44 @@
+"""The reader process's counters and ring buffer counts in the GUI process's metrics"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import logging
+import pytest
+import beacon_pipeline
+import beacon_simulator
+import pipeline_metrics
+import reader_process
+
+packetCount = 20
+
+
+@pytest.mark.skipif(not reader_process.available(), reason="needs multiprocessing.shared_memory")
+def test_readerCountsReachGuiMetrics(tmp_path, monkeypatch):
+    monkeypatch.setattr(beacon_pipeline, 'logDirectory', str(tmp_path))
+    simulator = beacon_simulator.Beacon_Simulator(logFraction=0, corruptFraction=0, escapeFraction=0, seed=1)
+    packets = [beacon_pipeline.decodeKiss(bytearray(simulator.nextFrame())) for _ in range(packetCount)]
+    replayFilename = str(tmp_path / 'replay.dat')
+    with open(replayFilename, 'wb') as replayFile:
+        replayFile.write(b''.join(bytes(packet) for packet in packets))
+
+    totalsBefore = pipeline_metrics.registry.totals()
+    reader = reader_process.Reader_Process('replay', (replayFilename, 0), logging.getLogger('minxss_test'), decodeKissCharacters=False)
+    assert reader.testRead()
+    records = 0
+    with pytest.raises(EOFError):
+        while True:
+            reader.read_decoded()
+            records += 1
+    assert records == packetCount
+
+    metricsText = pipeline_metrics.registry.prometheusText()
+    assert "minxss_reader_ring_written {0}\n".format(packetCount) in metricsText
+    assert "minxss_reader_ring_dropped 0\n" in metricsText
+    assert "minxss_reader_ring_depth 0\n" in metricsText
+    totals = pipeline_metrics.registry.totals()
+    assert totals['frames_found'] - totalsBefore['frames_found'] == packetCount  # Counted in the reader process
+    assert totals['bytes_read'] - totalsBefore['bytes_read'] == beacon_simulator.housekeepingPacketLength * packetCount  # Replayed from the start sync
+
+    reader.close()
+    assert "minxss_reader_ring" not in pipeline_metrics.registry.prometheusText()
+    assert pipeline_metrics.registry.totals()['frames_found'] == totals['frames_found']  # Kept once the ring is freed
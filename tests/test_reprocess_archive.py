@@ -0,0 +1,46 @@
+"""Splitting archived logs into chunks that each start on a whole packet"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import pytest
+import beacon_pipeline
+import beacon_simulator
+import reprocess_archive
+
+packetCount = 10
+syncInPayloadPacket = 4  # The packet with the start sync bytes in its payload
+syncInPayloadOffset = 100  # [bytes] From that packet's start sync
+
+
+def writeArchive(directory, extension):
+    simulator = beacon_simulator.Beacon_Simulator(logFraction=0, corruptFraction=0, escapeFraction=0, seed=1)
+    frames = [beacon_pipeline.decodeKiss(bytearray(simulator.nextFrame())) for _ in range(packetCount)]
+    frame = frames[syncInPayloadPacket]
+    syncIndex = frame.find(beacon_pipeline.startSyncBytes) + syncInPayloadOffset
+    frame[syncIndex:syncIndex + 2] = beacon_pipeline.startSyncBytes
+    archiveData = bytearray().join(frames)
+    syncInPayloadIndex = sum(len(frame) for frame in frames[:syncInPayloadPacket]) + syncIndex
+
+    filename = str(directory / ('archive' + extension))
+    if extension == '.txt':
+        with open(filename, 'w') as archive:
+            archive.write('\n'.join(beacon_pipeline.formatBufferData(frame) for frame in frames))
+        syncInPayloadIndex = len(beacon_pipeline.formatBufferData(archiveData[:syncInPayloadIndex])) + 1
+    else:
+        with open(filename, 'wb') as archive:
+            archive.write(archiveData)
+    return filename, syncInPayloadIndex
+
+
+@pytest.mark.parametrize('extension', ['.dat', '.txt'])
+def test_chunkBoundaryPassesOverSyncInPayload(tmp_path, extension):
+    filename, syncInPayloadIndex = writeArchive(tmp_path, extension)
+    chunks = reprocess_archive.findChunks(filename, syncInPayloadIndex - 1)  # The first search finds the sync in the payload
+
+    assert len(chunks) > 1
+    assert syncInPayloadIndex not in [start for start, _ in chunks]
+    packets = 0
+    for chunkIndex, (start, stop) in enumerate(chunks):
+        statistics = reprocess_archive.decodeChunk(filename, start, stop, str(tmp_path / 'shard{0}.jsonl'.format(chunkIndex)))
+        packets += statistics['packets'] - statistics['failures']
+    assert packets == packetCount
@@ -0,0 +1,80 @@
+"""Load the main window from ui_mainWindow.ui and the binary QtAssets.rcc at runtime"""
+__authors__ = "James Paul Mason"
+__contact__ = "jmason86@gmail.com"
+
+import os
+import sys
+from PySide import QtCore
+from PySide.QtUiTools import QUiLoader
+
+
+# Purpose:
+#   Find a data file whether running from the code directly or from a pyinstaller bundle (which unpacks to sys._MEIPASS)
+# Input:
+#   relativePath [string]: Path relative to this codebase, e.g., "assets/QtAssets.rcc"
+# Output:
+#   absolutePath [string]: Where the file actually is
+#
+def resourcePath(relativePath):
+    baseDirectory = getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(baseDirectory, relativePath)
+
+
+class UiLoader(QUiLoader):
+    """
+    Purpose:
+        QUiLoader that builds the widgets into an existing window (rather than a new one) and exposes each named widget,
+        action and layout as an attribute of that window, the same as the generated Ui_MainWindow.setupUi does
+    """
+    def __init__(self, baseInstance):
+        QUiLoader.__init__(self, baseInstance)
+        self.baseInstance = baseInstance
+
+    def createWidget(self, className, parent=None, name=''):
+        if parent is None:
+            return self.baseInstance
+        widget = QUiLoader.createWidget(self, className, parent, name)
+        setattr(self.baseInstance, name, widget)
+        return widget
+
+    def createAction(self, parent=None, name=''):
+        action = QUiLoader.createAction(self, parent, name)
+        setattr(self.baseInstance, name, action)
+        return action
+
+    def createLayout(self, className, parent=None, name=''):
+        layout = QUiLoader.createLayout(self, className, parent, name)
+        setattr(self.baseInstance, name, layout)
+        return layout
+
+
+# Purpose:
+#   Make the images used by the UI available at their ":/assets/..." paths
+# Input:
+#   None
+# Output:
+#   None
+#
+def registerResources():
+    rccFilename = resourcePath(os.path.join("assets", "QtAssets.rcc"))
+    if not (os.path.isfile(rccFilename) and QtCore.QResource.registerResource(rccFilename)):
+        import QtAssets_rc  # noqa: F401 -- falls back to the images embedded as a python string literal
+
+
+# Purpose:
+#   Build the main window's widgets into baseInstance from the .ui file and binary resources
+# Input:
+#   baseInstance [QMainWindow]: The window to populate
+# Output:
+#   None (but every named widget, action and layout becomes an attribute of baseInstance)
+#
+def setupUi(baseInstance):
+    uiFilename = resourcePath("ui_mainWindow.ui")
+    if not os.path.isfile(uiFilename):
+        raise IOError("Can't find {0}".format(uiFilename))
+    registerResources()
+    loader = UiLoader(baseInstance)
+    uiFile = QtCore.QFile(uiFilename)
+    uiFile.open(QtCore.QFile.ReadOnly)
+    loader.load(uiFile)
+    uiFile.close()